@@ -0,0 +1,295 @@
+"""
+Encodings of the payloads sent to web clients.
+
+The watcher keeps timestamps raw, as integers: the microseconds since the epoch, in UTC (see
+:meth:`~apschedulerui.watcher.SchedulerWatcher._repr_ts`). They are only converted to the wall-clock time of the
+scheduler's timezone (see :class:`WallClock`) and formatted here, when payloads are sent.
+
+Clients negotiate an encoding when they connect (see :func:`negotiate`):
+    * ``json``: payloads are sent as they come from the watcher, with their timestamps formatted as strings (see
+      :class:`TimestampFormatter`). This is the default.
+    * ``compact``: keys are replaced by the short codes in :data:`KEY_CODES`, event names by their index in
+      :data:`EVENT_NAMES` and timestamps are sent as the microseconds since the epoch of their wall-clock time.
+      Payloads are still serialized as JSON by Socket.IO.
+    * ``msgpack``: a ``compact`` payload, packed with MessagePack and sent as a binary message. Only available if the
+      `msgpack` package is installed.
+"""
+from datetime import datetime, timedelta, timezone
+
+from apschedulerui.watcher import SchedulerWatcher
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+
+#: Short codes of the keys of events, job states and job properties.
+KEY_CODES = {
+    # Events.
+    'job_id': 'j',
+    'event_name': 'n',
+    'event_ts': 't',
+    'seq': 's',
+    'scheduled_run_time': 'r',
+    'retval': 'v',
+    'retval_ref': 'vr',
+    'exception': 'e',
+    'exception_ref': 'er',
+    'traceback': 'b',
+    'traceback_ref': 'br',
+    'next_run_times': 'x',
+    'jobstore_name': 'J',
+    'executor_name': 'X',
+    # Job states.
+    'properties': 'p',
+    'changes': 'C',
+    'events': 'E',
+    'added_time': 'a',
+    'modified_time': 'm',
+    'removed_time': 'd',
+    # Job properties.
+    'id': 'i',
+    'name': 'N',
+    'trigger': 'T',
+    'jobstore': 'js',
+    'executor': 'ex',
+    'func': 'f',
+    'func_ref': 'fr',
+    'args': 'A',
+    'kwargs': 'K',
+    'pending': 'P',
+    'coalesce': 'c',
+    'next_run_time': 'R',
+    'misfire_grace_time': 'g',
+    'max_instances': 'M',
+}
+
+#: Names of the events we notify, in the order of their codes.
+EVENT_NAMES = sorted(set(SchedulerWatcher.apscheduler_events.values()))
+
+#: Keys whose values are timestamps, lists of timestamps or mappings of job ids to lists of timestamps.
+TIMESTAMP_KEYS = {
+    'event_ts', 'scheduled_run_time', 'next_run_times', 'added_time', 'modified_time', 'removed_time', 'next_run_time'
+}
+
+#: Keys whose values are mappings of ids (of jobs, jobstores or executors) that must be kept as they are.
+ID_MAPPING_KEYS = {'jobs', 'jobstores', 'executors'}
+
+ENCODINGS = ('json', 'compact', 'msgpack')
+
+_EVENT_CODES = {event_name: code for code, event_name in enumerate(EVENT_NAMES)}
+_EPOCH = datetime(1970, 1, 1)
+_SCALARS = {str, int, float, bool, type(None)}
+
+
+def negotiate(offered):
+    """
+    Picks the most compact encoding out of those offered by a client that we support.
+
+    Args:
+        offered (list[str]):
+
+    Returns:
+        str: One of :data:`ENCODINGS`.
+    """
+    if not isinstance(offered, list):
+        return 'json'
+
+    if 'msgpack' in offered and msgpack is not None:
+        return 'msgpack'
+
+    if 'compact' in offered:
+        return 'compact'
+
+    return 'json'
+
+
+def encoding_tables():
+    """
+    Returns the tables clients need to decode ``compact`` and ``msgpack`` payloads.
+    """
+    return {
+        'keys': KEY_CODES,
+        'event_names': EVENT_NAMES,
+        'timestamp_keys': sorted(TIMESTAMP_KEYS),
+        'id_mapping_keys': sorted(ID_MAPPING_KEYS)
+    }
+
+
+class WallClock:
+    """
+    Converts raw timestamps to the microseconds since the epoch of their wall-clock time in a timezone.
+
+    Offsets from UTC only change on quarter hours, so the offset of the latest quarter hours we converted is cached.
+
+    Args:
+        timezone (datetime.tzinfo):
+    """
+
+    # Quarter hours we keep the offset of.
+    max_cached_quarters = 10000
+
+    def __init__(self, timezone):
+        self.timezone = timezone
+        self._offsets = {}
+
+    def __call__(self, ts):
+        """
+        Args:
+            ts (int): A raw timestamp.
+
+        Returns:
+            int:
+        """
+        quarter = ts // 900000000
+        offset = self._offsets.get(quarter)
+
+        if offset is None:
+            if len(self._offsets) >= self.max_cached_quarters:
+                self._offsets.clear()
+
+            utc_time = (_EPOCH + timedelta(seconds=quarter * 900)).replace(tzinfo=timezone.utc)
+            delta = utc_time.astimezone(self.timezone).utcoffset()
+            offset = (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+            self._offsets[quarter] = offset
+
+        return ts + offset
+
+
+class TimestampFormatter:
+    """
+    Formats wall-clock timestamps (see :class:`WallClock`) as ``YYYY-mm-dd HH:MM:SS.ffffff``.
+
+    Most timestamps of a payload share their second with others (an event and its scheduled run time, projections of
+    jobs that run every second, events that come in bursts), so the date and time part of the latest seconds we
+    formatted is cached and only the microseconds are formatted for each timestamp.
+    """
+
+    # Seconds we keep the representation of.
+    max_cached_seconds = 10000
+
+    def __init__(self):
+        self._seconds = {}
+
+    def __call__(self, ts):
+        """
+        Args:
+            ts (int): A wall-clock timestamp.
+
+        Returns:
+            str:
+        """
+        seconds, microseconds = divmod(ts, 1000000)
+        prefix = self._seconds.get(seconds)
+
+        if prefix is None:
+            if len(self._seconds) >= self.max_cached_seconds:
+                self._seconds.clear()
+
+            prefix = (_EPOCH + timedelta(seconds=seconds)).strftime('%Y-%m-%d %H:%M:%S.')
+            self._seconds[seconds] = prefix
+
+        return prefix + '%06d' % microseconds
+
+
+def isoformat(ts):
+    """
+    Formats a wall-clock timestamp as ``YYYY-mm-ddTHH:MM:SS.ffffff``. An alternative to :class:`TimestampFormatter`.
+
+    Args:
+        ts (int): A wall-clock timestamp.
+
+    Returns:
+        str:
+    """
+    return (_EPOCH + timedelta(microseconds=ts)).isoformat(timespec='microseconds')
+
+
+class PayloadEncoder:
+    """
+    Encodes payloads in each of the :data:`ENCODINGS`.
+
+    Args:
+        format_timestamp (callable):
+            (Optional) Formats wall-clock timestamps for ``json`` payloads. Defaults to a :class:`TimestampFormatter`.
+        timezone (datetime.tzinfo):
+            (Optional) The timezone of the wall-clock time timestamps are sent in. Defaults to UTC.
+    """
+
+    def __init__(self, format_timestamp=None, timezone=None):
+        self.format_timestamp = format_timestamp or TimestampFormatter()
+        self.wall_clock = WallClock(timezone) if timezone is not None else None
+
+    def encode(self, payload, encoding):
+        """
+        Args:
+            payload (dict|list):
+            encoding (str): One of :data:`ENCODINGS`.
+
+        Returns:
+            dict|list|bytes: The payload, ready to be emitted.
+        """
+        if encoding == 'json':
+            return self.format(payload)
+
+        payload = self.compact(payload)
+
+        if encoding == 'msgpack':
+            return msgpack.packb(payload, use_bin_type=True, default=str)
+
+        return payload
+
+    def format(self, value, key=None):
+        """
+        Returns a copy of a payload with its raw timestamps formatted.
+        """
+        if key in TIMESTAMP_KEYS:
+            return self._timestamps(value, self._format_timestamp)
+
+        if isinstance(value, dict):
+            # Most values are scalars: not recursing into them saves a quarter of the time it takes to format snapshots.
+            return {
+                k: v if type(v) in _SCALARS and k not in TIMESTAMP_KEYS else self.format(v, k) for k, v in value.items()
+            }
+
+        if isinstance(value, (list, tuple)):
+            return [self.format(v) for v in value]
+
+        return value
+
+    def compact(self, value, key=None):
+        """
+        Returns a copy of a payload with its keys and event names replaced by their codes.
+        """
+        if key in TIMESTAMP_KEYS:
+            # Timestamps are already integers.
+            return self._timestamps(value, self.wall_clock) if self.wall_clock is not None else value
+
+        if key == 'event_name' and value in _EVENT_CODES:
+            return _EVENT_CODES[value]
+
+        if isinstance(value, dict):
+            if key in ID_MAPPING_KEYS:
+                return {k: self.compact(v) for k, v in value.items()}
+            return {KEY_CODES.get(k, k): self.compact(v, k) for k, v in value.items()}
+
+        if isinstance(value, (list, tuple)):
+            return [self.compact(v) for v in value]
+
+        return value
+
+    def _format_timestamp(self, ts):
+        return self.format_timestamp(self.wall_clock(ts) if self.wall_clock is not None else ts)
+
+    def _timestamps(self, value, convert):
+        if isinstance(value, int):
+            return convert(value)
+
+        if isinstance(value, (list, tuple)):
+            return [self._timestamps(v, convert) for v in value]
+
+        if isinstance(value, dict):
+            return {k: self._timestamps(v, convert) for k, v in value.items()}
+
+        return value
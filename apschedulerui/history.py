@@ -0,0 +1,269 @@
+"""
+Durable storage of job events, so that the history of jobs can go back further than the events the watcher keeps in
+memory (see the `history` option of :class:`~apschedulerui.watcher.SchedulerWatcher`) and survives restarts.
+
+Events are stored as the watcher keeps them, with raw timestamps (see
+:meth:`~apschedulerui.watcher.SchedulerWatcher._repr_ts`), which is also how the time ranges of queries are given.
+"""
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from abc import abstractmethod
+
+
+class HistoryBackend:
+    """
+    Stores the events of jobs and serves them back by time range.
+    """
+
+    @abstractmethod
+    def append(self, event, instance_id=None):
+        """
+        Stores a job event. Called by the watcher for every job event, from the thread that processes it, so it
+        shouldn't block.
+
+        Args:
+            event (dict):
+            instance_id (str):
+                (Optional) The id of the watcher instance the event (and its sequence number) comes from, which is
+                returned along with it as its ``instance``.
+        """
+
+    @abstractmethod
+    def events(self, job_id=None, since_ts=None, until_ts=None, limit=None):
+        """
+        Returns the stored events of a job (or of every job) within a time range, ordered from oldest to newest.
+
+        Args:
+            job_id (str):
+                (Optional) Defaults to the events of every job.
+            since_ts (int):
+                (Optional) Only events at or after this raw timestamp.
+            until_ts (int):
+                (Optional) Only events at or before this raw timestamp.
+            limit (int):
+                (Optional) Only the most recent `limit` events of the range.
+
+        Returns:
+            list[dict]:
+        """
+
+    def stored_until(self):
+        """
+        Returns:
+            int: The raw timestamp of the latest stored event, before which every appended event is stored (or was
+            dropped), or :data:`None` if unknown. Queries only merge the events kept in memory from then on.
+        """
+        return None
+
+    def flush(self, timeout=None):
+        """
+        Waits until the events appended so far are stored.
+
+        Returns:
+            bool: :data:`False` if the timeout expired before that.
+        """
+        return True
+
+    def close(self):
+        pass
+
+
+class SQLiteHistory(HistoryBackend):
+    """
+    Stores job events in an SQLite database, indexed by job and time.
+
+    Events are written in batches by a dedicated thread, in one transaction per batch, so appending an event only
+    enqueues it. Old events are deleted as new ones come, according to the retention limits.
+
+    Args:
+        path (str):
+            The path of the database file. It's created if it doesn't exist.
+        retention (float):
+            (Optional) The amount of seconds events are kept for, counting back from the latest stored event. Events
+            are kept regardless of their age by default.
+        max_events (int):
+            (Optional) The maximum amount of events stored. Unlimited by default.
+        batch_size (int):
+            (Optional) The maximum amount of events written in a single transaction. Defaults to 1000.
+        queue_size (int):
+            (Optional) The maximum amount of events waiting to be written. Events that don't fit are dropped (and
+            logged), so that a slow disk never blocks the scheduler. Defaults to 100000.
+        retention_interval (float):
+            (Optional) The minimum amount of seconds between deletions of old events. Defaults to 60.
+        drop_log_interval (float):
+            (Optional) The minimum amount of seconds between warnings about dropped events. Defaults to 60.
+    """
+
+    def __init__(self, path, retention=None, max_events=None, batch_size=1000, queue_size=100000,
+                 retention_interval=60, drop_log_interval=60):
+        if retention is not None and retention <= 0:
+            raise ValueError('retention should be a positive number of seconds')
+
+        if max_events is not None and (not isinstance(max_events, int) or max_events <= 0):
+            raise ValueError('max_events should be a positive int')
+
+        self.path = path
+        self.retention = retention
+        self.max_events = max_events
+        self.batch_size = batch_size
+        self.retention_interval = retention_interval
+        self.drop_log_interval = drop_log_interval
+
+        self.dropped_events = 0
+        self._next_retention = time.monotonic() + retention_interval
+        # Drops are logged at most once per interval, as they come in bursts when the disk can't keep up.
+        self._logged_drops = 0
+        self._next_drop_log = time.monotonic()
+
+        # A single connection, shared by the writer thread and readers, which also makes `:memory:` databases work.
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+
+        with self._lock:
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('PRAGMA synchronous=NORMAL')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS events ('
+                'id INTEGER PRIMARY KEY, job_id TEXT NOT NULL, event_ts INTEGER NOT NULL, event TEXT NOT NULL)'
+            )
+            self._connection.execute('CREATE INDEX IF NOT EXISTS events_by_job ON events (job_id, event_ts)')
+            self._connection.execute('CREATE INDEX IF NOT EXISTS events_by_time ON events (event_ts)')
+            # Retention counts back from the latest event, which may have been stored before a restart.
+            self._latest_ts = self._connection.execute('SELECT MAX(event_ts) FROM events').fetchone()[0]
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, name='apscheduler-ui-history')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def append(self, event, instance_id=None):
+        try:
+            self._queue.put_nowait((event, instance_id))
+        except queue.Full:
+            self.dropped_events += 1
+
+            if time.monotonic() >= self._next_drop_log:
+                self._next_drop_log = time.monotonic() + self.drop_log_interval
+                logging.getLogger('apschedulerui').warning(
+                    'History queue is full, dropped %d events' % (self.dropped_events - self._logged_drops)
+                )
+                self._logged_drops = self.dropped_events
+
+    def stored_until(self):
+        return self._latest_ts
+
+    def events(self, job_id=None, since_ts=None, until_ts=None, limit=None):
+        conditions, params = [], []
+
+        if job_id is not None:
+            conditions.append('job_id = ?')
+            params.append(job_id)
+        if since_ts is not None:
+            conditions.append('event_ts >= ?')
+            params.append(since_ts)
+        if until_ts is not None:
+            conditions.append('event_ts <= ?')
+            params.append(until_ts)
+
+        query = 'SELECT event FROM events'
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+
+        # Newest first, so that the limit keeps the most recent events.
+        query += ' ORDER BY event_ts DESC, id DESC'
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
+
+        with self._lock:
+            rows = self._connection.execute(query, params).fetchall()
+
+        return [json.loads(row[0]) for row in reversed(rows)]
+
+    def flush(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.001)
+
+        return True
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+        with self._lock:
+            self._connection.close()
+
+    def enforce_retention(self):
+        """
+        Deletes the events that are past the retention limits.
+        """
+        with self._lock:
+            if self.retention is not None and self._latest_ts is not None:
+                self._connection.execute(
+                    'DELETE FROM events WHERE event_ts < ?', (self._latest_ts - int(self.retention * 1000000),)
+                )
+
+            if self.max_events is not None:
+                self._connection.execute(
+                    'DELETE FROM events WHERE id <= (SELECT MAX(id) FROM events) - ?', (self.max_events,)
+                )
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+
+            # Whatever piled up while we were writing goes in the same transaction.
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            closing = None in batch
+            events = [event for event in batch if event is not None]
+
+            try:
+                self._write(events)
+
+                if time.monotonic() >= self._next_retention:
+                    self._next_retention = time.monotonic() + self.retention_interval
+                    self.enforce_retention()
+            except Exception:
+                logging.getLogger('apschedulerui').exception('Failed to store %d events' % len(events))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+            if closing:
+                return
+
+    def _write(self, events):
+        if not events:
+            return
+
+        rows = [
+            (event['job_id'], event['event_ts'], json.dumps(dict(event, instance=instance_id) if instance_id else event,
+                                                            default=str))
+            for event, instance_id in events
+        ]
+
+        with self._lock:
+            self._connection.execute('BEGIN')
+            try:
+                self._connection.executemany('INSERT INTO events (job_id, event_ts, event) VALUES (?, ?, ?)', rows)
+                self._connection.execute('COMMIT')
+            except Exception:
+                self._connection.execute('ROLLBACK')
+                raise
+
+        latest_ts = max(row[1] for row in rows)
+        if self._latest_ts is None or latest_ts > self._latest_ts:
+            self._latest_ts = latest_ts
@@ -0,0 +1,214 @@
+"""
+Measures what apscheduler-ui costs the scheduler it watches and the process it runs in: the time spent processing
+scheduler events, holding the watcher's write lock, projecting run times and emitting events to clients, along with
+the size of the payloads sent.
+
+Measurements are kept in fixed-size histograms, so recording one costs a few microseconds and no memory.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+
+#: Upper bounds of the buckets of timing histograms, in seconds.
+TIME_BUCKETS = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1)
+
+#: Upper bounds of the buckets of payload size histograms, in bytes.
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class Histogram:
+    """
+    Counts observed values in fixed buckets. Thread-safe.
+
+    Args:
+        bounds (tuple[float]): Sorted upper bounds of the buckets.
+    """
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0
+        self.max = 0
+        self._lock = threading.Lock()
+
+    def add(self, value):
+        with self._lock:
+            self.counts[bisect_left(self.bounds, value)] += 1
+            self.count += 1
+            self.sum += value
+
+            if value > self.max:
+                self.max = value
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: The count, sum, mean and maximum of the observed values and the cumulative count of values up to each
+            bucket bound.
+        """
+        with self._lock:
+            counts = list(self.counts)
+            count, total, maximum = self.count, self.sum, self.max
+
+        cumulative, buckets = 0, []
+        for bound, bucket_count in zip(self.bounds, counts):
+            cumulative += bucket_count
+            buckets.append([bound, cumulative])
+
+        return {
+            'count': count,
+            'sum': total,
+            'mean': total / count if count else None,
+            'max': maximum,
+            'buckets': buckets
+        }
+
+
+class Instrumentation:
+    """
+    Histograms of the measurements of a component, by name and label, and gauges read when a snapshot is taken.
+
+    Names end with the unit of the measurements (e.g. ``process_event_seconds``). Labels are optional (name, value)
+    pairs that split the measurements of a name, e.g. ``('event', 'job_executed')``.
+    """
+
+    def __init__(self):
+        self.histograms = {}
+        self.gauges = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name, label=None, bounds=TIME_BUCKETS):
+        key = (name, label)
+        histogram = self.histograms.get(key)
+
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(key, Histogram(bounds))
+
+        return histogram
+
+    def observe(self, name, value, label=None, bounds=TIME_BUCKETS):
+        self.histogram(name, label, bounds).add(value)
+
+    def gauge(self, name, read):
+        """
+        Args:
+            name (str):
+            read (callable): Returns the gauge's current value.
+        """
+        self.gauges[name] = read
+
+    def collect(self):
+        """
+        Returns:
+            list[tuple]: The name, label and snapshot of each histogram, sorted by name and label.
+        """
+        with self._lock:
+            items = list(self.histograms.items())
+
+        items.sort(key=lambda item: (item[0][0], item[0][1] or ()))
+
+        return [(name, label, histogram.snapshot()) for (name, label), histogram in items]
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: The snapshot of each histogram (see :meth:`Histogram.snapshot`) by name and label value, and the value
+            of each gauge.
+        """
+        histograms = {}
+
+        for name, label, histogram in self.collect():
+            histograms.setdefault(name, {})[label[1] if label else ''] = histogram
+
+        return {
+            'histograms': histograms,
+            'gauges': {name: read() for name, read in sorted(self.gauges.items())}
+        }
+
+
+class TimedRLock:
+    """
+    A reentrant lock that measures how long it's held, from its outermost acquisition to its outermost release.
+
+    Args:
+        histogram (Histogram): Where hold times are recorded, in seconds.
+    """
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._acquired_at = None
+
+    def acquire(self, blocking=True, timeout=-1):
+        if not self._lock.acquire(blocking, timeout):
+            return False
+
+        # Only the owner gets here, so the depth is never updated concurrently.
+        self._depth += 1
+        if self._depth == 1:
+            self._acquired_at = time.perf_counter()
+
+        return True
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            self.histogram.add(time.perf_counter() - self._acquired_at)
+
+        self._lock.release()
+
+    __enter__ = acquire
+
+    def __exit__(self, *args):
+        self.release()
+
+
+def summary(instrumentation):
+    """
+    Returns:
+        str: A line with the count, mean and maximum of each histogram that has measurements and the value of each
+        gauge of an instrumentation.
+    """
+    snapshot = instrumentation.snapshot()
+    parts = []
+
+    for name, histograms in snapshot['histograms'].items():
+        for label, histogram in histograms.items():
+            if histogram['count']:
+                parts.append('%s%s: n=%d mean=%.3g max=%.3g' % (
+                    name, '[%s]' % label if label else '', histogram['count'], histogram['mean'], histogram['max']
+                ))
+
+    parts += ['%s: %s' % (name, value) for name, value in snapshot['gauges'].items()]
+
+    return 'apscheduler-ui overhead: ' + ', '.join(parts)
+
+
+class PeriodicLogger:
+    """
+    Logs a summary of the histograms of an instrumentation every `interval` seconds, from a daemon thread.
+
+    Args:
+        instrumentation (Instrumentation):
+        interval (float):
+        logger (logging.Logger):
+            (Optional) Defaults to the ``apschedulerui`` logger.
+    """
+
+    def __init__(self, instrumentation, interval, logger=None):
+        self.instrumentation = instrumentation
+        self.interval = interval
+        self.logger = logger or logging.getLogger('apschedulerui')
+
+        self._thread = threading.Thread(target=self._run, name='apscheduler-ui-instrumentation')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.logger.info(summary(self.instrumentation))
@@ -0,0 +1,161 @@
+"""
+Renders the state of a watched scheduler in the Prometheus text exposition format, to be scraped from ``/metrics``
+(see the `expose_metrics` option of :class:`~apschedulerui.web.SchedulerUI`).
+
+Job metrics are read from the aggregates the watcher keeps as events come (see :mod:`apschedulerui.stats`), so
+rendering them costs the same however long the event history of jobs is.
+"""
+from datetime import datetime
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+#: Upper bounds of the buckets of the execution duration histograms, in seconds.
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+JOB_STATES = ('scheduled', 'paused', 'pending', 'removed')
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def job_state(job):
+    """
+    Args:
+        job (apschedulerui.records.JobRecord): A job tracked by the watcher.
+
+    Returns:
+        str: One of :data:`JOB_STATES`.
+    """
+    properties = job.properties
+
+    if job.removed_time is not None:
+        return 'removed'
+    if properties.pending:
+        return 'pending'
+    if not properties.next_run_time:
+        return 'paused'
+    return 'scheduled'
+
+
+class MetricsWriter:
+    """
+    Accumulates the lines of metric families.
+    """
+
+    def __init__(self):
+        self.lines = []
+
+    def family(self, name, metric_type, description):
+        self.lines.append('# HELP %s %s' % (name, description))
+        self.lines.append('# TYPE %s %s' % (name, metric_type))
+
+    def sample(self, name, value, **labels):
+        if labels:
+            name += '{%s}' % ','.join('%s="%s"' % (label, escape(labels[label])) for label in sorted(labels))
+
+        self.lines.append('%s %s' % (name, repr(float(value)) if isinstance(value, float) else value))
+
+    def render(self):
+        return '\n'.join(self.lines) + '\n'
+
+
+def render_instrumentation(writer, instrumentation):
+    """
+    Writes the histograms of the UI's overhead (see :mod:`apschedulerui.instrumentation`).
+    """
+    family = None
+
+    for name, label, histogram in instrumentation.collect():
+        metric = 'apschedulerui_' + name
+        labels = dict([label]) if label else {}
+
+        if name != family:
+            family = name
+            writer.family(metric, 'histogram', 'Overhead of apscheduler-ui: %s.' % name.replace('_', ' '))
+
+        for bound, count in histogram['buckets']:
+            writer.sample(metric + '_bucket', count, le=bound, **labels)
+
+        writer.sample(metric + '_bucket', histogram['count'], le='+Inf', **labels)
+        writer.sample(metric + '_sum', float(histogram['sum']), **labels)
+        writer.sample(metric + '_count', histogram['count'], **labels)
+
+
+def render(watcher, connected_clients=None):
+    """
+    Args:
+        watcher (apschedulerui.watcher.SchedulerWatcher):
+        connected_clients (int):
+            (Optional) The amount of clients connected to the UI.
+
+    Returns:
+        str: The metrics of the scheduler, its jobs, the watcher and the UI's overhead.
+    """
+    writer = MetricsWriter()
+    job_ids = watcher.job_ids()
+    states = dict.fromkeys(JOB_STATES, 0)
+    job_metrics = {}
+
+    for job_id in job_ids:
+        try:
+            state = job_state(watcher.jobs[job_id])
+            job_metrics[job_id] = watcher.job_metrics(job_id, DURATION_BUCKETS)
+        except KeyError:
+            # The job was removed and forgotten since we listed it.
+            continue
+
+        states[state] += 1
+
+    writer.family('apscheduler_scheduler_state', 'gauge', 'Whether the scheduler is in each state.')
+    current_state = watcher.scheduler_info.get('state')
+    for state in sorted(set(watcher.scheduler_states.values())):
+        writer.sample('apscheduler_scheduler_state', int(state == current_state), state=state)
+
+    writer.family('apscheduler_jobs', 'gauge', 'Tracked jobs, by state.')
+    for state in JOB_STATES:
+        writer.sample('apscheduler_jobs', states[state], state=state)
+
+    writer.family('apscheduler_job_events_total', 'counter', 'Execution events of each job.')
+    for job_id in job_metrics:
+        for event_name, count in job_metrics[job_id]['counts'].items():
+            writer.sample('apscheduler_job_events_total', count, job_id=job_id, event=event_name[len('job_'):])
+
+    writer.family('apscheduler_job_duration_seconds', 'histogram', 'Execution durations of each job.')
+    for job_id in job_metrics:
+        durations = job_metrics[job_id]['durations']
+
+        for bound, count in zip(DURATION_BUCKETS, durations['buckets']):
+            writer.sample('apscheduler_job_duration_seconds_bucket', count, job_id=job_id, le=bound)
+
+        writer.sample('apscheduler_job_duration_seconds_bucket', durations['count'], job_id=job_id, le='+Inf')
+        writer.sample('apscheduler_job_duration_seconds_sum', float(durations['sum']), job_id=job_id)
+        writer.sample('apscheduler_job_duration_seconds_count', durations['count'], job_id=job_id)
+
+    queue = watcher.event_queue
+    if queue is not None:
+        writer.family('apschedulerui_event_queue_size', 'gauge', 'Scheduler events waiting to be processed.')
+        writer.sample('apschedulerui_event_queue_size', len(queue))
+
+        writer.family('apschedulerui_event_queue_lag_seconds', 'gauge',
+                      'Time the oldest scheduler event waiting to be processed has been waiting.')
+        oldest = queue.peek()
+        lag = (datetime.now(tz=oldest[1].tzinfo) - oldest[1]).total_seconds() if oldest is not None else 0.0
+        writer.sample('apschedulerui_event_queue_lag_seconds', max(0.0, lag))
+
+        writer.family('apschedulerui_event_queue_dropped_total', 'counter',
+                      'Scheduler events dropped because the event queue was full.')
+        writer.sample('apschedulerui_event_queue_dropped_total', queue.dropped_events)
+
+        writer.family('apschedulerui_event_queue_coalesced_total', 'counter',
+                      'Scheduler events replaced by newer ones of the same kind because the event queue was full.')
+        writer.sample('apschedulerui_event_queue_coalesced_total', queue.coalesced_events)
+
+    if connected_clients is not None:
+        writer.family('apschedulerui_connected_clients', 'gauge', 'Clients connected to the UI.')
+        writer.sample('apschedulerui_connected_clients', connected_clients)
+
+    if watcher.instrumentation is not None:
+        render_instrumentation(writer, watcher.instrumentation)
+
+    return writer.render()
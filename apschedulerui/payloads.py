@@ -0,0 +1,139 @@
+"""
+Bounded representations of what job executions leave behind: their return values, exceptions and tracebacks.
+
+Events only carry a preview of each of them, of a few hundred bytes, so that a job returning a large object doesn't
+make every event of its history (and every message sent to clients) as large. The full text of the ones that didn't fit
+is kept once in a :class:`PayloadStore`, by the hash of its content, for clients to fetch when they need it (see the
+``/api/payload/<key>`` endpoint of :class:`~apschedulerui.web.SchedulerUI`).
+"""
+import hashlib
+import reprlib
+import threading
+from collections import OrderedDict
+
+#: The maximum size of the full text of a payload, in bytes. Longer texts are truncated to it.
+MAX_PAYLOAD_SIZE = 1048576
+
+_ELLIPSIS = '...'
+
+
+class SafeRepr(reprlib.Repr):
+    """
+    A :func:`repr` that never raises and bounds its output and the work it does on containers, however large they are.
+
+    Args:
+        max_size (int): The maximum length of the representations of strings, numbers and other objects.
+    """
+
+    def __init__(self, max_size=MAX_PAYLOAD_SIZE):
+        super().__init__()
+        self.maxlevel = 6
+        self.maxtuple = self.maxlist = self.maxarray = self.maxdict = self.maxset = self.maxfrozenset = \
+            self.maxdeque = 1000
+        self.maxstring = self.maxlong = self.maxother = max_size
+
+
+safe_repr = SafeRepr().repr
+
+
+def safe_str(value):
+    """
+    A :class:`str` that never raises, e.g. for exceptions whose message can't be rendered, falling back to
+    :func:`safe_repr`.
+    """
+    try:
+        return str(value)
+    except Exception:
+        return safe_repr(value)
+
+
+def truncate(text, max_bytes):
+    """
+    Truncates a text to a maximum amount of bytes, once encoded as UTF-8, marking the cut with an ellipsis.
+
+    Args:
+        text (str):
+        max_bytes (int):
+
+    Returns:
+        str: The text itself if it fits.
+    """
+    # Most texts are short enough that we don't need to encode them to know they fit.
+    if len(text) * 4 <= max_bytes:
+        return text
+
+    encoded = text.encode('utf-8', 'replace')
+    if len(encoded) <= max_bytes:
+        return text
+
+    return encoded[:max(0, max_bytes - len(_ELLIPSIS))].decode('utf-8', 'ignore') + _ELLIPSIS
+
+
+class PayloadStore:
+    """
+    Keeps the full text of payloads by the hash of their content, so that identical payloads (e.g. the tracebacks of a
+    job that keeps failing the same way) are kept once. Thread-safe.
+
+    The least recently stored payloads are evicted once their total size exceeds `max_bytes`.
+
+    Args:
+        max_bytes (int):
+            (Optional) The maximum total size of the payloads kept, in bytes. Defaults to 16 MiB.
+    """
+
+    def __init__(self, max_bytes=16777216):
+        if not isinstance(max_bytes, int):
+            raise TypeError('max_bytes should be an int')
+
+        if max_bytes <= 0:
+            raise ValueError('max_bytes should be a positive number')
+
+        self.max_bytes = max_bytes
+        self.size = 0
+
+        self._payloads = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._payloads)
+
+    def __contains__(self, key):
+        return key in self._payloads
+
+    def put(self, text):
+        """
+        Stores a payload, truncated to :data:`MAX_PAYLOAD_SIZE` bytes.
+
+        Args:
+            text (str):
+
+        Returns:
+            str: The key to get the payload with.
+        """
+        data = truncate(text, MAX_PAYLOAD_SIZE).encode('utf-8', 'replace')
+        key = hashlib.sha1(data).hexdigest()
+
+        with self._lock:
+            if key in self._payloads:
+                self._payloads.move_to_end(key)
+                return key
+
+            self._payloads[key] = data
+            self.size += len(data)
+
+            while self.size > self.max_bytes:
+                _, evicted = self._payloads.popitem(last=False)
+                self.size -= len(evicted)
+
+        return key
+
+    def get(self, key):
+        """
+        Args:
+            key (str):
+
+        Returns:
+            str: The payload, or :data:`None` if it's unknown or was evicted.
+        """
+        data = self._payloads.get(key)
+        return data.decode('utf-8') if data is not None else None
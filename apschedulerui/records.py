@@ -0,0 +1,173 @@
+"""
+Compact records of the state of jobs and of the events the watcher keeps in memory.
+
+Watchers of large schedulers keep hundreds of events per job, so these are slotted classes instead of dicts: they don't
+carry a hash table of their keys each, which takes most of the memory of a small dict. Timestamps are kept raw (see
+:meth:`~apschedulerui.watcher.SchedulerWatcher._repr_ts`) and event names are references to the same strings for every
+event.
+
+Records can be read (and written) like the dicts they replace, e.g. ``watcher.jobs[job_id]['properties']['name']``, and
+are converted to dicts with :meth:`Record.to_dict` when they leave the watcher: when they're notified to listeners,
+stored in a history backend or returned by its methods.
+
+Each type of event has a record class with the fields it carries and no others, so that the dicts of records have the
+same keys the events always had (e.g. only the events of finished executions have a ``retval``) and no slot is wasted.
+"""
+import sys
+
+
+def intern(value):
+    """
+    Interns strings, so that equal values repeated across jobs (e.g. their triggers) are kept once.
+    """
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class Record:
+    """
+    Base class of slotted records. Subclasses list all their fields, their bases' included, in :attr:`fields`. Fields
+    that aren't set are left out of the record's dict.
+    """
+
+    __slots__ = ()
+
+    fields = ()
+
+    def __init__(self, **values):
+        for key, value in values.items():
+            setattr(self, key, value)
+
+    def __getitem__(self, key):
+        if key not in self.fields:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self.fields:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self.fields and hasattr(self, key)
+
+    def __repr__(self):
+        return '%s(%s)' % (type(self).__name__, self.to_dict())
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in self.fields else default
+
+    def keys(self):
+        return [key for key in self.fields if hasattr(self, key)]
+
+    def to_dict(self):
+        """
+        Returns:
+            dict: The record's fields, with nested records converted as well.
+        """
+        try:
+            values = {key: getattr(self, key) for key in self.fields}
+        except AttributeError:
+            values = {key: getattr(self, key) for key in self.keys()}
+
+        for key, value in values.items():
+            if isinstance(value, Record):
+                values[key] = value.to_dict()
+
+        return values
+
+
+class JobProperties(Record):
+    """
+    The properties of a job, as seen when it was last added or modified. See
+    :meth:`~apschedulerui.watcher.SchedulerWatcher._repr_job`.
+    """
+
+    __slots__ = fields = (
+        'id', 'name', 'trigger', 'jobstore', 'executor', 'func', 'func_ref', 'args', 'kwargs', 'pending', 'coalesce',
+        'next_run_time', 'misfire_grace_time', 'max_instances'
+    )
+
+
+class JobRecord(Record):
+    """
+    The state of a tracked job: when it was added, modified and removed, its properties, the sequence number of its
+    latest event and its (bounded) event history.
+    """
+
+    __slots__ = fields = ('added_time', 'modified_time', 'removed_time', 'properties', 'seq', 'events')
+
+
+class EventRecord(Record):
+    """
+    An event of the scheduler itself (e.g. ``scheduler_paused``). Its ``seq`` is set when the watcher records it.
+    """
+
+    __slots__ = fields = ('event_name', 'event_ts', 'seq')
+
+
+class ExecutorEventRecord(EventRecord):
+    __slots__ = ('executor_name',)
+    fields = EventRecord.fields + __slots__
+
+
+class JobstoreEventRecord(EventRecord):
+    __slots__ = ('jobstore_name',)
+    fields = EventRecord.fields + __slots__
+
+
+class JobEventRecord(EventRecord):
+    """
+    An event of a job that carries nothing but the job's id, e.g. ``job_removed``.
+    """
+
+    __slots__ = ('job_id',)
+    fields = EventRecord.fields + __slots__
+
+
+class JobAddedRecord(JobEventRecord):
+    """
+    A ``job_added`` event, which carries the job's properties (shared with its state).
+    """
+
+    __slots__ = ('added_time', 'modified_time', 'removed_time', 'properties')
+    fields = JobEventRecord.fields + __slots__
+
+
+class JobModifiedRecord(JobEventRecord):
+    """
+    A ``job_modified`` event, which carries only the properties of the job that changed, as a dict.
+    """
+
+    __slots__ = ('changes',)
+    fields = JobEventRecord.fields + __slots__
+
+
+class ExecutionRecord(JobEventRecord):
+    """
+    An event of a job's execution that carries nothing but its scheduled run time, e.g. ``job_submitted``.
+    """
+
+    __slots__ = ('scheduled_run_time',)
+    fields = JobEventRecord.fields + __slots__
+
+
+class ExecutedRecord(ExecutionRecord):
+    """
+    The end of an execution, with a preview of its return value and the key of its full text if it didn't fit (see
+    :mod:`apschedulerui.payloads`).
+    """
+
+    __slots__ = ('retval', 'retval_ref')
+    fields = ExecutionRecord.fields + __slots__
+
+
+class ErrorRecord(ExecutedRecord):
+    __slots__ = ('exception', 'exception_ref', 'traceback', 'traceback_ref')
+    fields = ExecutedRecord.fields + __slots__
+
+
+#: The record class of each type of execution event that carries more than :class:`ExecutionRecord`.
+EXECUTION_RECORDS = {
+    'job_executed': ExecutedRecord,
+    'job_error': ErrorRecord
+}
@@ -0,0 +1,183 @@
+"""
+Searching jobs on the server, so that clients can ask for the page of matching jobs they'll display instead of having
+every job sent to them to filter.
+
+Queries are split in words and match the jobs that have, for every word, a field with a word that starts with it
+(case-insensitive). Words may be restricted to a field with a ``field:`` prefix, e.g. ``status:error report``.
+"""
+import re
+import threading
+from bisect import bisect_left, insort
+
+#: The job fields that are indexed.
+FIELDS = ('id', 'name', 'func_ref', 'trigger', 'jobstore', 'executor', 'status')
+
+_WORD = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text):
+    """
+    Returns the lowercase words (runs of letters and digits) of a text.
+
+    Args:
+        text (str):
+
+    Returns:
+        set[str]:
+    """
+    if text is None:
+        return set()
+    return set(_WORD.findall(str(text).lower()))
+
+
+class _FieldIndex:
+    """
+    Maps the words of a field to the ids of the jobs that have them, keeping the words sorted for prefix lookups.
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self.words = []
+
+    def add(self, job_id, words):
+        for word in words:
+            job_ids = self.postings.get(word)
+
+            if job_ids is None:
+                job_ids = self.postings[word] = set()
+                insort(self.words, word)
+
+            job_ids.add(job_id)
+
+    def remove(self, job_id, words):
+        for word in words:
+            job_ids = self.postings.get(word)
+
+            if job_ids is None:
+                continue
+
+            job_ids.discard(job_id)
+
+            if not job_ids:
+                del self.postings[word]
+                del self.words[bisect_left(self.words, word)]
+
+    def prefix_matches(self, prefix):
+        matches = set()
+
+        for i in range(bisect_left(self.words, prefix), len(self.words)):
+            if not self.words[i].startswith(prefix):
+                break
+            matches.update(self.postings[self.words[i]])
+
+        return matches
+
+
+class JobIndex:
+    """
+    An inverted index over the fields of jobs (see :data:`FIELDS`), updated field by field as jobs change.
+
+    Thread-safe. Matches are returned in the order jobs were first indexed.
+    """
+
+    def __init__(self):
+        self._fields = {field: _FieldIndex() for field in FIELDS}
+        # The words currently indexed for each job and field.
+        self._job_words = {}
+        # The position of each job, to sort matches.
+        self._order = {}
+        self._next_position = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._job_words)
+
+    def __contains__(self, job_id):
+        return job_id in self._job_words
+
+    def update(self, job_id, **fields):
+        """
+        Indexes the given fields of a job, replacing their previous values. Fields that aren't given are left as they
+        were.
+
+        Args:
+            job_id (str):
+            **fields: Values of the fields in :data:`FIELDS`.
+        """
+        unknown = set(fields) - set(FIELDS)
+        if unknown:
+            raise ValueError('Unknown job fields: %s' % ', '.join(sorted(unknown)))
+
+        with self._lock:
+            job_words = self._job_words.get(job_id)
+
+            if job_words is None:
+                job_words = self._job_words[job_id] = {}
+                self._order[job_id] = self._next_position
+                self._next_position += 1
+
+            for field, value in fields.items():
+                words = tokenize(value)
+                previous = job_words.get(field, set())
+
+                if words == previous:
+                    continue
+
+                self._fields[field].remove(job_id, previous - words)
+                self._fields[field].add(job_id, words - previous)
+                job_words[field] = words
+
+    def remove(self, job_id):
+        """
+        Drops a job from the index.
+
+        Args:
+            job_id (str):
+        """
+        with self._lock:
+            job_words = self._job_words.pop(job_id, None)
+
+            if job_words is None:
+                return
+
+            del self._order[job_id]
+
+            for field, words in job_words.items():
+                self._fields[field].remove(job_id, words)
+
+    def search(self, query):
+        """
+        Returns the ids of the jobs that match a query (see :mod:`apschedulerui.search`). Empty queries match every job.
+
+        Args:
+            query (str):
+
+        Returns:
+            list[str]: The ids of the matching jobs, in the order they were first indexed.
+        """
+        with self._lock:
+            matches = None
+
+            for term in (query or '').split():
+                field, _, text = term.partition(':')
+                field = field.lower()
+
+                if text and field in self._fields:
+                    fields = [field]
+                else:
+                    fields, text = FIELDS, term
+
+                for prefix in tokenize(text):
+                    term_matches = set()
+                    for name in fields:
+                        term_matches.update(self._fields[name].prefix_matches(prefix))
+
+                    matches = term_matches if matches is None else matches & term_matches
+
+                    if not matches:
+                        return []
+
+            if matches is None:
+                matches = self._order.keys()
+
+            return sorted(matches, key=self._order.__getitem__)
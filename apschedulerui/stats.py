@@ -0,0 +1,232 @@
+"""
+Execution statistics of jobs, aggregated as events come so that they cover every execution of a job (not only those
+still in its bounded event history) and cost the same to read however long the job has been running.
+"""
+import math
+
+#: The execution events that are counted, by name.
+COUNTED_EVENTS = ('job_submitted', 'job_executed', 'job_error', 'job_missed', 'job_max_instances')
+
+
+class QuantileSketch:
+    """
+    Approximates the quantiles of a stream of positive values in fixed memory.
+
+    Values are counted in logarithmically sized buckets, so that any quantile is estimated within `relative_accuracy`
+    of its actual value. Once there are more than `max_buckets` buckets, the lowest ones are merged: high quantiles stay
+    accurate, which are the ones that matter for durations.
+
+    Args:
+        relative_accuracy (float):
+            (Optional) Defaults to 1%.
+        max_buckets (int):
+            (Optional) Defaults to 1024, which covers values from a microsecond to several minutes without merging any
+            buckets at the default accuracy.
+        min_value (float):
+            (Optional) Values up to this one are counted together, as zeros. Defaults to a microsecond.
+    """
+
+    def __init__(self, relative_accuracy=0.01, max_buckets=1024, min_value=1e-6):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.max_buckets = max_buckets
+        self.min_value = min_value
+
+        self.count = 0
+        self.zero_count = 0
+        # Bucket i counts the values in (gamma ** (i - 1), gamma ** i].
+        self.buckets = {}
+        self._log_gamma = math.log(self.gamma)
+
+    def add(self, value):
+        self.count += 1
+
+        if value <= self.min_value:
+            self.zero_count += 1
+            return
+
+        i = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[i] = self.buckets.get(i, 0) + 1
+
+        if len(self.buckets) > self.max_buckets:
+            lowest = min(self.buckets)
+            merged = self.buckets.pop(lowest)
+            second = min(self.buckets)
+            self.buckets[second] += merged
+
+    def quantile(self, q):
+        """
+        Args:
+            q (float): Between 0 and 1.
+
+        Returns:
+            float: The estimated value of the quantile, or :data:`None` if no values were added.
+        """
+        if self.count == 0:
+            return None
+
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+
+        if rank < seen:
+            return 0.0
+
+        for i in sorted(self.buckets):
+            seen += self.buckets[i]
+            if rank < seen:
+                # The value in the middle (relative to the bucket's bounds) of the bucket.
+                return 2 * self.gamma ** i / (self.gamma + 1)
+
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+    def cumulative_counts(self, bounds):
+        """
+        Counts the values up to each of the given bounds, as the buckets of a histogram do. Values are attributed to a
+        bound if the middle value of their bucket is lower or equal to it.
+
+        Args:
+            bounds (list[float]): Sorted upper bounds.
+
+        Returns:
+            list[int]:
+        """
+        counts = []
+        seen = self.zero_count
+        buckets = sorted(self.buckets.items())
+        b = 0
+
+        for bound in bounds:
+            while b < len(buckets) and 2 * self.gamma ** buckets[b][0] / (self.gamma + 1) <= bound:
+                seen += buckets[b][1]
+                b += 1
+            counts.append(seen)
+
+        return counts
+
+
+class JobStats:
+    """
+    Execution statistics of a job, updated in constant time with each of its execution events.
+
+    Keeps counts of each execution event, the mean and variance (with Welford's online algorithm), extremes and
+    quantiles (see :class:`QuantileSketch`) of the durations of its executions, in seconds from their submission until
+    they finished or failed.
+
+    APScheduler notifies submissions once the executor has the job, so fast executions may end before their submission
+    is notified. Those are measured when it is, as taking no time.
+
+    Args:
+        max_pending (int):
+            (Optional) The maximum amount of submitted executions whose end we wait for (and of ended executions whose
+            submission we wait for), to measure their duration. Defaults to 100.
+    """
+
+    def __init__(self, max_pending=100):
+        self.max_pending = max_pending
+        self.counts = {event_name: 0 for event_name in COUNTED_EVENTS}
+
+        self.durations = QuantileSketch()
+        self.duration_mean = 0.0
+        self.duration_m2 = 0.0
+        self.duration_min = None
+        self.duration_max = None
+
+        # Submission timestamps of running executions, by their scheduled run time.
+        self._pending = {}
+        # End timestamps of executions whose submission wasn't notified yet, by their scheduled run time.
+        self._finished = {}
+
+    def add(self, event_name, event_ts, scheduled_run_time=None):
+        """
+        Args:
+            event_name (str):
+            event_ts (int): The event's raw timestamp, in microseconds.
+            scheduled_run_time (int): (Optional) The raw scheduled run time of the event's execution.
+        """
+        if event_name not in self.counts:
+            return
+
+        self.counts[event_name] += 1
+
+        if event_name == 'job_submitted':
+            finished_ts = self._finished.pop(scheduled_run_time, None)
+
+            if finished_ts is not None:
+                self.add_duration(max(0, finished_ts - event_ts) / 1e6)
+            else:
+                self._remember(self._pending, scheduled_run_time, event_ts)
+
+        elif event_name in ('job_executed', 'job_error'):
+            submitted_ts = self._pending.pop(scheduled_run_time, None)
+
+            if submitted_ts is not None:
+                self.add_duration(max(0, event_ts - submitted_ts) / 1e6)
+            else:
+                self._remember(self._finished, scheduled_run_time, event_ts)
+
+    def _remember(self, executions, scheduled_run_time, event_ts):
+        executions[scheduled_run_time] = event_ts
+
+        if len(executions) > self.max_pending:
+            # Forget the oldest execution, its other end probably went by without us noticing.
+            del executions[next(iter(executions))]
+
+    def add_duration(self, duration):
+        self.durations.add(duration)
+
+        # Welford's algorithm.
+        delta = duration - self.duration_mean
+        self.duration_mean += delta / self.durations.count
+        self.duration_m2 += delta * (duration - self.duration_mean)
+
+        if self.duration_min is None or duration < self.duration_min:
+            self.duration_min = duration
+        if self.duration_max is None or duration > self.duration_max:
+            self.duration_max = duration
+
+    def duration_quantile(self, q):
+        estimate = self.durations.quantile(q)
+
+        if estimate is None:
+            return None
+
+        # Estimates may fall slightly outside of the durations seen.
+        return min(max(estimate, self.duration_min), self.duration_max)
+
+    def histogram(self, bounds):
+        """
+        Args:
+            bounds (list[float]): Sorted upper bounds of the buckets, in seconds.
+
+        Returns:
+            dict: The cumulative count of durations up to each bound (see :meth:`QuantileSketch.cumulative_counts`),
+            along with the total count and sum of durations.
+        """
+        return {
+            'buckets': self.durations.cumulative_counts(bounds),
+            'count': self.durations.count,
+            'sum': self.duration_mean * self.durations.count
+        }
+
+    def summary(self):
+        """
+        Returns:
+            dict: The counts of each execution event, the error rate of finished executions and the durations' count,
+            mean, standard deviation, extremes and percentiles.
+        """
+        finished = self.counts['job_executed'] + self.counts['job_error']
+        n = self.durations.count
+
+        return {
+            'counts': dict(self.counts),
+            'error_rate': self.counts['job_error'] / finished if finished else None,
+            'duration': {
+                'count': n,
+                'mean': self.duration_mean if n else None,
+                'stdev': math.sqrt(self.duration_m2 / (n - 1)) if n > 1 else None,
+                'min': self.duration_min,
+                'max': self.duration_max,
+                'p50': self.duration_quantile(0.5),
+                'p95': self.duration_quantile(0.95),
+                'p99': self.duration_quantile(0.99)
+            }
+        }
@@ -1,11 +1,32 @@
+import itertools
 import logging
+import threading
+import time
 from abc import abstractmethod
-from datetime import datetime
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
 
 import apscheduler.events
 import apscheduler.schedulers.base
 
-from multiprocessing import RLock
+from apschedulerui.instrumentation import Instrumentation, TimedRLock
+from apschedulerui.payloads import PayloadStore, safe_repr, safe_str, truncate
+from apschedulerui.records import (EXECUTION_RECORDS, EventRecord, ExecutionRecord, ExecutorEventRecord, JobAddedRecord,
+                                   JobEventRecord, JobModifiedRecord, JobProperties, JobRecord, JobstoreEventRecord,
+                                   intern)
+from apschedulerui.search import JobIndex
+from apschedulerui.stats import JobStats
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Events that executors dispatch from their own threads. The scheduler dispatches every other event while holding the
+# lock of its jobstores, which our worker thread needs to look jobs up, so it can't wait for the worker to make room.
+_EXECUTOR_EVENTS = {
+    apscheduler.events.EVENT_JOB_EXECUTED, apscheduler.events.EVENT_JOB_ERROR, apscheduler.events.EVENT_JOB_MISSED
+}
+
+# The job properties that are indexed for searches. See :meth:`SchedulerWatcher._index_job`.
+_INDEXED_PROPERTIES = {'name', 'func_ref', 'trigger', 'jobstore', 'executor'}
 
 
 class SchedulerEventsListener:
@@ -47,6 +68,149 @@ class SchedulerEventsListener:
             event (dict):
         """
 
+    def _is_watching_job(self, job_id):
+        """
+        Whether the listener needs the projected next run times of the given job in its events. The watcher only
+        computes them when at least one of its listeners does.
+
+        Args:
+            job_id (str):
+
+        Returns:
+            bool:
+        """
+        return True
+
+
+class EventQueue:
+    """
+    A bounded FIFO of scheduler events waiting to be processed by the watcher's worker thread.
+
+    Args:
+        maxsize (int):
+            The maximum amount of events that can be waiting to be processed.
+
+        overflow_policy (str):
+            What to do with an incoming event when the queue is full:
+                * ``drop_oldest``: discard the oldest queued event to make room for the new one.
+                * ``coalesce``: replace a queued event of the same type for the same job (or alias) with the new one,
+                  falling back to ``drop_oldest`` if there's none.
+                * ``block``: wait until the worker thread makes room for the new event, unless the producer can't
+                  wait (see :meth:`put`), falling back to ``drop_oldest``.
+    """
+
+    overflow_policies = ('drop_oldest', 'coalesce', 'block')
+
+    def __init__(self, maxsize, overflow_policy='drop_oldest'):
+        if not isinstance(maxsize, int):
+            raise TypeError('maxsize should be an int')
+
+        if maxsize <= 0:
+            raise ValueError('maxsize should be a positive number')
+
+        if overflow_policy not in self.overflow_policies:
+            raise ValueError('overflow_policy should be one of %s' % ', '.join(self.overflow_policies))
+
+        self.maxsize = maxsize
+        self.overflow_policy = overflow_policy
+
+        self.dropped_events = 0
+        self.coalesced_events = 0
+
+        self._items = deque()
+        self._keys = {}
+        self._unfinished = 0
+
+        self._mutex = threading.Lock()
+        self._not_empty = threading.Condition(self._mutex)
+        self._not_full = threading.Condition(self._mutex)
+        self._all_done = threading.Condition(self._mutex)
+
+    def __len__(self):
+        return len(self._items)
+
+    def put(self, item, key=None, block=True):
+        """
+        Enqueues an item, applying the overflow policy if the queue is full.
+
+        Args:
+            item (list):
+                The event record. It's mutable so that a coalesced event can be replaced in place.
+            key (tuple):
+                (Optional) Identifies events that can be coalesced with each other.
+            block (bool):
+                (Optional) Whether the producer may wait for room with the ``block`` policy. Defaults to :data:`True`.
+        """
+        with self._mutex:
+            if len(self._items) >= self.maxsize:
+                if self.overflow_policy == 'block' and block:
+                    while len(self._items) >= self.maxsize:
+                        self._not_full.wait()
+                elif self.overflow_policy == 'coalesce' and key is not None and key in self._keys:
+                    self._keys[key][:-1] = item
+                    self.coalesced_events += 1
+                    return
+                else:
+                    self._forget(self._items.popleft())
+                    self._unfinished -= 1
+                    self.dropped_events += 1
+
+            if key is not None:
+                self._keys[key] = item
+                item.append(key)
+            else:
+                item.append(None)
+
+            self._items.append(item)
+            self._unfinished += 1
+            self._not_empty.notify()
+
+    def get(self):
+        """
+        Blocks until there's an event in the queue and returns it.
+
+        Returns:
+            list: The event record, as it was enqueued.
+        """
+        with self._mutex:
+            while not self._items:
+                self._not_empty.wait()
+
+            item = self._items.popleft()
+            self._forget(item)
+            self._not_full.notify()
+
+            return item[:-1]
+
+    def peek(self):
+        """
+        Returns:
+            list: The oldest event record in the queue, or :data:`None` if it's empty.
+        """
+        with self._mutex:
+            return self._items[0][:-1] if self._items else None
+
+    def task_done(self):
+        with self._mutex:
+            self._unfinished -= 1
+            if self._unfinished <= 0:
+                self._all_done.notify_all()
+
+    def join(self, timeout=None):
+        """
+        Waits until every enqueued event has been processed.
+
+        Returns:
+            bool: :data:`False` if the timeout expired before the queue was drained.
+        """
+        with self._mutex:
+            return self._all_done.wait_for(lambda: self._unfinished <= 0, timeout=timeout)
+
+    def _forget(self, item):
+        key = item[-1]
+        if key is not None and self._keys.get(key) is item:
+            del self._keys[key]
+
 
 class SchedulerWatcher:
 
@@ -81,7 +245,19 @@ class SchedulerWatcher:
         apscheduler.events.EVENT_JOB_MAX_INSTANCES: 'job_max_instances'
     }
 
-    def __init__(self, scheduler, max_events_per_job=100):
+    # Events after which a job's next run time (or its trigger) may have changed.
+    next_run_time_events = {'job_added', 'job_modified', 'job_submitted', 'job_missed', 'job_max_instances'}
+
+    # Amount of locks job state is sharded across, so that events of different jobs don't serialize on each other.
+    job_lock_stripes = 64
+
+    # Aggregates the execution events of each job. See :meth:`job_stats`.
+    job_stats_class = JobStats
+
+    def __init__(self, scheduler, max_events_per_job=100, async_events=False, event_queue_size=10000,
+                 overflow_policy='drop_oldest', next_run_times_depth=11, replay_log_size=10000, instrument=False,
+                 history=None, removed_jobs_retention=None, max_removed_jobs=None, payload_preview_size=1024,
+                 payload_store_size=16777216):
         """
         Inspects the scheduler, registers itself as a scheduler event listener and keeps track of all changes to the
         scheduler and its jobs.
@@ -92,23 +268,147 @@ class SchedulerWatcher:
 
             max_events_per_job (int):
                 The maximum amount of events we'll keep in-memory for each job to send to the clients when they connect.
+                With a `history` backend, this is only the hot window of each job's history.
+
+            async_events (bool):
+                (Optional) If :data:`True`, scheduler events are only enqueued by the thread that dispatches them and
+                processed (and notified to listeners) by a dedicated worker thread, so that the scheduler doesn't pay
+                for our bookkeeping. Defaults to :data:`False`.
+
+            event_queue_size (int):
+                (Optional) The maximum amount of events waiting to be processed when `async_events` is enabled.
+
+            overflow_policy (str):
+                (Optional) What to do when the event queue is full: ``drop_oldest`` (default), ``coalesce`` or
+                ``block``. See :class:`EventQueue`. Only the events of finished executions block, every other event
+                is dispatched while the scheduler holds a lock the worker thread needs.
+
+            next_run_times_depth (int):
+                (Optional) The amount of upcoming run times projected for each job. Defaults to 11.
+
+            replay_log_size (int):
+                (Optional) The amount of most recent events (of any kind) kept to be replayed to clients that reconnect.
+                See :meth:`events_since`. Defaults to 10000.
+
+            instrument (bool):
+                (Optional) If :data:`True`, the time spent processing each type of event, holding the write lock and
+                projecting run times is measured in :attr:`instrumentation` (see :mod:`apschedulerui.instrumentation`).
+                Defaults to :data:`False`, as measuring adds some overhead to every event.
+
+            history (apschedulerui.history.HistoryBackend):
+                (Optional) Where every job event is stored as well, to be queried with :meth:`query_events` beyond the
+                events kept in memory. E.g. a :class:`~apschedulerui.history.SQLiteHistory`.
+
+            removed_jobs_retention (float):
+                (Optional) The amount of seconds removed jobs are kept for, with their state and event history, before
+                being forgotten. With a `history` backend, their events can still be queried from it. Removed jobs are
+                kept forever by default.
+
+            max_removed_jobs (int):
+                (Optional) The maximum amount of removed jobs kept. The ones removed the longest ago are forgotten
+                first. Unlimited by default.
+
+            payload_preview_size (int):
+                (Optional) The maximum size, in bytes, of the return values, exceptions and tracebacks carried by
+                events. Longer ones are truncated (see :mod:`apschedulerui.payloads`). Defaults to 1024.
+
+            payload_store_size (int):
+                (Optional) The maximum total size, in bytes, of the full text of the truncated return values,
+                exceptions and tracebacks kept in :attr:`payloads`. Defaults to 16 MiB. If :data:`None`, they aren't
+                kept.
         """
+        if not isinstance(payload_preview_size, int) or payload_preview_size <= 0:
+            raise ValueError('payload_preview_size should be a positive int')
+
+        if removed_jobs_retention is not None and removed_jobs_retention <= 0:
+            raise ValueError('removed_jobs_retention should be a positive number of seconds')
+
+        if max_removed_jobs is not None and (not isinstance(max_removed_jobs, int) or max_removed_jobs < 0):
+            raise ValueError('max_removed_jobs should be a non-negative int')
+
         self.scheduler = scheduler
         self.listeners = []
         self.max_events_per_job = max_events_per_job
+        self.history = history
+        self.next_run_times_depth = next_run_times_depth
+        self.removed_jobs_retention = removed_jobs_retention
+        self.max_removed_jobs = max_removed_jobs
+        self.payload_preview_size = payload_preview_size
 
         self.jobstores = {}
         self.executors = {}
         self.scheduler_info = {}
         self.jobs = {}
 
-        self.write_lock = RLock()
+        # Projected run times of each job, as a (next_run_time, [run times]) tuple. See :meth:`get_next_run_times`.
+        self._next_run_times = {}
+
+        # The objects the function, arguments and trigger of each job were represented from, and their representations,
+        # as a pair of (func, args, kwargs, trigger) tuples. See :meth:`_repr_job`.
+        self._job_reprs = {}
+
+        # Searchable fields of the jobs, kept up to date as events come. See :meth:`search_jobs`.
+        self.index = JobIndex()
+
+        # Execution statistics of each job, which outlive the job's bounded event history. See :meth:`job_stats`.
+        self.stats = {}
+
+        # Full text of the return values, exceptions and tracebacks truncated in events. See :meth:`_repr_payload`.
+        self.payloads = PayloadStore(payload_store_size) if payload_store_size is not None else None
+
+        # The removal timestamps of removed jobs, in the order they were removed, so that the ones to forget are always
+        # first. See :meth:`_evict_removed_jobs`.
+        self._removed_jobs = OrderedDict()
+        # When the first of them is due to be forgotten for its age.
+        self._next_eviction_ts = None
+
+        # Every event gets a sequence number, so that clients can tell which events they've already seen. The
+        # instance id tells clients whether sequence numbers come from the same watcher they saw before.
+        self.instance_id = '%x-%x' % (int(time.time() * 1000000), id(self))
+        self.last_seq = 0
+        self._sequence_lock = threading.Lock()
+        # The most recent events, in sequence order.
+        self.replay_log = deque(maxlen=replay_log_size)
+        # The most recently forgotten jobs, with the last sequence number at the time. See forgotten_job_ids.
+        self._forgotten_jobs = OrderedDict()
+        self._max_forgotten_jobs = replay_log_size
+        # Jobs forgotten up to this sequence number aren't all known anymore.
+        self._forgotten_jobs_seq = None
+
+        self.instrumentation = Instrumentation() if instrument else None
+
+        # Guards the watcher's structure (the set of jobs, jobstores, executors and scheduler info). It must always be
+        # acquired *before* any job lock, never while holding one.
+        if self.instrumentation is not None:
+            self.write_lock = TimedRLock(self.instrumentation.histogram('write_lock_held_seconds'))
+        else:
+            self.write_lock = threading.RLock()
+        self._job_locks = [threading.RLock() for _ in range(self.job_lock_stripes)]
+
+        self.event_queue = None
+        self._worker_thread = None
 
-        with self.write_lock:
-            # Append ourselves as listeners of the scheduler first.
-            self.scheduler.add_listener(self._process_event, mask=apscheduler.events.EVENT_ALL)
-            # Inspect scheduler to init our attributes.
-            self._inspect_scheduler()
+        if async_events:
+            self.event_queue = EventQueue(event_queue_size, overflow_policy=overflow_policy)
+            self._worker_thread = threading.Thread(target=self._process_queued_events, name='apscheduler-ui-events')
+            self._worker_thread.daemon = True
+            self._worker_thread.start()
+
+            if self.instrumentation is not None:
+                self.instrumentation.gauge('event_queue_size', self.event_queue.__len__)
+                self.instrumentation.gauge('event_queue_dropped', lambda: self.event_queue.dropped_events)
+
+        # Append ourselves as listeners of the scheduler first, so that we don't miss events while inspecting it.
+        self.scheduler.add_listener(self._process_event, mask=apscheduler.events.EVENT_ALL)
+        # Inspect scheduler to init our attributes. We don't hold our locks while doing so, as the scheduler might be
+        # holding its own ones while notifying us of events from other threads.
+        self._inspect_scheduler()
+
+    def _job_lock(self, job_id):
+        """
+        Returns the lock that guards the state and event history of the given job.
+        """
+        return self._job_locks[hash(job_id) % self.job_lock_stripes]
 
     def add_listener(self, listener: SchedulerEventsListener):
         if listener not in self.listeners:
@@ -138,7 +438,7 @@ class SchedulerWatcher:
         init_ts = self._repr_ts(datetime.now(tz=self.scheduler.timezone))
 
         if len(self.jobstores) > 0:
-            for jobstore_alias in self.jobstores.keys():
+            for jobstore_alias in list(self.jobstores.keys()):
                 self._jobstore_added(jobstore_alias, init_ts)
         else:
             for job in self.scheduler.get_jobs():
@@ -152,9 +452,63 @@ class SchedulerWatcher:
             event (apscheduler.events.SchedulerEvent):
         """
         if event.code in self.apscheduler_events:
-            event_ts = self._repr_ts(datetime.now(tz=self.scheduler.timezone))
-            event_name = self.apscheduler_events[event.code]
-            self.__getattribute__(event_name)(event, event_name, event_ts)
+            start = time.perf_counter()
+            event_ts = datetime.now(tz=self.scheduler.timezone)
+
+            if self.event_queue is None:
+                self._handle_event(event, event_ts)
+            else:
+                key = (event.code, getattr(event, 'job_id', None), getattr(event, 'alias', None))
+                self.event_queue.put([event, event_ts], key=key, block=event.code in _EXECUTOR_EVENTS)
+
+            if self.instrumentation is not None:
+                # What each event costs the thread that dispatched it.
+                self.instrumentation.observe(
+                    'process_event_seconds', time.perf_counter() - start, ('event', self.apscheduler_events[event.code])
+                )
+
+    def _handle_event(self, event, event_ts):
+        event_name = self.apscheduler_events[event.code]
+        event_ts = self._repr_ts(event_ts)
+        self.__getattribute__(event_name)(event, event_name, event_ts)
+
+        if self._removed_jobs:
+            self._evict_removed_jobs(event_ts)
+
+    def _process_queued_events(self):
+        """
+        Worker thread loop that processes the events enqueued by :meth:`_process_event` in async mode.
+        """
+        while True:
+            event, event_ts = self.event_queue.get()
+            try:
+                self._handle_event(event, event_ts)
+            except Exception:
+                logging.getLogger('apschedulerui').exception('Failed to process scheduler event %s' % event)
+            finally:
+                self.event_queue.task_done()
+
+    def flush(self, timeout=None):
+        """
+        Waits until all queued events have been processed and, with a `history` backend, stored. Returns immediately
+        if `async_events` is disabled and there's no `history` backend.
+
+        Args:
+            timeout (float):
+                (Optional) The maximum amount of seconds to wait.
+
+        Returns:
+            bool: :data:`False` if the timeout expired before all events were processed.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        if self.event_queue is not None and not self.event_queue.join(timeout=timeout):
+            return False
+
+        if self.history is not None:
+            return self.history.flush(timeout=None if deadline is None else max(0, deadline - time.monotonic()))
+
+        return True
 
     def scheduler_started(self, event, event_name, event_ts):
         """
@@ -239,8 +593,8 @@ class SchedulerWatcher:
             event (apscheduler.events.SchedulerEvent):
         """
         with self.write_lock:
-            for job_id in self.jobs.keys():
-                if self.jobs[job_id]['properties']['jobstore'] == event.alias:
+            for job_id in list(self.jobs.keys()):
+                if self.jobs[job_id].properties.jobstore == event.alias:
                     self._job_removed(job_id, event_ts)
 
             if event.alias in self.jobstores:
@@ -254,7 +608,7 @@ class SchedulerWatcher:
             event (apscheduler.events.SchedulerEvent):
         """
         with self.write_lock:
-            for job_id in self.jobs.keys():
+            for job_id in list(self.jobs.keys()):
                 self._job_removed(job_id, removal_ts=event_ts)
 
     def job_added(self, event, event_name, event_ts):
@@ -283,8 +637,11 @@ class SchedulerWatcher:
         Args:
             event (apscheduler.events.JobExecutionEvent):
         """
+        retval, retval_ref = self._repr_payload(event.retval)
+
         self._job_execution_event(event.job_id, event.jobstore, event_name, event_ts,
-                                  retval=event.retval,
+                                  retval=retval,
+                                  retval_ref=retval_ref,
                                   scheduled_run_time=self._repr_ts(event.scheduled_run_time))
 
     def job_error(self, event, event_name, event_ts):
@@ -292,10 +649,17 @@ class SchedulerWatcher:
         Args:
             event (apscheduler.events.JobExecutionEvent):
         """
+        retval, retval_ref = self._repr_payload(event.retval)
+        exception, exception_ref = self._repr_payload(safe_str(event.exception))
+        traceback, traceback_ref = self._repr_payload(safe_str(event.traceback))
+
         self._job_execution_event(event.job_id, event.jobstore, event_name, event_ts,
-                                  retval=event.retval,
-                                  exception=str(event.exception),
-                                  traceback=str(event.traceback),
+                                  retval=retval,
+                                  retval_ref=retval_ref,
+                                  exception=exception,
+                                  exception_ref=exception_ref,
+                                  traceback=traceback,
+                                  traceback_ref=traceback_ref,
                                   scheduled_run_time=self._repr_ts(event.scheduled_run_time))
 
     def job_missed(self, event, event_name, event_ts):
@@ -322,180 +686,704 @@ class SchedulerWatcher:
         self._job_execution_event(event.job_id, event.jobstore, event_name, event_ts,
                                   scheduled_run_time=self._repr_ts(event.scheduled_run_times[0]))
 
-    def scheduler_summary(self):
+    def scheduler_summary(self, job_ids=None, since_seq=None, max_events=None):
+        """
+        Returns the state of the scheduler and of its jobs.
+
+        Args:
+            job_ids (list[str]):
+                (Optional) The jobs to include in the summary. Defaults to all jobs.
+            since_seq (int):
+                (Optional) See :meth:`job_summary`.
+            max_events (int):
+                (Optional) See :meth:`job_summary`.
+
+        Returns:
+            dict:
+        """
+        if job_ids is None:
+            job_ids = self.job_ids()
+
         return {
             'executors': {name: str(executor) for name, executor in self.executors.items()},
             'jobstores': {name: str(jobstore) for name, jobstore in self.jobstores.items()},
             'scheduler': self.scheduler_info,
-            'jobs': self.jobs
+            'jobs': self.job_summaries(job_ids, since_seq, max_events)
         }
 
+    def job_summaries(self, job_ids, since_seq=None, max_events=None):
+        """
+        Returns the summaries of the given jobs (see :meth:`job_summary`), skipping the ones that aren't tracked, e.g.
+        because they were forgotten since their ids were listed (see `max_removed_jobs`).
+
+        Args:
+            job_ids (list[str]):
+            since_seq (int):
+                (Optional) See :meth:`job_summary`.
+            max_events (int):
+                (Optional) See :meth:`job_summary`.
+
+        Returns:
+            dict: The summary of each job, by id.
+        """
+        summaries = {}
+
+        for job_id in job_ids:
+            try:
+                summaries[job_id] = self.job_summary(job_id, since_seq, max_events)
+            except KeyError:
+                continue
+
+        return summaries
+
+    def job_ids(self, since_seq=None):
+        """
+        Returns the ids of the tracked jobs, in the order they were added.
+
+        Args:
+            since_seq (int):
+                (Optional) Only return jobs that had events after the given sequence number.
+
+        Returns:
+            list[str]:
+        """
+        with self.write_lock:
+            if since_seq is None:
+                return list(self.jobs.keys())
+            return [job_id for job_id, job in self.jobs.items() if job.seq > since_seq]
+
+    def job_summary(self, job_id, since_seq=None, max_events=None):
+        """
+        Returns a consistent copy of a job's state and event history, safe to serialize while events keep coming.
+
+        Args:
+            job_id (str):
+            since_seq (int):
+                (Optional) Only include the events that came after the given sequence number.
+            max_events (int):
+                (Optional) Only include up to this amount of the job's most recent events.
+
+        Returns:
+            dict: The job state, with its events as a list ordered from oldest to newest and its execution statistics
+            (see :meth:`job_stats`).
+        """
+        with self._job_lock(job_id):
+            job = self.jobs[job_id]
+            summary = job.to_dict()
+            events = list(job.events)
+            summary['stats'] = self.stats[job_id].summary()
+
+        if since_seq is not None:
+            events = [e for e in events if e.seq > since_seq]
+
+        if max_events is not None:
+            events = events[-max_events:] if max_events > 0 else []
+
+        summary['events'] = [e.to_dict() for e in events]
+        summary['next_run_times'] = self.get_next_run_times(job_id)
+
+        return summary
+
+    def job_stats(self, job_id):
+        """
+        Returns the execution statistics of a job, aggregated over all of its executions since it was added (see
+        :meth:`apschedulerui.stats.JobStats.summary`).
+
+        Args:
+            job_id (str):
+
+        Returns:
+            dict:
+        """
+        with self._job_lock(job_id):
+            return self.stats[job_id].summary()
+
+    def job_metrics(self, job_id, duration_bounds):
+        """
+        Returns the counts of a job's execution events and the histogram of its execution durations, which cost the
+        same to compute however many events the job had.
+
+        Args:
+            job_id (str):
+            duration_bounds (list[float]):
+                Sorted upper bounds of the histogram buckets, in seconds. See
+                :meth:`apschedulerui.stats.JobStats.histogram`.
+
+        Returns:
+            dict:
+        """
+        with self._job_lock(job_id):
+            stats = self.stats[job_id]
+            return {'counts': dict(stats.counts), 'durations': stats.histogram(duration_bounds)}
+
+    def query_events(self, job_id=None, since_ts=None, until_ts=None, limit=None):
+        """
+        Returns the events of a job (or of every job) within a time range, from the `history` backend if there's one
+        and from the events kept in memory, which the backend may not have stored yet.
+
+        Args:
+            job_id (str):
+                (Optional) Defaults to the events of every job.
+            since_ts (int):
+                (Optional) Only events at or after this raw timestamp (see :meth:`_repr_ts`).
+            until_ts (int):
+                (Optional) Only events at or before this raw timestamp.
+            limit (int):
+                (Optional) Only the most recent `limit` events of the range.
+
+        Returns:
+            list[dict]: The events, ordered from oldest to newest.
+        """
+        if limit is not None and limit <= 0:
+            return []
+
+        memory_since_ts = since_ts
+        if self.history is not None:
+            # The backend has the events up to its latest stored one, only the more recent ones are needed from memory.
+            stored_ts = self.history.stored_until()
+            if stored_ts is not None and (since_ts is None or stored_ts > since_ts):
+                memory_since_ts = stored_ts
+
+        records = []
+
+        for event_job_id in ([job_id] if job_id is not None else self.job_ids()):
+            with self._job_lock(event_job_id):
+                job = self.jobs.get(event_job_id)
+                if job is not None:
+                    records.extend(self._events_in_range(job.events, memory_since_ts, until_ts, limit))
+
+        # Only the events that made it through the limit are converted.
+        records.sort(key=lambda e: e.event_ts)
+        if limit is not None:
+            records = records[-limit:]
+
+        events = [e.to_dict() for e in records]
+
+        if self.history is not None:
+            stored = []
+
+            for e in self.history.events(job_id, since_ts, until_ts, limit):
+                if e.pop('instance', None) != self.instance_id:
+                    # Sequence numbers of other instances (i.e. from before a restart) mean nothing to clients.
+                    e.pop('seq', None)
+                stored.append(e)
+
+            # Events kept in memory are most likely stored already, unless they're very recent.
+            seen = {e['seq'] for e in stored if 'seq' in e}
+            events = stored + [e for e in events if e['seq'] not in seen]
+
+        events.sort(key=lambda e: e['event_ts'])
+
+        if limit is not None:
+            events = events[-limit:] if limit > 0 else []
+
+        return events
+
+    @staticmethod
+    def _events_in_range(events, since_ts=None, until_ts=None, limit=None):
+        """
+        Returns the most recent `limit` events of a job's history within a time range, newest first. Events are kept in
+        the order they happened, so this stops at the first one older than the range.
+        """
+        in_range = []
+
+        for event in reversed(events):
+            if until_ts is not None and event.event_ts > until_ts:
+                continue
+            if since_ts is not None and event.event_ts < since_ts:
+                break
+
+            in_range.append(event)
+            if limit is not None and len(in_range) >= limit:
+                break
+
+        return in_range
+
+    def search_jobs(self, query):
+        """
+        Returns the ids of the jobs whose id, name, function reference, trigger, jobstore, executor or status (the name
+        of their latest event) match a query. See :mod:`apschedulerui.search` for the query syntax.
+
+        Args:
+            query (str):
+
+        Returns:
+            list[str]: The ids of the matching jobs, in the order they were added.
+        """
+        return self.index.search(query)
+
+    def get_next_run_times(self, job_id, refresh=False, job=None):
+        """
+        Returns the projected next run times of a job.
+
+        Projections are cached per job and keyed on its next run time: when the scheduler advances it, the cached
+        projection is shifted and only the missing run times at its tail are computed, so a walk through the trigger
+        costs one step per execution instead of `next_run_times_depth` steps.
+
+        Args:
+            job_id (str):
+            refresh (bool):
+                (Optional) If :data:`True`, looks the job up in the scheduler to check if its next run time changed.
+                Otherwise the cached projection is returned, if there's one.
+            job (apscheduler.job.Job):
+                (Optional) The job, if the caller has already looked it up.
+
+        Returns:
+            list[int]: The raw timestamps of the projected run times (see :meth:`_repr_ts`).
+        """
+        return [self._repr_ts(ts) for ts in self._project_next_run_times(job_id, refresh, job)]
+
+    def _project_next_run_times(self, job_id, refresh=False, job=None):
+        cached = self._next_run_times.get(job_id)
+
+        if cached is not None and not refresh and job is None:
+            return cached[1]
+
+        if job is None:
+            job = self.scheduler.get_job(job_id)
+
+        next_run_time = getattr(job, 'next_run_time', None)
+
+        if next_run_time is None:
+            projection = []
+        elif cached is not None and cached[0] == next_run_time:
+            return cached[1]
+        elif cached is not None and next_run_time in cached[1]:
+            projection = cached[1][cached[1].index(next_run_time):]
+        else:
+            projection = [next_run_time]
+
+        start = time.perf_counter()
+
+        while 0 < len(projection) < self.next_run_times_depth:
+            run_time = job.trigger.get_next_fire_time(projection[-1], projection[-1])
+            if run_time is None:
+                break
+            projection.append(run_time)
+
+        if self.instrumentation is not None:
+            self.instrumentation.observe('trigger_walk_seconds', time.perf_counter() - start)
+
+        with self._job_lock(job_id):
+            self._next_run_times[job_id] = (next_run_time, projection)
+
+        return projection
+
+    def events_since(self, since_seq):
+        """
+        Returns the events that came after the given sequence number, so that a client that missed them can catch up.
+
+        Args:
+            since_seq (int): The sequence number of the last event the client saw.
+
+        Returns:
+            list[dict]: The events, ordered from oldest to newest, or :data:`None` if some of them were already evicted
+            from the replay log (or `since_seq` is unknown to us).
+        """
+        with self._sequence_lock:
+            missed = self.last_seq - since_seq
+
+            if missed < 0 or missed > len(self.replay_log):
+                return None
+
+            events = list(itertools.islice(reversed(self.replay_log), missed))
+
+        events.reverse()
+        return [e.to_dict() for e in events]
+
+    def forgotten_job_ids(self, since_seq):
+        """
+        Returns the ids of the removed jobs that were forgotten (see `removed_jobs_retention` and `max_removed_jobs`)
+        since the given sequence number, so that clients that only get what changed since then stop showing them.
+
+        Args:
+            since_seq (int): The sequence number of the last event the client saw.
+
+        Returns:
+            list[str]: The ids, or :data:`None` if some jobs forgotten since then are no longer known.
+        """
+        with self.write_lock:
+            if self._forgotten_jobs_seq is not None and since_seq <= self._forgotten_jobs_seq:
+                return None
+
+            return [job_id for job_id, seq in self._forgotten_jobs.items() if seq >= since_seq]
+
     def notify_scheduler_event(self, event_name, event_ts):
-        for listener in self.listeners:
-            listener._scheduler_event({
-                'event_name': event_name,
-                'event_ts': event_ts
-            })
+        event = EventRecord(event_name=event_name, event_ts=event_ts)
+        self._record_event(event)
 
-    def notify_job_event(self, event):
-        event['next_run_times'] = []
+        event = event.to_dict()
+        for listener in self.listeners:
+            listener._scheduler_event(event)
 
-        job = self.scheduler.get_job(job_id=event['job_id'])
+    def notify_job_event(self, event, job=None):
+        """
+        Notifies listeners of a job event, adding to it the job's projected next run times if any listener is watching
+        the job.
 
-        if job:
-            next_run_time = job.next_run_time
-            while next_run_time and len(event['next_run_times']) < 11:
-                event['next_run_times'].append(self._repr_ts(next_run_time))
-                next_run_time = job.trigger.get_next_fire_time(next_run_time, next_run_time)
+        Args:
+            event (apschedulerui.records.JobEventRecord):
+            job (apscheduler.job.Job):
+                (Optional) The job, if the caller has already looked it up.
+        """
+        job_id = event.job_id
+        event_name = event.event_name
+        event = event.to_dict()
+
+        if any(listener._is_watching_job(job_id) for listener in self.listeners):
+            if event_name == 'job_removed':
+                next_run_times = []
+            else:
+                next_run_times = self.get_next_run_times(
+                    job_id, refresh=event_name in self.next_run_time_events, job=job
+                )
+            # Projections go only to listeners: the event kept in the job's history doesn't need them.
+            event['next_run_times'] = next_run_times
+        elif event_name in self.next_run_time_events:
+            # Nobody is watching, so we skip walking the trigger. The cached projection is stale now though, so drop it
+            # for it to be computed again whenever someone asks for it.
+            with self._job_lock(job_id):
+                self._next_run_times.pop(job_id, None)
 
         for listener in self.listeners:
             listener._job_event(event)
 
     def notify_executor_event(self, event_name, event_ts, executor_name):
+        event = ExecutorEventRecord(event_name=event_name, event_ts=event_ts, executor_name=executor_name)
+        self._record_event(event)
+
+        event = event.to_dict()
         for listener in self.listeners:
-            listener._executor_event({
-                'event_name': event_name,
-                'event_ts': event_ts,
-                'executor_name': executor_name
-            })
+            listener._executor_event(event)
 
     def notify_jobstore_event(self, event_name, event_ts, jobstore_name):
+        event = JobstoreEventRecord(event_name=event_name, event_ts=event_ts, jobstore_name=jobstore_name)
+        self._record_event(event)
+
+        event = event.to_dict()
         for listener in self.listeners:
-            listener._jobstore_event({
-                'event_name': event_name,
-                'event_ts': event_ts,
-                'jobstore_name': jobstore_name
-            })
+            listener._jobstore_event(event)
 
     def _job_added(self, job_id, jobstore, added_ts, job=None):
-        with self.write_lock:
-            if job_id in self.jobs:
-                return
+        if job_id in self.jobs:
+            return
 
-            self.jobs[job_id] = {
-                'added_time': added_ts,
-                'modified_time': added_ts,
-                'removed_time': None,
-                'properties': self._repr_job(
-                    self.scheduler.get_job(job_id, jobstore) if job is None else job,
-                    jobstore=jobstore
-                ),
-                'events': []
-            }
+        if job is None:
+            # Look the job up before taking our locks: the scheduler may be holding its own while notifying us.
+            job = self.scheduler.get_job(job_id, jobstore)
 
-            event = {
-                'job_id': job_id,
-                'event_name': 'job_added',
-                'event_ts': added_ts
-            }
+            if job is None:
+                # The job is already gone (e.g. a one-off job that ran before we got to inspect it).
+                return
+
+        with self.write_lock, self._job_lock(job_id):
+            if job_id in self.jobs:
+                return
 
-            event.update(self.jobs[job_id])
+            self._next_run_times.pop(job_id, None)
+            # A job added again with the id of a forgotten one must not be forgotten by clients.
+            self._forgotten_jobs.pop(job_id, None)
+
+            self.stats[job_id] = self.job_stats_class()
+            self.jobs[job_id] = JobRecord(
+                added_time=added_ts,
+                modified_time=added_ts,
+                removed_time=None,
+                properties=self._repr_job(job, jobstore=jobstore),
+                seq=0,
+                # Ring buffer: appending to a full history evicts its oldest event in O(1).
+                events=deque(maxlen=self.max_events_per_job)
+            )
+            self._index_job(job_id, 'job_added')
+
+            event = JobAddedRecord(
+                job_id=job_id,
+                event_name='job_added',
+                event_ts=added_ts,
+                added_time=added_ts,
+                modified_time=added_ts,
+                removed_time=None,
+                properties=self.jobs[job_id].properties
+            )
 
             self._append_job_event(event)
 
-        self.notify_job_event(event)
+        self.notify_job_event(event, job=job)
 
     def _job_modified(self, job_id, jobstore, event_ts):
-        with self.write_lock:
-            self.jobs[job_id]['properties'] = self._repr_job(
-                self.scheduler.get_job(job_id, jobstore),
-                jobstore=jobstore
-            )
-            self.jobs[job_id]['modified_time'] = event_ts
+        job = self.scheduler.get_job(job_id, jobstore)
+
+        if job is None:
+            # The job was removed before we got to process its modification, its removal comes next.
+            return
 
-            event = {
-                'job_id': job_id,
-                'event_name': 'job_modified',
-                'event_ts': event_ts,
-                'properties': self.jobs[job_id]['properties']
+        if job_id not in self.jobs:
+            # We're still inspecting the scheduler and haven't seen this job yet.
+            return self._job_added(job_id, jobstore, event_ts, job)
+
+        with self._job_lock(job_id):
+            if job_id not in self.jobs:
+                # The job was removed and forgotten meanwhile.
+                return
+
+            cached = self._job_reprs.get(job_id)
+            if cached is None or cached[0][3] is not job.trigger:
+                # The trigger changed, so the projected run times may have too, even if the next run time didn't.
+                self._next_run_times.pop(job_id, None)
+
+            state = self.jobs[job_id]
+            properties = self._repr_job(job, jobstore=jobstore)
+            changes = {
+                key: getattr(properties, key) for key in properties.fields
+                if getattr(properties, key) != getattr(state.properties, key)
             }
 
+            if changes:
+                state.properties = properties
+            state.modified_time = event_ts
+
+            if _INDEXED_PROPERTIES.intersection(changes):
+                self._index_job(job_id, 'job_modified')
+            else:
+                self.index.update(job_id, status='job_modified')
+
+            # Most modifications only bump the job's next run time, so only what changed is sent.
+            event = JobModifiedRecord(job_id=job_id, event_name='job_modified', event_ts=event_ts, changes=changes)
+
             self._append_job_event(event)
 
-        self.notify_job_event(event)
+        self.notify_job_event(event, job=job)
 
     def _job_removed(self, job_id, removal_ts):
-        with self.write_lock:
-            self.jobs[job_id]['removed_time'] = removal_ts
+        if job_id not in self.jobs:
+            return
 
-            event = {
-                'job_id': job_id,
-                'event_name': 'job_removed',
-                'event_ts': removal_ts
-            }
+        with self.write_lock, self._job_lock(job_id):
+            if job_id not in self.jobs:
+                return
+
+            self._next_run_times[job_id] = (None, [])
+            self._job_reprs.pop(job_id, None)
+            self.jobs[job_id].removed_time = removal_ts
+            self.index.update(job_id, status='job_removed')
+
+            if self.removed_jobs_retention is not None or self.max_removed_jobs is not None:
+                # Removing a job twice moves it to the end of the removal order.
+                self._removed_jobs.pop(job_id, None)
+                self._removed_jobs[job_id] = removal_ts
+
+                if self.removed_jobs_retention is not None and self._next_eviction_ts is None:
+                    self._next_eviction_ts = removal_ts + int(self.removed_jobs_retention * 1000000)
+
+            event = JobEventRecord(job_id=job_id, event_name='job_removed', event_ts=removal_ts)
 
             self._append_job_event(event)
 
         self.notify_job_event(event)
 
     def _job_execution_event(self, job_id, jobstore, event_name, event_ts, **kwargs):
-        with self.write_lock:
+        if job_id not in self.jobs:
+            self._job_added(job_id, jobstore, event_ts)
+
             if job_id not in self.jobs:
-                self._job_added(job_id, jobstore, event_ts)
+                return
 
-            event = {
-                'job_id': job_id,
-                'event_name': event_name,
-                'event_ts': event_ts,
-                'next_run_times': []
-            }
-            event.update(kwargs)
+        with self._job_lock(job_id):
+            if job_id not in self.jobs:
+                # The job was removed and forgotten meanwhile (see `max_removed_jobs`).
+                return
+
+            record_class = EXECUTION_RECORDS.get(event_name, ExecutionRecord)
+            event = record_class(job_id=job_id, event_name=event_name, event_ts=event_ts, **kwargs)
 
             self._append_job_event(event)
+            self.stats[job_id].add(event_name, event_ts, kwargs.get('scheduled_run_time'))
+            self.index.update(job_id, status=event_name)
 
         self.notify_job_event(event)
 
+    def _evict_removed_jobs(self, now_ts):
+        """
+        Forgets the removed jobs that are past the `removed_jobs_retention` and `max_removed_jobs` limits, from the one
+        removed the longest ago. Each call looks at the jobs it forgets and at one more, so it costs O(1) amortised per
+        removed job.
+
+        Args:
+            now_ts (int): The current raw timestamp (see :meth:`_repr_ts`).
+        """
+        max_removed_jobs = self.max_removed_jobs
+        next_eviction_ts = self._next_eviction_ts
+
+        # This runs after every event, so we only take the lock when some job is due.
+        if (max_removed_jobs is None or len(self._removed_jobs) <= max_removed_jobs) and \
+                (next_eviction_ts is None or now_ts < next_eviction_ts):
+            return
+
+        retention = None if self.removed_jobs_retention is None else int(self.removed_jobs_retention * 1000000)
+
+        with self.write_lock:
+            while self._removed_jobs:
+                job_id, removal_ts = next(iter(self._removed_jobs.items()))
+
+                if (max_removed_jobs is None or len(self._removed_jobs) <= max_removed_jobs) and \
+                        (retention is None or now_ts < removal_ts + retention):
+                    break
+
+                del self._removed_jobs[job_id]
+                self._forget_job(job_id)
+
+            if retention is not None and self._removed_jobs:
+                self._next_eviction_ts = next(iter(self._removed_jobs.values())) + retention
+            else:
+                self._next_eviction_ts = None
+
+    def _forget_job(self, job_id):
+        """
+        Drops a job's state, event history, statistics and projections. Listeners aren't notified: clients stop seeing
+        the job the next time they're sent a summary of the scheduler, or what changed since they last saw it (see
+        :meth:`forgotten_job_ids`). Must be called holding the write lock.
+        """
+        with self._job_lock(job_id):
+            del self.jobs[job_id]
+            del self.stats[job_id]
+            self._next_run_times.pop(job_id, None)
+            self._job_reprs.pop(job_id, None)
+
+        self.index.remove(job_id)
+
+        self._forgotten_jobs.pop(job_id, None)
+        self._forgotten_jobs[job_id] = self.last_seq
+
+        if len(self._forgotten_jobs) > self._max_forgotten_jobs:
+            _, self._forgotten_jobs_seq = self._forgotten_jobs.popitem(last=False)
+
     def _jobstore_added(self, jobstore, event_ts):
+        jobs = self.scheduler.get_jobs(jobstore=jobstore)
+
         with self.write_lock:
-            for job in self.scheduler.get_jobs(jobstore=jobstore):
+            for job in jobs:
                 self._job_added(job.id, jobstore, event_ts, job)
 
             if hasattr(self.scheduler, '_jobstores') and isinstance(self.scheduler._jobstores, dict):
                 self.jobstores[jobstore] = self._repr_jobstore(self.scheduler._jobstores[jobstore])
 
     def _repr_job(self, job, jobstore=None):
+        """
+        The representations of a job's function, arguments and trigger are cached, and each of them is only rendered
+        again when the object it comes from is replaced, so that modifications that leave them as they were (e.g. the
+        scheduler bumping the job's next run time) don't pay for rendering large arguments.
+
+        Returns:
+            apschedulerui.records.JobProperties: The job's properties. Values that are usually the same for many jobs
+            (e.g. their trigger or function) are interned, so they're kept once.
+        """
+        sources = (job.func, job.args, job.kwargs, job.trigger)
+        cached = self._job_reprs.get(job.id)
+
+        func, args, kwargs, trigger = rendered = tuple(
+            cached[1][i] if cached is not None and source is cached[0][i] else intern(render(source))
+            for i, (source, render) in enumerate(zip(sources, (str, str, str, self._repr_trigger)))
+        )
+        self._job_reprs[job.id] = (sources, rendered)
+
         next_run_time = self._repr_ts(getattr(job, 'next_run_time', None))
-        return {
-            'id': job.id,
-            'name': job.name,
-            'trigger': self._repr_trigger(job.trigger),
-            'jobstore': jobstore,
-            'executor': job.executor,
-            'func': str(job.func),
-            'func_ref': job.func_ref,
-            'args': str(job.args),
-            'kwargs': str(job.kwargs),
-            'pending': job.pending,
-            'coalesce': getattr(job, 'coalesce', None),
-            'next_run_time': [next_run_time] if next_run_time else None,
-            'misfire_grace_time': getattr(job, 'misfire_grace_time', None),
-            'max_instances': getattr(job, 'max_instances', None)
-        }
+        return JobProperties(
+            id=job.id,
+            name=intern(job.name),
+            trigger=trigger,
+            jobstore=jobstore,
+            executor=job.executor,
+            func=func,
+            func_ref=intern(job.func_ref),
+            args=args,
+            kwargs=kwargs,
+            pending=job.pending,
+            coalesce=getattr(job, 'coalesce', None),
+            next_run_time=[next_run_time] if next_run_time else None,
+            misfire_grace_time=getattr(job, 'misfire_grace_time', None),
+            max_instances=getattr(job, 'max_instances', None)
+        )
+
+    def _index_job(self, job_id, status):
+        properties = self.jobs[job_id].properties
+
+        self.index.update(
+            job_id,
+            id=job_id,
+            name=properties.name,
+            func_ref=properties.func_ref,
+            trigger=properties.trigger,
+            jobstore=properties.jobstore,
+            executor=properties.executor,
+            status=status
+        )
 
     def _append_job_event(self, e):
-        if 'events' in e:
-            del e['events']  # Make sure we won't be appending to the event list a reference to itself!
+        job = self.jobs[e.job_id]
+
+        job.seq = self._record_event(e)
+        # The job's event history is bounded by max_events_per_job, so this drops its oldest event once it's full.
+        job.events.append(e)
 
-        job_id = e['job_id']
+        if self.history is not None:
+            self.history.append(e.to_dict(), self.instance_id)
 
-        self.jobs[job_id]['events'].append(e)
+    def _record_event(self, e):
+        """
+        Stamps an event with the next sequence number and appends it to the replay log.
 
-        if len(self.jobs[job_id]['events']) > self.max_events_per_job:
-            # Limit job event log size.
-            self.jobs[job_id]['events'] = self.jobs[job_id]['events'][-self.max_events_per_job:]
+        Returns:
+            int: The event's sequence number.
+        """
+        with self._sequence_lock:
+            self.last_seq += 1
+            e.seq = self.last_seq
+            # Appending under the same lock keeps the log sorted, which is what lets events_since index into it.
+            self.replay_log.append(e)
+
+        return e.seq
 
     def _repr_ts(self, ts):
         """
+        Timestamps are kept raw and only formatted when sent to clients (see :mod:`apschedulerui.encoding`), as most of
+        them are never sent and formatting is much slower than this.
+
         Args:
             ts (datetime):
 
         Returns:
-            str: The timestamp string representation.
+            int: The microseconds since the epoch (in UTC, so that they never go backwards, e.g. when daylight saving
+            time ends) of the timestamp. Naive timestamps are taken as UTC.
         """
         if ts:
-            return ts.strftime('%Y-%m-%d %H:%M:%S.%f')
+            delta = (ts if ts.tzinfo is not None else ts.replace(tzinfo=timezone.utc)) - _EPOCH
+            return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
         return None
 
+    def _repr_payload(self, value):
+        """
+        Returns a preview of a job's return value, exception or traceback of at most `payload_preview_size` bytes, so
+        that events stay small however large it is, and stores its full text in :attr:`payloads` if it didn't fit.
+
+        Args:
+            value (object):
+
+        Returns:
+            tuple: The preview (:data:`None`, booleans and numbers are kept as they are, anything but strings is
+            represented with :func:`~apschedulerui.payloads.safe_repr`) and the key of the full text in
+            :attr:`payloads`, or :data:`None` if the preview is the full value or it isn't kept.
+        """
+        if value is None or isinstance(value, (bool, int, float)):
+            return value, None
+
+        text = value if isinstance(value, str) else safe_repr(value)
+        preview = truncate(text, self.payload_preview_size)
+
+        if preview is text or self.payloads is None:
+            return preview, None
+
+        return preview, self.payloads.put(text)
+
     def _repr_trigger(self, trigger):
         return str(trigger)
 
@@ -1,5 +1,7 @@
+import json
 import logging
 import threading
+import time
 from datetime import datetime
 
 import flask
@@ -9,9 +11,70 @@ from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
 from flask import Response
 
+from apschedulerui import encoding, metrics
+from apschedulerui.instrumentation import SIZE_BUCKETS, PeriodicLogger
 from apschedulerui.watcher import SchedulerWatcher, SchedulerEventsListener
 
 
+class EventBatcher:
+    """
+    Buffers events and hands them over in batches to an emitting function, from a dedicated thread.
+
+    A batch is emitted once `interval` seconds have passed since its first event was added or as soon as it holds
+    `max_size` events, whatever happens first. Batches are emitted in the order their events were added.
+
+    Args:
+        emit (callable): Called with the list of events of each batch.
+        interval (float): The maximum amount of seconds an event waits in the buffer.
+        max_size (int): The amount of buffered events that triggers an emission right away.
+    """
+
+    def __init__(self, emit, interval, max_size):
+        self.interval = interval
+        self.max_size = max_size
+
+        self._emit = emit
+        self._events = []
+        self._first_event_time = None
+        self._condition = threading.Condition()
+
+        self._thread = threading.Thread(target=self._run, name='apscheduler-ui-batches')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def add(self, event):
+        with self._condition:
+            if not self._events:
+                self._first_event_time = time.monotonic()
+
+            self._events.append(event)
+
+            # Wake the emitting thread up when a batch starts (to set its deadline) or when it's full.
+            if len(self._events) == 1 or len(self._events) >= self.max_size:
+                self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._events:
+                    self._condition.wait()
+
+                deadline = self._first_event_time + self.interval
+
+                while len(self._events) < self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+
+                events, self._events = self._events, []
+
+            try:
+                self._emit(events)
+            except Exception:
+                logging.getLogger('apschedulerui').exception('Failed to emit a batch of %d events' % len(events))
+
+
 class SchedulerUI(SchedulerEventsListener):
     """
     A web server that monitors your scheduler and serves a web application to visualize events.
@@ -36,6 +99,48 @@ class SchedulerUI(SchedulerEventsListener):
             (Optional) The amount of seconds to wait for the serializing lock when performing actions on the
             scheduler or on its jobs from the UI.
 
+        watcher_options (dict):
+            (Optional) Keyword arguments for the :class:`~apschedulerui.watcher.SchedulerWatcher` that tracks the
+            scheduler, e.g. ``{'async_events': True}`` to process scheduler events outside the scheduler's threads.
+
+        snapshot_page_size (int):
+            (Optional) The amount of jobs sent to a client in each page of its initial snapshot. Defaults to 500.
+
+        snapshot_events_per_job (int):
+            (Optional) The amount of recent events sent along with each job in the initial snapshot. The full event
+            history of a job is sent when a client opens its view. By default, all events are sent.
+
+        max_history_events (int):
+            (Optional) The maximum amount of events sent for a query of the event history of a job (or of every job),
+            on a job's view or at ``/api/events``. Queries without a `limit` get the watcher's `max_events_per_job`
+            most recent events of their range, or this many if it's lower. Defaults to 1000.
+
+        event_batch_interval (float):
+            (Optional) If greater than zero, job events are sent to clients in batches (``job_events`` messages) at most
+            this amount of seconds apart, instead of one message per event. Defaults to 0 (no batching).
+
+        event_batch_size (int):
+            (Optional) When batching, the amount of job events that gets a batch sent right away. Defaults to 500.
+
+        timestamp_formatter (callable):
+            (Optional) Formats the timestamps of the payloads sent to clients that didn't negotiate a compact encoding,
+            given as the microseconds since the epoch of their wall-clock time. Defaults to a
+            :class:`~apschedulerui.encoding.TimestampFormatter` (``YYYY-mm-dd HH:MM:SS.ffffff``), see also
+            :func:`~apschedulerui.encoding.isoformat`.
+
+        instrument (bool):
+            (Optional) If :data:`True`, the UI's overhead is measured (see
+            :attr:`~apschedulerui.watcher.SchedulerWatcher.instrumentation`) and served at ``/api/instrumentation`` (and
+            at ``/metrics``, if exposed). Defaults to :data:`False`.
+
+        instrumentation_log_interval (float):
+            (Optional) If greater than zero, a summary of the UI's overhead is logged every this amount of seconds,
+            which also turns `instrument` on. Defaults to 0 (never).
+
+        expose_metrics (bool):
+            (Optional) If :data:`True`, the metrics of the scheduler, its jobs and the UI are served at ``/metrics`` in
+            the Prometheus text format (see :mod:`apschedulerui.metrics`). Defaults to :data:`False`.
+
     Basic Usage:
       >>> from apscheduler.schedulers.background import BackgroundScheduler
       >>> from apschedulerui.web import SchedulerUI
@@ -47,9 +152,26 @@ class SchedulerUI(SchedulerEventsListener):
       >>> ui = SchedulerUI(scheduler, capabilities={'pause_scheduler': True})  # All omitted capabilities are False.
       >>> ui = SchedulerUI(scheduler, capabilities={'pause_job': True, 'remove_job': True})
 
+    Processing scheduler events in a background thread:
+      >>> ui = SchedulerUI(scheduler, watcher_options={'async_events': True, 'overflow_policy': 'coalesce'})
+
+    Sending job events to clients at most 10 times per second:
+      >>> ui = SchedulerUI(scheduler, event_batch_interval=0.1)
+
+    Keeping a week of job events on disk, and only the latest 20 events of each job in memory:
+      >>> from apschedulerui.history import SQLiteHistory
+      >>> history = SQLiteHistory('apschedulerui.db', retention=7 * 24 * 3600)
+      >>> ui = SchedulerUI(scheduler, watcher_options={'history': history, 'max_events_per_job': 20})
+
+    Serving Prometheus metrics at ``/metrics``, along with the UI's overhead:
+      >>> ui = SchedulerUI(scheduler, expose_metrics=True, instrument=True)
+
     """
 
-    def __init__(self, scheduler, capabilities=None, operation_timeout=1):
+    def __init__(self, scheduler, capabilities=None, operation_timeout=1, watcher_options=None,
+                 snapshot_page_size=500, snapshot_events_per_job=None, event_batch_interval=0, event_batch_size=500,
+                 timestamp_formatter=None, expose_metrics=False, instrumentation_log_interval=0,
+                 max_history_events=1000, instrument=False):
         self.scheduler = scheduler
         self.capabilities = {
             'pause_job': False,
@@ -67,16 +189,83 @@ class SchedulerUI(SchedulerEventsListener):
 
         self.operation_timeout = operation_timeout
 
+        if not isinstance(snapshot_page_size, int) or snapshot_page_size <= 0:
+            raise ValueError('snapshot_page_size should be a positive int')
+
+        self.snapshot_page_size = snapshot_page_size
+        self.snapshot_events_per_job = snapshot_events_per_job
+
+        if not isinstance(max_history_events, int) or max_history_events <= 0:
+            raise ValueError('max_history_events should be a positive int')
+
+        self.max_history_events = max_history_events
+
+        if not (isinstance(event_batch_interval, int) or isinstance(event_batch_interval, float)):
+            raise TypeError('event_batch_interval should be either an int or a float')
+
+        if event_batch_interval < 0:
+            raise ValueError('event_batch_interval should not be a negative number')
+
+        if not isinstance(event_batch_size, int) or event_batch_size <= 0:
+            raise ValueError('event_batch_size should be a positive int')
+
+        self._event_batcher = None
+        if event_batch_interval > 0:
+            self._event_batcher = EventBatcher(self._emit_job_events, event_batch_interval, event_batch_size)
+
+        if timestamp_formatter is not None and not callable(timestamp_formatter):
+            raise TypeError('timestamp_formatter should be a callable')
+
+        if not isinstance(expose_metrics, bool):
+            raise TypeError('expose_metrics should be a bool')
+
+        self.expose_metrics = expose_metrics
+
         if capabilities is not None:
             if isinstance(capabilities, dict):
                 self.capabilities.update(capabilities)
             else:
                 raise TypeError('capabilities should be a dict of str -> bool pairs')
 
-        self._scheduler_listener = SchedulerWatcher(scheduler)
+        if watcher_options is None:
+            watcher_options = {}
+        elif not isinstance(watcher_options, dict):
+            raise TypeError('watcher_options should be a dict of SchedulerWatcher keyword arguments')
+
+        if not isinstance(instrument, bool):
+            raise TypeError('instrument should be a bool')
+
+        if not (isinstance(instrumentation_log_interval, int) or isinstance(instrumentation_log_interval, float)):
+            raise TypeError('instrumentation_log_interval should be either an int or a float')
+
+        # The watcher only measures the overhead when asked to, either here or through its own options.
+        watcher_options = dict(watcher_options)
+        watcher_options.setdefault('instrument', instrument or instrumentation_log_interval > 0)
+
+        self._scheduler_listener = SchedulerWatcher(scheduler, **watcher_options)
+        self._instrumentation = self._scheduler_listener.instrumentation
 
         self._web_server = flask.Flask(__name__)
         self._socket_io = None
+        # Jobs that are pending to be sent to each client as part of their initial snapshot.
+        self._snapshots = {}
+        # Clients in each room and rooms of each client. See :meth:`_subscribe`. The lock also guards the snapshots.
+        self._rooms = {}
+        self._subscriptions = {}
+        self._rooms_lock = threading.Lock()
+        # Clients that negotiated a compact encoding, by session id. See :meth:`_negotiate_encoding`.
+        self._encodings = {}
+        self._encoder = encoding.PayloadEncoder(timestamp_formatter, timezone=scheduler.timezone)
+        # JSON payloads are only handed over to Socket.IO to serialize, so we only serialize one of every this many
+        # again to measure its size.
+        self._payload_size_sample_every = 100
+        self._payload_count = 0
+
+        if self._instrumentation is not None:
+            self._instrumentation.gauge('connected_clients', self._subscriptions.__len__)
+
+            if instrumentation_log_interval > 0:
+                PeriodicLogger(self._instrumentation, instrumentation_log_interval)
 
         try:
             # TODO: see if we can support eventlet in the future.
@@ -134,10 +323,32 @@ class SchedulerUI(SchedulerEventsListener):
         if self.capabilities.get('run_job', False):
             self._web_server.add_url_rule('/api/job/<job_id>/run_now', 'run_job', self._run_job, methods=['POST'])
 
+        self._web_server.add_url_rule('/api/jobs/search', 'search_jobs', self._search_jobs_endpoint, methods=['GET'])
+        self._web_server.add_url_rule('/api/jobs/stats', 'jobs_stats', self._jobs_stats, methods=['GET'])
+        self._web_server.add_url_rule('/api/job/<job_id>/stats', 'job_stats', self._job_stats, methods=['GET'])
+        self._web_server.add_url_rule('/api/events', 'events', self._events, methods=['GET'])
+        self._web_server.add_url_rule('/api/job/<job_id>/events', 'job_events', self._events, methods=['GET'])
+        self._web_server.add_url_rule('/api/payload/<key>', 'payload', self._payload, methods=['GET'])
+
+        self._web_server.add_url_rule(
+            '/api/instrumentation', 'instrumentation', self._instrumentation_endpoint, methods=['GET']
+        )
+
+        if self.expose_metrics:
+            self._web_server.add_url_rule('/metrics', 'metrics', self._metrics, methods=['GET'])
+
         self._web_server.add_url_rule('/', 'index', self._index, defaults={'path': ''})
         self._web_server.add_url_rule('/<path:path>', 'index', self._index)
 
+        self._socket_io.on_event('connect', self._client_joined)
+        self._socket_io.on_event('disconnect', self._client_left)
         self._socket_io.on_event('connected', self._client_connected)
+        self._socket_io.on_event('resume', self._client_resumed)
+        self._socket_io.on_event('get_jobs_page', self._get_jobs_page)
+        self._socket_io.on_event('get_job_history', self._get_job_history)
+        self._socket_io.on_event('search_jobs', self._search_jobs)
+        self._socket_io.on_event('subscribe', self._subscribe)
+        self._socket_io.on_event('unsubscribe', self._unsubscribe)
 
     def _index(self, path):
         return self._web_server.send_static_file('index.html')
@@ -198,22 +409,571 @@ class SchedulerUI(SchedulerEventsListener):
     def _remove_job(self, job_id):
         return self._exec_scheduler_command(self.scheduler.remove_job, job_id)
 
-    def _client_connected(self):
+    def _client_joined(self, *args):
+        with self._rooms_lock:
+            self._subscriptions[flask.request.sid] = set()
+
+    def _client_left(self, *args):
+        with self._rooms_lock:
+            self._snapshots.pop(flask.request.sid, None)
+
+        self._leave_rooms(flask.request.sid)
+
+        with self._rooms_lock:
+            self._encodings.pop(flask.request.sid, None)
+
+    def _negotiate_encoding(self, request):
+        """
+        Picks the encoding of the payloads sent to a client out of those it offers in its `encodings` list (see
+        :mod:`apschedulerui.encoding`) and, unless it's plain JSON, sends it to the client along with the tables it
+        needs to decode them.
+        """
+        sid = flask.request.sid
+        chosen = encoding.negotiate(request.get('encodings') if isinstance(request, dict) else None)
+
+        with self._rooms_lock:
+            previous = self._encodings.get(sid, 'json')
+            rooms = list(self._subscriptions.get(sid, ()))
+
+            if chosen == 'json':
+                self._encodings.pop(sid, None)
+            else:
+                self._encodings[sid] = chosen
+
+        if chosen != previous:
+            for room in rooms + [None]:
+                previous_room, chosen_room = self._socket_room(room, previous), self._socket_room(room, chosen)
+
+                if previous_room is not None:
+                    flask_socketio.leave_room(previous_room)
+                if chosen_room is not None:
+                    flask_socketio.join_room(chosen_room)
+
+        if chosen != 'json':
+            flask_socketio.emit('init_encoding', dict(encoding.encoding_tables(), encoding=chosen))
+
+    @staticmethod
+    def _socket_room(room, payload_encoding):
+        """
+        Returns the Socket.IO room clients of a room that negotiated an encoding are in, so that payloads are encoded
+        once per room and encoding. `None` stands for the room of all clients.
+        """
+        if payload_encoding == 'json':
+            return room
+        return '%s|%s' % (payload_encoding, room or '')
+
+    def _reply(self, event_name, payload):
+        """
+        Sends a payload to the client whose request we're handling, in the encoding it negotiated.
+        """
+        payload_encoding = self._encodings.get(flask.request.sid, 'json')
+        flask_socketio.emit(event_name, self._encode(payload, payload_encoding))
+
+    def _emit(self, event_name, payload, room=None, skip_sid=None):
+        """
+        Sends a payload to the clients in a room (or to every client), encoding it once per encoding in use.
+        """
+        with self._rooms_lock:
+            encoded_sids = list(self._encodings.keys())
+            encodings = set(self._encodings.values())
+
+        for payload_encoding in encodings:
+            self._socket_io.emit(
+                event_name, self._encode(payload, payload_encoding),
+                room=self._socket_room(room, payload_encoding), skip_sid=skip_sid
+            )
+
+        kwargs = {}
+        if room is not None:
+            kwargs['room'] = room
+        elif encoded_sids:
+            # Clients that negotiated another encoding got the payload already.
+            skip_sid = (skip_sid or []) + encoded_sids
+
+        if skip_sid:
+            kwargs['skip_sid'] = skip_sid
+
+        self._socket_io.emit(event_name, self._encode(payload, 'json'), **kwargs)
+
+    def _encode(self, payload, payload_encoding):
+        """
+        Encodes a payload to be sent to clients, measuring the size of some of them (see :meth:`_payload_size`).
+        """
+        encoded = self._encoder.encode(payload, payload_encoding)
+
+        if self._instrumentation is not None:
+            size = self._payload_size(encoded)
+            if size is not None:
+                self._instrumentation.observe('payload_bytes', size, ('encoding', payload_encoding), SIZE_BUCKETS)
+
+        return encoded
+
+    def _payload_size(self, encoded):
+        if isinstance(encoded, bytes):
+            return len(encoded)
+
+        self._payload_count += 1
+        if self._payload_count % self._payload_size_sample_every == 1:
+            return len(json.dumps(encoded, separators=(',', ':'), default=str))
+
+        return None
+
+    def _is_watching_job(self, job_id):
+        # Projecting a job's next run times is only worth it if someone will get to see them.
+        return any(self._rooms.get(room) for room in self._job_rooms(job_id))
+
+    def _job_rooms(self, job_id):
+        """
+        Returns the names of the rooms that get the events of a job: its own room and the room of its jobstore.
+        """
+        job = self._scheduler_listener.jobs.get(job_id)
+        jobstore = job.properties.jobstore if job is not None else None
+
+        return 'job:%s' % job_id, 'jobstore:%s' % jobstore
+
+    def _subscribe(self, request):
+        """
+        Adds a client to rooms, so that it gets the events it's interested in:
+            * ``job:<job id>``: every event of a job.
+            * ``jobstore:<alias>``: every event of the jobs in a jobstore.
+            * ``overview``: a compact update (job id, event name, timestamp and sequence number) for every job event.
+
+        A client that (re)subscribes to job or jobstore rooms may send the watcher instance id and the sequence number
+        of the last event it's sure to have seen, to get the state of the jobs in those rooms that changed since then.
+        """
+        if not isinstance(request, dict):
+            return
+
+        sid = flask.request.sid
+        rooms = self._parse_rooms(request.get('rooms'))
+
+        with self._rooms_lock:
+            for room in rooms:
+                self._rooms.setdefault(room, set()).add(sid)
+                self._subscriptions.setdefault(sid, set()).add(room)
+
+            payload_encoding = self._encodings.get(sid, 'json')
+
+        for room in rooms:
+            flask_socketio.join_room(self._socket_room(room, payload_encoding))
+
+        watcher = self._scheduler_listener
+        since_seq = request.get('since_seq')
+
+        if request.get('instance') != watcher.instance_id or not isinstance(since_seq, int):
+            return
+
+        # Read the sequence number before collecting jobs, so that the client never skips an event.
+        seq = watcher.last_seq
+        job_ids = [
+            job_id for job_id in watcher.job_ids(since_seq=since_seq)
+            if any(room in rooms for room in self._job_rooms(job_id))
+        ]
+
+        self._reply('subscribed', {
+            'rooms': rooms,
+            'seq': seq,
+            'jobs': watcher.job_summaries(job_ids, since_seq=since_seq),
+            # Clients can't tell which rooms a forgotten job was in, so they get all of them.
+            'forgotten_jobs': watcher.forgotten_job_ids(since_seq) or []
+        })
+
+    def _unsubscribe(self, request):
+        if not isinstance(request, dict):
+            return
+
+        rooms = self._parse_rooms(request.get('rooms'))
+        self._leave_rooms(flask.request.sid, rooms)
+        payload_encoding = self._encodings.get(flask.request.sid, 'json')
+
+        for room in rooms:
+            flask_socketio.leave_room(self._socket_room(room, payload_encoding))
+
+    def _leave_rooms(self, sid, rooms=None):
+        with self._rooms_lock:
+            subscriptions = self._subscriptions.get(sid, set())
+
+            for room in list(subscriptions if rooms is None else rooms):
+                subscriptions.discard(room)
+                members = self._rooms.get(room, set())
+                members.discard(sid)
+
+                if not members:
+                    self._rooms.pop(room, None)
+
+            if rooms is None:
+                self._subscriptions.pop(sid, None)
+
+    @staticmethod
+    def _parse_rooms(rooms):
+        if not isinstance(rooms, list):
+            return []
+
+        return [
+            room for room in rooms
+            if isinstance(room, str) and (room == 'overview' or room.startswith('job:') or room.startswith('jobstore:'))
+        ]
+
+    def _client_connected(self, resume_point=None):
+        """
+        Sends a client the scheduler summary, without jobs, along with the description of the snapshot it should fetch
+        page by page with `get_jobs_page`.
+
+        Clients that reconnect may send the instance id and the sequence number of the last snapshot they fully
+        received, so that only the jobs that changed since then (and only their new events) are sent to them, along with
+        the ids of the jobs that were forgotten since then.
+        """
         logging.getLogger('apschedulerui').debug('Client connected')
-        flask_socketio.emit('init_jobs', self._scheduler_listener.scheduler_summary())
+        self._negotiate_encoding(resume_point)
+        self._send_snapshot(resume_point)
+
+    def _send_snapshot(self, resume_point):
+        watcher = self._scheduler_listener
+
+        since_seq = None
+        if isinstance(resume_point, dict) and resume_point.get('instance') == watcher.instance_id:
+            since_seq = resume_point.get('since_seq')
+            if not isinstance(since_seq, int) or since_seq > watcher.last_seq:
+                since_seq = None
+
+        # The client has to stop showing the jobs that were forgotten since then, if we still know them all.
+        forgotten_job_ids = watcher.forgotten_job_ids(since_seq) if since_seq is not None else []
+        if forgotten_job_ids is None:
+            since_seq, forgotten_job_ids = None, []
+
+        # Read the sequence number before collecting jobs, so that the client never skips an event.
+        seq = watcher.last_seq
+        job_ids = watcher.job_ids(since_seq=since_seq)
+
+        with self._rooms_lock:
+            self._snapshots[flask.request.sid] = (job_ids, since_seq)
+
+        summary = watcher.scheduler_summary(job_ids=[])
+        summary['snapshot'] = {
+            'instance': watcher.instance_id,
+            'seq': seq,
+            'since_seq': since_seq,
+            'forgotten_jobs': forgotten_job_ids,
+            'total_jobs': len(job_ids),
+            'page_size': self.snapshot_page_size
+        }
+
+        self._reply('init_jobs', summary)
         flask_socketio.emit('init_capabilities', self.capabilities)
 
+    def _client_resumed(self, resume_point):
+        """
+        Replays to a reconnecting client the events it missed since the last sequence number it saw, along with the
+        current projected run times of the jobs they touched.
+
+        Falls back to sending a snapshot (see :meth:`_client_connected`) if the client comes from another watcher
+        instance or if the missed events were already evicted from the watcher's replay log.
+        """
+        self._negotiate_encoding(resume_point)
+        watcher = self._scheduler_listener
+        events = None
+
+        if isinstance(resume_point, dict) and resume_point.get('instance') == watcher.instance_id:
+            since_seq = resume_point.get('since_seq')
+            if isinstance(since_seq, int):
+                forgotten_job_ids = watcher.forgotten_job_ids(since_seq)
+                if forgotten_job_ids is not None:
+                    events = watcher.events_since(since_seq)
+
+        if events is None:
+            return self._send_snapshot(resume_point)
+
+        logging.getLogger('apschedulerui').debug('Client resumed, replaying %d events' % len(events))
+
+        job_ids = {e['job_id'] for e in events if 'job_id' in e}
+        summary = watcher.scheduler_summary(job_ids=[])
+
+        self._reply('resume', {
+            'instance': watcher.instance_id,
+            'seq': events[-1]['seq'] if events else since_seq,
+            'executors': summary['executors'],
+            'jobstores': summary['jobstores'],
+            'scheduler': summary['scheduler'],
+            'events': events,
+            'forgotten_jobs': forgotten_job_ids,
+            'next_run_times': {
+                job_id: watcher.get_next_run_times(job_id) for job_id in job_ids if job_id in watcher.jobs
+            }
+        })
+
+    def _get_jobs_page(self, request):
+        if not isinstance(request, dict):
+            return
+
+        try:
+            offset = int(request.get('offset', 0))
+        except (TypeError, ValueError):
+            return
+
+        if offset < 0:
+            return
+
+        with self._rooms_lock:
+            job_ids, since_seq = self._snapshots.get(flask.request.sid, (None, None))
+
+            if job_ids is None:
+                return
+
+            next_offset = offset + self.snapshot_page_size
+
+            if next_offset >= len(job_ids):
+                next_offset = None
+                self._snapshots.pop(flask.request.sid, None)
+
+        watcher = self._scheduler_listener
+
+        self._reply('jobs_page', {
+            'offset': offset,
+            'next_offset': next_offset,
+            'total': len(job_ids),
+            'jobs': watcher.job_summaries(
+                job_ids[offset:offset + self.snapshot_page_size], since_seq=since_seq,
+                max_events=self.snapshot_events_per_job
+            )
+        })
+
+    def _get_job_history(self, request):
+        """
+        Sends a client the state of a job with its event history: the events kept in memory or, if the watcher has a
+        history backend or the client asks for a range (with raw `since_ts`, `until_ts` timestamps and a `limit`), the
+        events in that range (see :meth:`SchedulerWatcher.query_events`).
+        """
+        if not isinstance(request, dict):
+            return
+
+        watcher = self._scheduler_listener
+        job_id = request.get('job_id')
+
+        if not isinstance(job_id, str) or job_id not in watcher.jobs:
+            return
+
+        query = {key: request.get(key) for key in ('since_ts', 'until_ts', 'limit')}
+        if not all(value is None or isinstance(value, int) for value in query.values()):
+            return
+
+        try:
+            summary = watcher.job_summary(job_id)
+        except KeyError:
+            # The job was removed and forgotten meanwhile.
+            return
+
+        if watcher.history is not None or any(value is not None for value in query.values()):
+            query['limit'] = self._history_limit(query['limit'])
+            summary['events'] = watcher.query_events(job_id, **query)
+
+        self._reply('job_history', summary)
+
+    def _search_page(self, query, offset=0, limit=None):
+        """
+        Returns a page of the jobs that match a query (see :meth:`SchedulerWatcher.search_jobs`), with the same event
+        history as the jobs of a snapshot page. Pages hold at most `snapshot_page_size` jobs.
+        """
+        if limit is None or limit > self.snapshot_page_size:
+            limit = self.snapshot_page_size
+
+        if offset < 0 or limit <= 0:
+            raise ValueError('offset should not be negative and limit should be positive')
+
+        watcher = self._scheduler_listener
+        job_ids = watcher.search_jobs(query)
+        page_ids = job_ids[offset:offset + limit]
+
+        return {
+            'query': query,
+            'offset': offset,
+            'next_offset': offset + limit if offset + limit < len(job_ids) else None,
+            'total': len(job_ids),
+            # Mappings aren't guaranteed to keep their order once serialized, so the ids are sent in order separately.
+            'job_ids': page_ids,
+            'jobs': watcher.job_summaries(page_ids, max_events=self.snapshot_events_per_job)
+        }
+
+    def _search_jobs(self, request):
+        if not isinstance(request, dict):
+            return
+
+        limit = request.get('limit')
+
+        try:
+            page = self._search_page(
+                str(request.get('query') or ''), int(request.get('offset', 0)), None if limit is None else int(limit)
+            )
+        except (TypeError, ValueError):
+            return
+
+        self._reply('jobs_search', page)
+
+    def _search_jobs_endpoint(self):
+        args = flask.request.args
+
+        try:
+            page = self._search_page(
+                args.get('q', ''), args.get('offset', 0, type=int), args.get('limit', None, type=int)
+            )
+        except ValueError as e:
+            flask.abort(400, description=str(e))
+
+        return self._json_response(page)
+
+    def _jobs_stats(self):
+        watcher = self._scheduler_listener
+        stats = {}
+
+        for job_id in watcher.job_ids():
+            try:
+                stats[job_id] = watcher.job_stats(job_id)
+            except KeyError:
+                continue
+
+        return self._json_response(stats)
+
+    def _job_stats(self, job_id):
+        try:
+            stats = self._scheduler_listener.job_stats(job_id)
+        except KeyError:
+            flask.abort(404, description="Job not found")
+
+        return self._json_response(stats)
+
+    def _metrics(self):
+        with self._rooms_lock:
+            connected_clients = len(self._subscriptions)
+
+        return Response(
+            metrics.render(self._scheduler_listener, connected_clients), content_type=metrics.CONTENT_TYPE
+        )
+
+    def _events(self, job_id=None):
+        """
+        Serves the events of a job (or of every job, for the timeline) within a range given by the `since` and `until`
+        raw timestamps and limited to the most recent `limit` events, as query arguments.
+        """
+        watcher = self._scheduler_listener
+
+        # With a history backend, the events of jobs that were forgotten can still be queried.
+        if job_id is not None and job_id not in watcher.jobs and watcher.history is None:
+            flask.abort(404, description="Job not found")
+
+        args = flask.request.args
+
+        events = watcher.query_events(
+            job_id,
+            since_ts=args.get('since', None, type=int),
+            until_ts=args.get('until', None, type=int),
+            limit=self._history_limit(args.get('limit', None, type=int))
+        )
+
+        return self._json_response({'events': events})
+
+    def _history_limit(self, limit):
+        """
+        Returns the limit of a query of the event history, so that a query without one doesn't send every stored event.
+        """
+        if limit is None:
+            limit = self._scheduler_listener.max_events_per_job or self.max_history_events
+
+        return min(limit, self.max_history_events)
+
+    def _payload(self, key):
+        """
+        Serves the full text of a return value, exception or traceback that was truncated in an event, by the key the
+        event carries in its ``retval_ref``, ``exception_ref`` or ``traceback_ref``.
+        """
+        payloads = self._scheduler_listener.payloads
+        payload = payloads.get(key) if payloads is not None else None
+
+        if payload is None:
+            flask.abort(404, description="Payload not found, it may have been evicted")
+
+        return self._json_response({'key': key, 'payload': payload})
+
+    def _instrumentation_endpoint(self):
+        if self._instrumentation is None:
+            flask.abort(404, description="Instrumentation is disabled")
+
+        return self._json_response(self._instrumentation.snapshot())
+
+    def _json_response(self, payload):
+        return Response(json.dumps(self._encoder.encode(payload, 'json'), default=str), mimetype='application/json')
+
     def _job_event(self, event):
-        self._socket_io.emit('job_event', event)
+        start = time.perf_counter()
+
+        if self._event_batcher is not None:
+            self._event_batcher.add(event)
+        else:
+            self._emit_job_events([event], batched=False)
+
+        if self._instrumentation is not None:
+            # The time it takes to hand an event over to clients (or to the batcher), spent in the scheduler's thread
+            # unless events are processed asynchronously.
+            self._instrumentation.observe('job_event_seconds', time.perf_counter() - start)
+
+    def _emit_job_events(self, events, batched=True):
+        """
+        Sends job events to the clients in the rooms of their jobs and jobstores, making sure that clients that are in
+        both only get them once, and a compact version of them to the clients in the overview room.
+
+        Args:
+            events (list[dict]):
+            batched (bool):
+                (Optional) If :data:`True` (default) events are sent in lists (``job_events``), one per room. Otherwise,
+                each event is sent on its own (``job_event``).
+        """
+        start = time.perf_counter()
+        jobstore_events = {}
+        job_events = {}
+
+        for event in events:
+            job_room, jobstore_room = self._job_rooms(event['job_id'])
+
+            # Nobody to send them to, so there's no point in encoding them.
+            if jobstore_room in self._rooms:
+                jobstore_events.setdefault(jobstore_room, []).append(event)
+
+            if job_room in self._rooms:
+                job_events.setdefault((job_room, jobstore_room), []).append(event)
+
+        for room, room_events in jobstore_events.items():
+            self._emit_to_room(room_events, batched, room=room)
+
+        for (room, jobstore_room), room_events in job_events.items():
+            with self._rooms_lock:
+                skipped = self._rooms.get(jobstore_room, set())
+                if not self._rooms.get(room, set()) - skipped:
+                    continue
+                skipped = list(skipped)
+
+            self._emit_to_room(room_events, batched, room=room, skip_sid=skipped)
+
+        if 'overview' in self._rooms:
+            self._emit('job_overview', [
+                {key: event.get(key) for key in ('job_id', 'event_name', 'event_ts', 'seq')} for event in events
+            ], room='overview')
+
+        if self._instrumentation is not None:
+            self._instrumentation.observe('emit_job_events_seconds', time.perf_counter() - start)
+
+    def _emit_to_room(self, events, batched, **kwargs):
+        if batched:
+            self._emit('job_events', events, **kwargs)
+        else:
+            for event in events:
+                self._emit('job_event', event, **kwargs)
 
     def _scheduler_event(self, event):
-        self._socket_io.emit('scheduler_event', event)
+        self._emit('scheduler_event', event)
 
     def _jobstore_event(self, event):
-        self._socket_io.emit('jobstore_event', event)
+        self._emit('jobstore_event', event)
 
     def _executor_event(self, event):
-        self._socket_io.emit('executor_event', event)
+        self._emit('executor_event', event)
 
     def _start(self, host, port):
         self._socket_io.run(self._web_server, host=host, port=port)
@@ -0,0 +1,27 @@
+"""
+Runs every benchmark (or the given ones) with its default arguments, one after the other.
+
+Usage:
+    python -m benchmarks [bench_throughput bench_summary ...]
+"""
+import importlib
+import pkgutil
+import sys
+
+import benchmarks
+
+
+def main():
+    names = sys.argv[1:] or sorted(
+        module.name for module in pkgutil.iter_modules(benchmarks.__path__) if module.name.startswith('bench_')
+    )
+
+    for name in names:
+        print('== %s' % name)
+        sys.argv = ['benchmarks.%s' % name]
+        importlib.import_module('benchmarks.%s' % name).main()
+        print()
+
+
+if __name__ == '__main__':
+    main()
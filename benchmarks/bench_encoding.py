@@ -0,0 +1,63 @@
+"""
+Measures the size of the jobs snapshot and how long it takes to encode it in each of the encodings clients can
+negotiate (see apschedulerui/encoding.py).
+
+The snapshot is the summary of a scheduler with N interval jobs, each with a few execution events, as a client would
+get it through `init_jobs` and `jobs_page`. JSON payloads are measured as Socket.IO would serialize them.
+
+Usage:
+    python -m benchmarks.bench_encoding [--jobs N] [--events-per-job N] [--rounds N]
+"""
+import argparse
+import json
+
+from apschedulerui.encoding import PayloadEncoder, msgpack
+from apschedulerui.watcher import SchedulerWatcher
+from benchmarks.utils import execution_events, measure, paused_scheduler
+
+
+def serialize(payload, encoding):
+    encoded = PayloadEncoder().encode(payload, encoding)
+
+    if isinstance(encoded, bytes):
+        return encoded
+
+    return json.dumps(encoded, separators=(',', ':')).encode('utf-8')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--jobs', type=int, default=10000)
+    parser.add_argument('--events-per-job', type=int, default=4, help='Execution events per job (pairs).')
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    scheduler = paused_scheduler(args.jobs)
+    watcher = SchedulerWatcher(scheduler)
+
+    for i in range(args.jobs):
+        for _ in range(args.events_per_job // 2):
+            for event in execution_events('job_%d' % i):
+                watcher._process_event(event)
+
+    snapshot = watcher.scheduler_summary()
+    scheduler.shutdown(wait=False)
+
+    encodings = ['json', 'compact'] + (['msgpack'] if msgpack is not None else [])
+    json_size = None
+
+    for encoding in encodings:
+        timings = []
+        for _ in range(args.rounds):
+            encoded, elapsed = measure(serialize, snapshot, encoding)
+            timings.append(elapsed)
+
+        json_size = json_size or len(encoded)
+
+        print('%-8s %6d jobs %10d bytes (%5.1f%% of json) encode min %7.1f ms' % (
+            encoding, args.jobs, len(encoded), len(encoded) * 100 / json_size, min(timings) * 1e3
+        ))
+
+
+if __name__ == '__main__':
+    main()
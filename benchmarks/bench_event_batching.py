@@ -0,0 +1,91 @@
+"""
+Measures how many Socket.IO frames the web server sends and how long job events wait before being sent, for
+different `event_batch_interval` values. 0 disables batching (one frame per event).
+
+Bursts of synthetic job events are fired at the watcher, as the scheduler would dispatch them, with a client
+connected. Frames are recorded (and JSON encoded, as Socket.IO would do for each of them) at the moment the server
+hands them over to Socket.IO, so latency goes from the scheduler dispatching an event to its frame being sent and
+doesn't include the network.
+
+Usage:
+    python -m benchmarks.bench_event_batching [--events N] [--intervals 0 0.005 0.02 0.1]
+"""
+import argparse
+import json
+import threading
+import time
+
+from apschedulerui.web import SchedulerUI
+from benchmarks.utils import execution_events, paused_scheduler, percentile
+
+
+class FrameRecorder:
+    def __init__(self, expected):
+        self.expected = expected
+        self.frames = 0
+        self.latencies = []
+        self.done = threading.Event()
+
+        # Dispatch times of the events, by sequence number.
+        self.sent_at = {}
+
+    def emit(self, event_name, data, **kwargs):
+        if event_name not in ('job_event', 'job_events'):
+            return
+
+        json.dumps(data)
+        now = time.perf_counter()
+        self.frames += 1
+
+        for event in data if isinstance(data, list) else [data]:
+            self.latencies.append(now - self.sent_at[event['seq']])
+
+        if len(self.latencies) >= self.expected:
+            self.done.set()
+
+
+def run(interval, n_events, n_jobs=100):
+    scheduler = paused_scheduler(n_jobs)
+    ui = SchedulerUI(scheduler, event_batch_interval=interval)
+
+    recorder = FrameRecorder(n_events)
+    ui._socket_io.emit = recorder.emit
+    # Pretend a client is watching the jobstore, so that events carry their projections as they would.
+    ui._rooms['jobstore:default'] = {'benchmark'}
+    watcher = ui._scheduler_listener
+    watcher.add_listener(ui)
+
+    start = time.perf_counter()
+    for i in range(n_events // 2):
+        for event in execution_events('job_%d' % (i % n_jobs)):
+            # Sequence numbers are handed out in order, so we know which one each event is going to get.
+            recorder.sent_at[watcher.last_seq + 1] = time.perf_counter()
+            watcher._process_event(event)
+
+    recorder.done.wait(timeout=60)
+    elapsed = time.perf_counter() - start
+
+    scheduler.shutdown(wait=False)
+
+    return recorder, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=5000, help='Job events fired at the watcher.')
+    parser.add_argument('--intervals', type=float, nargs='+', default=[0, 0.005, 0.02, 0.1])
+    args = parser.parse_args()
+
+    for interval in args.intervals:
+        recorder, elapsed = run(interval, args.events)
+
+        print('event_batch_interval=%-6g %6d events %6d frames %9.0f frames/s %9.0f events/s '
+              'latency p50 %7.2f ms p99 %7.2f ms' % (
+                  interval, len(recorder.latencies), recorder.frames, recorder.frames / elapsed,
+                  len(recorder.latencies) / elapsed,
+                  percentile(recorder.latencies, 0.5) * 1e3, percentile(recorder.latencies, 0.99) * 1e3
+              ))
+
+
+if __name__ == '__main__':
+    main()
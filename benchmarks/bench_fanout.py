@@ -0,0 +1,83 @@
+"""
+Measures how long it takes for a job event to reach N Socket.IO clients subscribed to its jobstore, with
+Flask-SocketIO's test clients connected in-process (so there's no network, only the server's own work).
+
+Latency goes from the scheduler dispatching an event to the last client having it in its queue. With batching
+(`--batch-interval`), clients are polled until every one of them got every event.
+
+Usage:
+    python -m benchmarks.bench_fanout [--clients 1 10 100] [--events N] [--batch-interval SECONDS]
+"""
+import argparse
+import time
+
+from apschedulerui.web import SchedulerUI
+from benchmarks.utils import execution_events, paused_scheduler, percentile
+
+
+def received_events(client):
+    count = 0
+
+    for message in client.get_received():
+        if message['name'] == 'job_event':
+            count += 1
+        elif message['name'] == 'job_events':
+            count += len(message['args'][0])
+
+    return count
+
+
+def run(n_clients, n_events, batch_interval, n_jobs=100):
+    scheduler = paused_scheduler(n_jobs)
+    ui = SchedulerUI(scheduler, event_batch_interval=batch_interval)
+    ui._scheduler_listener.add_listener(ui)
+
+    clients = [ui._socket_io.test_client(ui._web_server) for _ in range(n_clients)]
+    for client in clients:
+        client.emit('subscribe', {'rooms': ['jobstore:default']})
+        client.get_received()
+
+    latencies = []
+
+    for i in range(n_events // 2):
+        events = execution_events('job_%d' % (i % n_jobs))
+        pending = {id(client): len(events) for client in clients}
+        start = time.perf_counter()
+
+        for event in events:
+            ui._scheduler_listener._process_event(event)
+
+        while pending:
+            for client in clients:
+                if id(client) in pending:
+                    pending[id(client)] -= received_events(client)
+                    if pending[id(client)] <= 0:
+                        del pending[id(client)]
+
+        latencies.append(time.perf_counter() - start)
+
+    for client in clients:
+        client.disconnect()
+
+    scheduler.shutdown(wait=False)
+
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--events', type=int, default=1000)
+    parser.add_argument('--batch-interval', type=float, default=0, help='The UI\'s event_batch_interval.')
+    args = parser.parse_args()
+
+    for n_clients in args.clients:
+        latencies = run(n_clients, args.events, args.batch_interval)
+
+        print('%4d clients %6d events latency p50 %8.3f ms p99 %8.3f ms (per pair of events)' % (
+            n_clients, args.events, percentile(latencies, 0.5) * 1e3, percentile(latencies, 0.99) * 1e3
+        ))
+
+
+if __name__ == '__main__':
+    main()
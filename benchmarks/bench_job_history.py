@@ -0,0 +1,47 @@
+"""
+Measures the cost of appending an event to a job's history once the history is full, for different values of
+`max_events_per_job`. The cost should not depend on the history size.
+
+Usage:
+    python -m benchmarks.bench_job_history [--events N] [--sizes 10 100 1000 10000]
+"""
+import argparse
+
+from apschedulerui.watcher import SchedulerWatcher
+from benchmarks.utils import measure, paused_scheduler
+
+
+def run(max_events_per_job, n_events):
+    scheduler = paused_scheduler(1)
+    watcher = SchedulerWatcher(scheduler, max_events_per_job=max_events_per_job)
+
+    event = {'job_id': 'job_0', 'event_name': 'job_executed', 'event_ts': None}
+
+    # Fill up the history first, so that every measured append evicts an event.
+    for _ in range(max_events_per_job):
+        watcher._append_job_event(dict(event))
+
+    events = [dict(event) for _ in range(n_events)]
+
+    def append_all():
+        for e in events:
+            watcher._append_job_event(e)
+
+    _, elapsed = measure(append_all)
+    scheduler.shutdown(wait=False)
+
+    return elapsed / n_events
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=100000, help='Events appended to a full history.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 10000])
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        print('max_events_per_job=%-6d %8.3f us/event' % (size, run(size, args.events) * 1e6))
+
+
+if __name__ == '__main__':
+    main()
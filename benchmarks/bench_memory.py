@@ -0,0 +1,61 @@
+"""
+Measures the memory the watcher takes per tracked job and per event kept in the jobs' histories, as traced by
+tracemalloc: the state of the jobs, their event histories and what the watcher keeps besides them (projections, search
+index and execution statistics).
+
+Each job gets `--events-per-job` execution events. The scheduler's own jobs are created before tracing starts, so they
+aren't counted. The memory per event is the growth over the run without events, divided by the amount of events kept.
+
+Usage:
+    python -m benchmarks.bench_memory [--jobs N] [--events-per-job 0 10 100]
+"""
+import argparse
+import gc
+import tracemalloc
+
+from apschedulerui.watcher import SchedulerWatcher
+from benchmarks.utils import execution_events, paused_scheduler
+
+
+def run(n_jobs, events_per_job):
+    scheduler = paused_scheduler(n_jobs)
+    events = [execution_events('job_%d' % i) for i in range(n_jobs)]
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+
+    watcher = SchedulerWatcher(scheduler, max_events_per_job=max(events_per_job, 1))
+    for _ in range(events_per_job // 2):
+        for job_events in events:
+            for event in job_events:
+                watcher._process_event(event)
+
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    scheduler.shutdown(wait=False)
+
+    return used
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--jobs', type=int, default=10000)
+    parser.add_argument('--events-per-job', type=int, nargs='+', default=[0, 10, 100])
+    args = parser.parse_args()
+
+    baseline = run(args.jobs, 0)
+
+    for events_per_job in args.events_per_job:
+        used = run(args.jobs, events_per_job) if events_per_job else baseline
+        per_event = (used - baseline) // (args.jobs * events_per_job) if events_per_job else 0
+
+        print('%6d jobs %4d events/job %12d bytes %8d bytes/job %6d bytes/event' % (
+            args.jobs, events_per_job, used, used // args.jobs, per_event
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Measures how long `SchedulerWatcher.scheduler_summary()` takes and how large it is (as the JSON clients that don't
+negotiate a compact encoding get) with different amounts of jobs, each with a few execution events.
+
+Usage:
+    python -m benchmarks.bench_summary [--jobs 1000 10000 100000] [--events-per-job N] [--rounds N]
+"""
+import argparse
+import json
+
+from apschedulerui.encoding import PayloadEncoder
+from apschedulerui.watcher import SchedulerWatcher
+from benchmarks.utils import execution_events, measure, paused_scheduler
+
+
+def run(n_jobs, events_per_job, rounds):
+    scheduler = paused_scheduler(n_jobs)
+    watcher = SchedulerWatcher(scheduler)
+
+    for i in range(n_jobs):
+        for _ in range(events_per_job // 2):
+            for event in execution_events('job_%d' % i):
+                watcher._process_event(event)
+
+    timings = []
+    for _ in range(rounds):
+        summary, elapsed = measure(watcher.scheduler_summary)
+        timings.append(elapsed)
+
+    size = len(json.dumps(PayloadEncoder().encode(summary, 'json'), separators=(',', ':')))
+    scheduler.shutdown(wait=False)
+
+    return min(timings), size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--jobs', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--events-per-job', type=int, default=4, help='Execution events per job (pairs).')
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    for n_jobs in args.jobs:
+        elapsed, size = run(n_jobs, args.events_per_job, args.rounds)
+
+        print('%7d jobs summary min %9.1f ms %12d bytes (%6d bytes/job)' % (
+            n_jobs, elapsed * 1e3, size, size // n_jobs
+        ))
+
+
+if __name__ == '__main__':
+    main()
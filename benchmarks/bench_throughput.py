@@ -0,0 +1,68 @@
+"""
+Measures how many events per second go through `SchedulerWatcher._process_event` with different amounts of jobs, and
+how long each event takes when they come at a given rate instead of as fast as possible.
+
+Execution events (submission and execution pairs) of random jobs are fired from a single thread, as the scheduler
+would dispatch them. With `--rates`, events are paced to each rate (events per second, 0 meaning unpaced) and the
+per-event latency reported is the time spent in `_process_event`, which is what the scheduler's thread pays.
+
+Usage:
+    python -m benchmarks.bench_throughput [--jobs 1000 10000] [--events N] [--rates 0 1000 10000] [--async-events]
+"""
+import argparse
+import random
+import time
+
+from apschedulerui.watcher import SchedulerWatcher
+from benchmarks.utils import execution_events, paused_scheduler, percentile
+
+
+def run(n_jobs, n_events, rate, async_events):
+    scheduler = paused_scheduler(n_jobs)
+    watcher = SchedulerWatcher(scheduler, async_events=async_events, event_queue_size=n_events)
+
+    rng = random.Random(0)
+    events = [event for _ in range(n_events // 2) for event in execution_events('job_%d' % rng.randrange(n_jobs))]
+    interval = 1 / rate if rate else 0
+    latencies = []
+
+    start = time.perf_counter()
+
+    for i, event in enumerate(events):
+        if interval:
+            # Busy-wait until the event is due, sleeping would overshoot at high rates.
+            due = start + i * interval
+            while time.perf_counter() < due:
+                pass
+
+        event_start = time.perf_counter()
+        watcher._process_event(event)
+        latencies.append(time.perf_counter() - event_start)
+
+    watcher.flush()
+    elapsed = time.perf_counter() - start
+    scheduler.shutdown(wait=False)
+
+    return len(events) / elapsed, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--jobs', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--events', type=int, default=20000)
+    parser.add_argument('--rates', type=int, nargs='+', default=[0, 1000, 10000], help='Events/sec, 0 for unpaced.')
+    parser.add_argument('--async-events', action='store_true', help='Process events in the watcher\'s worker thread.')
+    args = parser.parse_args()
+
+    for n_jobs in args.jobs:
+        for rate in args.rates:
+            throughput, latencies = run(n_jobs, args.events, rate, args.async_events)
+
+            print('%6d jobs rate %-9s %10.0f events/sec latency p50 %7.1f us p99 %7.1f us' % (
+                n_jobs, rate or 'unpaced', throughput,
+                percentile(latencies, 0.5) * 1e6, percentile(latencies, 0.99) * 1e6
+            ))
+
+
+if __name__ == '__main__':
+    main()
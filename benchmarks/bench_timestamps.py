@@ -0,0 +1,95 @@
+"""
+Measures the per-event cost of the watcher's timestamps, formatting them with strftime as the events come (as the
+watcher used to) against keeping them raw and formatting them only when events are sent to clients.
+
+Pairs of execution events (submission and execution) are fired at the watcher with a listener watching their jobs,
+so each event carries its projected next run times, and the listener serializes every event as JSON. The `raw only`
+run skips formatting, which is what events that are never sent to a client cost now.
+
+Usage:
+    python -m benchmarks.bench_timestamps [--events N] [--depth N]
+"""
+import argparse
+import json
+
+from tzlocal import get_localzone
+
+from apschedulerui.encoding import PayloadEncoder
+from apschedulerui.stats import JobStats
+from apschedulerui.watcher import SchedulerEventsListener, SchedulerWatcher
+from benchmarks.utils import execution_events, measure, paused_scheduler
+
+
+class NoStats(JobStats):
+    # Durations can't be computed from formatted timestamps, and the watcher didn't aggregate them back then anyway.
+    def add(self, event_name, event_ts, scheduled_run_time=None):
+        pass
+
+
+class StrftimeWatcher(SchedulerWatcher):
+    job_stats_class = NoStats
+
+    def _repr_ts(self, ts):
+        if ts:
+            return ts.strftime('%Y-%m-%d %H:%M:%S.%f')
+        return None
+
+
+class Listener(SchedulerEventsListener):
+    def __init__(self, serialize):
+        self.serialize = serialize
+
+    def _scheduler_event(self, event):
+        pass
+
+    def _job_event(self, event):
+        json.dumps(self.serialize(event))
+
+    def _jobstore_event(self, event):
+        pass
+
+    def _executor_event(self, event):
+        pass
+
+    def _is_watching_job(self, job_id):
+        return True
+
+
+def run(watcher_class, serialize, n_events, depth, n_jobs=100):
+    scheduler = paused_scheduler(n_jobs)
+    watcher = watcher_class(scheduler, next_run_times_depth=depth)
+    watcher.add_listener(Listener(serialize))
+
+    events = [event for i in range(n_events // 2) for event in execution_events('job_%d' % (i % n_jobs))]
+
+    def process():
+        for event in events:
+            watcher._process_event(event)
+
+    _, elapsed = measure(process)
+    scheduler.shutdown(wait=False)
+
+    return elapsed / len(events)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=20000)
+    parser.add_argument('--depth', type=int, default=11, help='The watcher\'s next_run_times_depth.')
+    args = parser.parse_args()
+
+    # Timestamps are sent in the scheduler's timezone, which is the local one by default.
+    encoder = PayloadEncoder(timezone=get_localzone())
+    runs = [
+        ('strftime', StrftimeWatcher, lambda event: event),
+        ('raw+format', SchedulerWatcher, lambda event: encoder.encode(event, 'json')),
+        ('raw only', SchedulerWatcher, lambda event: event),
+    ]
+
+    for name, watcher_class, serialize in runs:
+        per_event = run(watcher_class, serialize, args.events, args.depth)
+        print('%-11s %6d events %7.1f us/event' % (name, args.events, per_event * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""
+Measures how many job events per second the watcher processes when they're emitted concurrently by several threads,
+as a ThreadPoolExecutor running many jobs at once would do.
+
+Usage:
+    python -m benchmarks.bench_watcher_concurrency [--events N] [--threads 1 8 32]
+"""
+import argparse
+import threading
+
+from apschedulerui.watcher import SchedulerWatcher
+from benchmarks.utils import execution_events, measure, paused_scheduler
+
+
+def run(n_threads, events_per_thread):
+    scheduler = paused_scheduler(n_threads)
+    watcher = SchedulerWatcher(scheduler)
+    barrier = threading.Barrier(n_threads + 1)
+
+    def emit(job_id):
+        events = execution_events(job_id)
+        barrier.wait()
+        for i in range(events_per_thread // 2):
+            for event in events:
+                watcher._process_event(event)
+
+    threads = [threading.Thread(target=emit, args=('job_%d' % i,)) for i in range(n_threads)]
+    for thread in threads:
+        thread.start()
+
+    def emit_all():
+        barrier.wait()
+        for thread in threads:
+            thread.join()
+
+    _, elapsed = measure(emit_all)
+    scheduler.shutdown(wait=False)
+
+    return (events_per_thread // 2) * 2 * n_threads / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=2000, help='Events emitted by each thread.')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 8, 32])
+    args = parser.parse_args()
+
+    for n_threads in args.threads:
+        print('%3d threads: %10.0f events/sec' % (n_threads, run(n_threads, args.events)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+Helpers shared by the benchmark scripts.
+"""
+import time
+from datetime import datetime
+
+from apscheduler.events import EVENT_JOB_EXECUTED, EVENT_JOB_SUBMITTED, JobExecutionEvent, JobSubmissionEvent
+from apscheduler.schedulers.background import BackgroundScheduler
+
+
+def noop():
+    pass
+
+
+def paused_scheduler(n_jobs, jobstore='default'):
+    """
+    Creates a started (but paused) scheduler with `n_jobs` interval jobs, so that nothing runs unless we fire
+    synthetic events.
+    """
+    scheduler = BackgroundScheduler()
+    scheduler.start(paused=True)
+
+    for i in range(n_jobs):
+        scheduler.add_job(noop, trigger='interval', minutes=1, id='job_%d' % i, jobstore=jobstore)
+
+    return scheduler
+
+
+def execution_events(job_id, jobstore='default'):
+    """
+    Returns a submission and an execution event for the given job, as the scheduler would dispatch them.
+    """
+    run_time = datetime.now()
+    return (
+        JobSubmissionEvent(EVENT_JOB_SUBMITTED, job_id, jobstore, [run_time]),
+        JobExecutionEvent(EVENT_JOB_EXECUTED, job_id, jobstore, run_time, retval=None)
+    )
+
+
+def measure(func, *args, **kwargs):
+    """
+    Calls `func` and returns a tuple with its result and the elapsed wall-clock seconds.
+    """
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def percentile(values, p):
+    """
+    Returns the `p` (between 0 and 1) percentile of a list of values.
+    """
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
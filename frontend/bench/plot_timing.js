@@ -0,0 +1,116 @@
+// Times redraws of the overview plot with the jobs of mock_data.js scaled up (1000 jobs by default, set ?jobs=N).
+//
+// Usage:
+//     npm run bench  # Then open bench/dist/index.html in a browser, results show up in the page and console.
+//
+// Scenarios:
+//     full:        every redraw plots everything from scratch (what the overview did before incremental rendering).
+//     unchanged:   incremental redraws with no changes in between (the periodic redraws).
+//     one change:  incremental redraws after a new execution of one job.
+import Scheduler from '../src/model/scheduler';
+import SchedulerPlot from '../src/view/scheduler_plot';
+import scheduler_mock_data from '../src/mock_data';
+
+let Plotly = require('plotly.js-basic-dist');
+
+const N_JOBS = parseInt(new URLSearchParams(window.location.search).get('jobs') || '1000');
+const REDRAWS = 20;
+const TIME_INTERVAL = 60 * 60 * 1000;
+
+
+function scheduler_now(timezone) {
+    return new Date(new Date().toLocaleString("en-US", {timeZone: timezone}));
+}
+
+// Clones the mock jobs until there are `n_jobs` of them, moving their timestamps so that the latest one is now.
+function scaled_state(n_jobs) {
+    const mock_jobs = Object.values(scheduler_mock_data.jobs);
+    const latest = Math.max(...mock_jobs.map(job => Math.max(...job.events.map(e => + new Date(e.event_ts)))));
+    const shift = scheduler_now(scheduler_mock_data.scheduler.timezone) - latest;
+    const move = ts => (ts === null || ts === undefined) ? ts : (+ new Date(ts)) + shift;
+
+    let jobs = {};
+
+    for(let i = 0; i < n_jobs; i++) {
+        const mock_job = mock_jobs[i % mock_jobs.length];
+        const job_id = mock_job.properties.id + '_' + i;
+
+        jobs[job_id] = {
+            added_time: move(mock_job.added_time),
+            modified_time: move(mock_job.modified_time),
+            removed_time: move(mock_job.removed_time),
+            properties: Object.assign({}, mock_job.properties, {
+                id: job_id,
+                name: mock_job.properties.name + ' ' + i,
+                next_run_time: mock_job.properties.next_run_time && mock_job.properties.next_run_time.map(move)
+            }),
+            events: mock_job.events.map(e => Object.assign({}, e, {
+                job_id: job_id,
+                event_ts: move(e.event_ts),
+                scheduled_run_time: move(e.scheduled_run_time)
+            }))
+        };
+    }
+
+    return Object.assign({}, scheduler_mock_data, {jobs: jobs});
+}
+
+function add_execution(scheduler, job_id) {
+    const now = + scheduler_now(scheduler.timezone);
+
+    scheduler.process_event({job_id: job_id, event_name: 'job_submitted', event_ts: now, scheduled_run_time: now});
+    scheduler.process_event({job_id: job_id, event_name: 'job_executed', event_ts: now + 1, scheduled_run_time: now});
+}
+
+function time_redraws(plot, elements, before_redraw) {
+    let timings = [];
+
+    for(let i = 0; i < REDRAWS; i++) {
+        before_redraw(i);
+
+        const start = performance.now();
+        plot.plot(...elements);
+        timings.push(performance.now() - start);
+    }
+
+    timings.sort((a, b) => a - b);
+    return {median: timings[Math.floor(timings.length / 2)], max: timings[timings.length - 1]};
+}
+
+function run() {
+    const scheduler = new Scheduler(scaled_state(N_JOBS));
+    const job_ids = Object.keys(scheduler.jobs);
+    const elements = ['plotly-main-plot', 'plotly-upper-axis', 'plotly-lower-axis'].map(id => {
+        const element = document.createElement('div');
+        element.id = id;
+        document.body.appendChild(element);
+        return element;
+    });
+
+    const plot = new SchedulerPlot(scheduler, TIME_INTERVAL);
+
+    const scenarios = {
+        'full': () => {
+            plot.reset();
+            elements.forEach(element => Plotly.purge(element));
+        },
+        'unchanged': () => {},
+        'one change': i => add_execution(scheduler, job_ids[i % job_ids.length])
+    };
+
+    let report = N_JOBS + ' jobs, ' + REDRAWS + ' redraws per scenario\n';
+
+    Object.keys(scenarios).forEach(name => {
+        plot.plot(...elements);  // Warm up.
+        const timing = time_redraws(plot, elements, scenarios[name]);
+        report += name.padEnd(12) + ' median ' + timing.median.toFixed(1) + ' ms, max ' + timing.max.toFixed(1) + ' ms\n';
+    });
+
+    console.log(report);
+
+    const output = document.createElement('pre');
+    output.textContent = report;
+    document.body.insertBefore(output, document.body.firstChild);
+}
+
+window.addEventListener('load', run);
@@ -0,0 +1,30 @@
+const HtmlWebpackPlugin = require('html-webpack-plugin')
+
+const path = require('path');
+
+// Builds the frontend benchmarks into bench/dist.
+module.exports = {
+    mode: 'production',
+    entry: path.resolve(__dirname, 'plot_timing.js'),
+    output: {
+        path: path.resolve(__dirname, 'dist'),
+        filename: 'plot_timing.bundle.js'
+    },
+    module: {
+        rules: [
+            {
+                test: /\.less$/,
+                use: [
+                    'style-loader',
+                    'css-loader',
+                    'less-loader'
+                ]
+            }
+        ],
+    },
+    plugins: [
+        new HtmlWebpackPlugin({
+            title: 'Apscheduler UI plot timing'
+        })
+    ]
+};
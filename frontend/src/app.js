@@ -15,6 +15,7 @@ import '@fortawesome/fontawesome-free/js/regular'
 import './css/index.less';
 
 import Scheduler from './model/scheduler';
+import { decoder, SUPPORTED_ENCODINGS } from './encoding';
 
 import './controllers/confirmModal';
 import './controllers/job_actions';
@@ -73,6 +74,70 @@ schedulerApp.service('capabilitiesService', ['socket', function (socket) {
 }]);
 
 
+schedulerApp.service('subscriptionsService', ['socket', '$rootScope', function (socket, $rootScope) {
+    // The job the current view follows, or null to follow every job. While following a single job we get compact
+    // updates of all the others, which the full events of every job make redundant otherwise.
+    this.job_id = null;
+    this.rooms = [];
+
+    this.wanted_rooms = () => {
+        let rooms = [];
+
+        if(this.job_id !== null) {
+            rooms.push('overview', 'job:' + this.job_id);
+        } else if($rootScope.scheduler) {
+            Object.keys($rootScope.scheduler.jobstores).forEach(alias => rooms.push('jobstore:' + alias));
+        }
+
+        return rooms;
+    };
+
+    this.follow = (job_id) => {
+        this.job_id = job_id;
+        this.sync(false);
+    };
+
+    // The server forgets the rooms of clients that disconnect, so we need to join them all again after reconnecting.
+    this.sync = (rejoin) => {
+        if(!$rootScope.scheduler) return;
+
+        const wanted = this.wanted_rooms();
+        const joined = rejoin ? [] : this.rooms;
+        const leaving = joined.filter(room => !wanted.includes(room));
+        const joining = wanted.filter(room => !joined.includes(room));
+
+        if(leaving.length > 0) {
+            // From now on we'll miss events of other jobs, so we can't tell anymore up to where we've seen them all.
+            if(leaving.some(room => room.startsWith('jobstore:'))) $rootScope.scheduler.set_partial();
+            socket.emit('unsubscribe', {rooms: leaving});
+        }
+
+        if(joining.length > 0) {
+            socket.emit('subscribe', Object.assign({rooms: joining}, $rootScope.scheduler.subscription_point()));
+        }
+
+        this.rooms = wanted;
+    };
+
+    socket.on('subscribed', (json) => {
+        json = decoder.decode(json);
+        console.log('subscribed', json.rooms);
+        $rootScope.scheduler.forget_jobs(json.forgotten_jobs);
+        $rootScope.scheduler.add_jobs(json.jobs);
+
+        if(this.job_id === null && json.rooms.some(room => room.startsWith('jobstore:'))) {
+            $rootScope.scheduler.set_complete(json.seq);
+        }
+    });
+
+    socket.on('job_overview', (updates) => {
+        if(!$rootScope.scheduler) return;
+        updates = decoder.decode(updates);
+        updates.forEach(update => $rootScope.scheduler.process_overview_update(update));
+    });
+}]);
+
+
 schedulerApp.config(['$routeProvider', '$locationProvider', function ($routeProvider, $locationProvider) {
     // Configure app routes.
     $routeProvider.
@@ -91,7 +156,7 @@ schedulerApp.config(['$routeProvider', '$locationProvider', function ($routeProv
     $locationProvider.html5Mode(true);
 }]);
 
-schedulerApp.run(['socket', '$rootScope', function (socket, $rootScope) {
+schedulerApp.run(['socket', '$rootScope', 'subscriptionsService', function (socket, $rootScope, subscriptionsService) {
     $rootScope.backendConnected = false;
 
     $rootScope.Utils = {
@@ -103,7 +168,18 @@ schedulerApp.run(['socket', '$rootScope', function (socket, $rootScope) {
 
     socket.on('connect', function () {
         $rootScope.backendConnected = true;
-        socket.emit('connected');
+        // Tell the server what we've already seen, so that it only sends us what changed while we were disconnected.
+        // We also let it know which compact encodings we can decode.
+        if($rootScope.scheduler && $rootScope.scheduler.synced) {
+            socket.emit('resume', Object.assign({encodings: SUPPORTED_ENCODINGS}, $rootScope.scheduler.resume_point()));
+        } else {
+            socket.emit('connected', {encodings: SUPPORTED_ENCODINGS});
+        }
+    });
+
+    socket.on('init_encoding', function(json) {
+        console.log('init_encoding', json.encoding);
+        decoder.configure(json);
     });
 
     socket.on('disconnect', function () {
@@ -111,18 +187,72 @@ schedulerApp.run(['socket', '$rootScope', function (socket, $rootScope) {
     });
 
     socket.on('init_jobs', function(json) {
+        json = decoder.decode(json);
         console.log('init_jobs', json);
-        $rootScope.scheduler = new Scheduler(json);
+
+        if($rootScope.scheduler && json.snapshot.since_seq !== null) {
+            $rootScope.scheduler.init_from_server(json);
+        } else {
+            $rootScope.scheduler = new Scheduler(json);
+        }
+
+        // Jobs come in pages, which we request one after the other.
+        if(json.snapshot.total_jobs > 0) {
+            socket.emit('get_jobs_page', {offset: 0});
+        } else {
+            $rootScope.scheduler.snapshot_completed();
+        }
+
+        subscriptionsService.sync(true);
+    })
+
+    socket.on('jobs_page', function(page) {
+        page = decoder.decode(page);
+        console.log('jobs_page', page.offset, page.total);
+        $rootScope.scheduler.add_jobs(page.jobs);
+
+        if(page.next_offset !== null) {
+            socket.emit('get_jobs_page', {offset: page.next_offset});
+        } else {
+            $rootScope.scheduler.snapshot_completed();
+        }
+    })
+
+    socket.on('resume', function(json) {
+        json = decoder.decode(json);
+        console.log('resume', json.events.length);
+        $rootScope.scheduler.resume(json);
+        subscriptionsService.sync(true);
+    })
+
+    socket.on('job_history', function(json) {
+        if(!$rootScope.scheduler) return;  // The job will come along with the snapshot.
+        json = decoder.decode(json);
+        $rootScope.scheduler.add_jobs({[json.properties.id]: json});
     })
 
     socket.on('job_event', function(json) {
+        json = decoder.decode(json);
         console.log('job_event', json);
         $rootScope.scheduler.process_event(json);
     })
+    socket.on('job_events', function(events) {
+        events = decoder.decode(events);
+        console.log('job_events', events.length);
+        events.forEach(event => $rootScope.scheduler.process_event(event));
+    })
     socket.on('scheduler_event', function(json) {
+        json = decoder.decode(json);
         console.log('scheduler_event', json);
         $rootScope.scheduler.process_event(json);
     })
+    socket.on('jobstore_event', function(json) {
+        json = decoder.decode(json);
+        console.log('jobstore_event', json);
+        $rootScope.scheduler.process_event(json);
+        // Follow the jobs of new jobstores too.
+        subscriptionsService.sync(false);
+    })
 }]);
 
 
@@ -4,8 +4,9 @@ import '../css/job.less';
 
 var job = angular.module('jobsModule', []);
 
-job.controller('jobController', ['$scope', '$rootScope', '$routeParams', '$controller', 'capabilitiesService',
-    function ($scope, $rootScope, $routeParams, $controller, capabilitiesService) {
+job.controller('jobController', ['$scope', '$rootScope', '$routeParams', '$controller', 'capabilitiesService', 'socket',
+    'subscriptionsService',
+    function ($scope, $rootScope, $routeParams, $controller, capabilitiesService, socket, subscriptionsService) {
     angular.extend(this, $controller('jobActionsController', {$scope: $scope}));
 
     // Decode jobId, as it'll come encoded since we can't control what users set it to.
@@ -17,6 +18,12 @@ job.controller('jobController', ['$scope', '$rootScope', '$routeParams', '$contr
     $scope.show_job_controls = false;
     $scope.capabilities = capabilitiesService;
 
+    // Only get every event of this job, and compact updates of the others.
+    subscriptionsService.follow($scope.jobId);
+
+    // The snapshot we got on connect might only have this job's latest events.
+    socket.emit('get_job_history', {job_id: $scope.jobId});
+
     let job_plot = null;
 
     let plots_container = document.getElementById('plots-container');
@@ -4,7 +4,8 @@ import SchedulerPlot from '../view/scheduler_plot';
 var jobList = angular.module('overviewModule', []);
 
 jobList.controller('overviewController', ['$scope', '$rootScope', '$controller', 'capabilitiesService',
-    function ($scope, $rootScope, $controller, capabilitiesService) {
+    'subscriptionsService',
+    function ($scope, $rootScope, $controller, capabilitiesService, subscriptionsService) {
     angular.extend(this, $controller('jobActionsController', {$scope: $scope}));
 
     $scope.scheduler = null;
@@ -16,7 +17,18 @@ jobList.controller('overviewController', ['$scope', '$rootScope', '$controller',
 
     $scope.capabilities = capabilitiesService;
 
-    let plot_time_interval = 60 * 1000;
+    // The overview shows every job, so we need all their events.
+    subscriptionsService.follow(null);
+
+    // The time intervals the plot can be switched to, in ms.
+    const plot_intervals = {
+        'Hour': 60 * 60 * 1000,
+        'Minute': 60 * 1000
+    };
+    // History is kept for the widest of them, so that switching intervals doesn't leave the plot's past empty.
+    const max_plot_interval = Math.max(...Object.values(plot_intervals));
+
+    let plot_time_interval = plot_intervals['Minute'];
 
     let scheduler_plot = new SchedulerPlot($scope.scheduler, plot_time_interval);
 
@@ -25,6 +37,11 @@ jobList.controller('overviewController', ['$scope', '$rootScope', '$controller',
     let upper_axis = document.getElementById('plotly-upper-axis');
     let lower_axis = document.getElementById('plotly-lower-axis');
 
+    function update_viewport() {
+        // The part of the plot that's on screen, in px from its top.
+        scheduler_plot.viewport = {top: - main_plot.getBoundingClientRect().top, height: window.innerHeight};
+    }
+
     function renderPlot() {
         if($scope.display_mode !== 'timeline' || $scope.scheduler === undefined) return;
         console.log('redraw ' + new Date());
@@ -35,6 +52,9 @@ jobList.controller('overviewController', ['$scope', '$rootScope', '$controller',
         if($scope.filter_query !== undefined) {
             scheduler_plot.jobs_filter = $scope.filter_query;
         }
+        // Nothing before the plot's widest visible range is shown, so there's no point in keeping it around.
+        if($scope.scheduler) $scope.scheduler.evict_before(scheduler_plot.x_min(max_plot_interval));
+        update_viewport();
         scheduler_plot.plot(main_plot, upper_axis, lower_axis);
         if(!$scope.plot_loaded) {
             $scope.plot_loaded = true;
@@ -63,6 +83,74 @@ jobList.controller('overviewController', ['$scope', '$rootScope', '$controller',
         }
     }
 
+    // Like the plot, the list only renders the rows around the viewport, a page (the viewport's height) at a time.
+    $scope.list_window = {'jobs': [], 'padding_top': 0, 'padding_bottom': 0};
+
+    let listed_jobs = [];
+    let list_range = null;
+    let list_row_height = 52;
+    let list_update = null;
+
+    function update_listed_jobs() {
+        list_update = null;
+        if(!$scope.scheduler || $scope.display_mode !== 'list') return;
+
+        const filter_query = ($scope.filter_query || '').toLowerCase();
+
+        listed_jobs = Object.values($scope.scheduler.jobs).filter(job => job.contains(filter_query));
+        listed_jobs.sort((job_a, job_b) => job_b.stats.last_event_ts - job_a.stats.last_event_ts);
+
+        update_list_window(true);
+    }
+
+    function schedule_list_update() {
+        if(list_update === null) list_update = window.requestAnimationFrame(update_listed_jobs);
+    }
+
+    function update_list_window(force) {
+        const list = document.querySelector('.jobs-panel tbody');
+        if(!list) return;
+
+        const row = list.querySelector('tr.job-row');
+        if(row && row.offsetHeight > 0) list_row_height = row.offsetHeight;
+
+        const page = Math.max(window.innerHeight, list_row_height);
+        const page_idx = Math.floor(Math.max(0, - list.getBoundingClientRect().top) / page);
+        const first = Math.min(listed_jobs.length, Math.floor(Math.max(0, page_idx - 1) * page / list_row_height));
+        const last = Math.min(listed_jobs.length, Math.ceil((page_idx + 2) * page / list_row_height));
+
+        if(!force && list_range !== null && list_range[0] === first && list_range[1] === last) return;
+        list_range = [first, last];
+
+        $scope.list_window = {
+            'jobs': listed_jobs.slice(first, last),
+            'padding_top': first * list_row_height,
+            'padding_bottom': (listed_jobs.length - last) * list_row_height
+        };
+        $scope.$applyAsync();
+    }
+
+    let scroll_frame = null;
+
+    function on_scroll() {
+        if(scroll_frame !== null) return;
+
+        scroll_frame = window.requestAnimationFrame(function () {
+            scroll_frame = null;
+
+            if($scope.display_mode === 'timeline') {
+                update_viewport();
+                if(scheduler_plot.needs_render()) renderPlot();
+            } else {
+                update_list_window(false);
+            }
+        });
+    }
+
+    // The page scrolls within .main-view, so we listen to scroll events while they go down to it.
+    window.addEventListener('scroll', on_scroll, true);
+    $scope.$on('$destroy', () => window.removeEventListener('scroll', on_scroll, true));
+
     let resizeDebounce = null;
 
     window.addEventListener('resize', function() {
@@ -78,6 +166,7 @@ jobList.controller('overviewController', ['$scope', '$rootScope', '$controller',
             plot_render_interval = window.setInterval(plot_render_pipeline, 500);
         } else {
             if(plot_render_interval) window.clearInterval(plot_render_interval);
+            schedule_list_update();
         }
         localStorage.setItem('display_mode', new_value);
     });
@@ -89,23 +178,36 @@ jobList.controller('overviewController', ['$scope', '$rootScope', '$controller',
             window.clearTimeout(search_debounce);
         }
         search_debounce = window.setTimeout(renderPlot, 300);
+        schedule_list_update();
     });
 
     $scope.$watch(function() {
       return $rootScope.scheduler;
     }, function() {
         $scope.scheduler = $rootScope.scheduler;
+        scheduler_plot.scheduler = $scope.scheduler;
         full_redraw = true;
-    }, true);
+        schedule_list_update();
+    });
+
+    // Deep-watching the scheduler would walk and copy every job on each digest, so we watch its version instead and
+    // only redraw if some of the jobs that changed are in the plot.
+    $scope.$watch(function() {
+        return $rootScope.scheduler ? $rootScope.scheduler.version : null;
+    }, function() {
+        if(!$rootScope.scheduler) return;
+
+        const changed_jobs = $rootScope.scheduler.take_changed_jobs();
+
+        if(!full_redraw && scheduler_plot.shows_any(changed_jobs)) full_redraw = true;
+        if(changed_jobs.size > 0) schedule_list_update();
+    });
 
     $scope.$watch('plot_interval', function (value) {
         // Make sure we store this config, so that if user reloads the view we can keep their preferences.
         localStorage.setItem('plot_interval', value);
 
-        plot_time_interval = {
-            'Hour': 60 * 60 * 1000,
-            'Minute': 60 * 1000
-        }[value];
+        plot_time_interval = plot_intervals[value];
 
         full_redraw = true;
         $scope.plot_loaded = false;
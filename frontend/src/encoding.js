@@ -0,0 +1,88 @@
+import { decode as msgpack_decode } from '@msgpack/msgpack';
+
+
+// Decodes the payloads the server sends in the encoding we negotiated with it (see apschedulerui/encoding.py).
+// Decoding is a no-op for plain JSON payloads, so it doesn't matter if some of them arrive before the negotiation.
+class PayloadDecoder {
+    constructor() {
+        this.encoding = 'json';
+        this.keys = {};
+        this.event_names = [];
+        this.timestamp_keys = new Set();
+        this.id_mapping_keys = new Set();
+    }
+
+    configure(tables) {
+        this.encoding = tables.encoding;
+        this.keys = {};
+        Object.keys(tables.keys).forEach(key => this.keys[tables.keys[key]] = key);
+        this.event_names = tables.event_names;
+        this.timestamp_keys = new Set(tables.timestamp_keys);
+        this.id_mapping_keys = new Set(tables.id_mapping_keys);
+    }
+
+    decode(payload) {
+        if(payload instanceof ArrayBuffer || ArrayBuffer.isView(payload)) payload = msgpack_decode(payload);
+        if(this.encoding === 'json') return payload;
+
+        return this.expand(payload, null);
+    }
+
+    expand(value, key) {
+        if(this.timestamp_keys.has(key)) return this.timestamps(value);
+
+        if(key === 'event_name') return typeof value === 'number' ? this.event_names[value] : value;
+
+        if(Array.isArray(value)) return value.map(v => this.expand(v, null));
+
+        if(value !== null && typeof value === 'object') {
+            let expanded = {};
+
+            if(this.id_mapping_keys.has(key)) {
+                Object.keys(value).forEach(k => expanded[k] = this.expand(value[k], null));
+            } else {
+                Object.keys(value).forEach(k => {
+                    const name = this.keys[k] !== undefined ? this.keys[k] : k;
+                    expanded[name] = this.expand(value[k], name);
+                });
+            }
+
+            return expanded;
+        }
+
+        return value;
+    }
+
+    timestamps(value) {
+        if(typeof value === 'number') return wall_clock_ms(value);
+        if(Array.isArray(value)) return value.map(v => this.timestamps(v));
+
+        if(value !== null && typeof value === 'object') {
+            let converted = {};
+            Object.keys(value).forEach(k => converted[k] = this.timestamps(value[k]));
+            return converted;
+        }
+
+        return value;
+    }
+}
+
+
+// Compact timestamps are the microseconds since the epoch of the scheduler's wall-clock time. We show them as local
+// times, as we do with the strings of plain JSON payloads, so we return the epoch milliseconds of that local time.
+function wall_clock_ms(us) {
+    const utc = new Date(Math.floor(us / 1000));
+
+    return new Date(
+        utc.getUTCFullYear(), utc.getUTCMonth(), utc.getUTCDate(),
+        utc.getUTCHours(), utc.getUTCMinutes(), utc.getUTCSeconds(), utc.getUTCMilliseconds()
+    ).getTime();
+}
+
+
+// Encodings we can decode, most compact first.
+const SUPPORTED_ENCODINGS = ['msgpack', 'compact'];
+
+const decoder = new PayloadDecoder();
+
+export { decoder, SUPPORTED_ENCODINGS };
@@ -282,3 +282,5 @@ var scheduler_mock_data = {
         }
     }
 };
+
+export default scheduler_mock_data;
@@ -0,0 +1,66 @@
+// Executions of a job, sorted by their scheduled run time (as epoch milliseconds), so that the ones in a time range can
+// be found with binary searches. Executions are mostly added in order, so inserting them is mostly appending.
+class Executions {
+    constructor() {
+        this.items = [];
+    }
+
+    get length() {
+        return this.items.length;
+    }
+
+    // Index of the first execution scheduled at or after `ts`.
+    lower_bound(ts) {
+        let low = 0;
+        let high = this.items.length;
+
+        while(low < high) {
+            const mid = (low + high) >>> 1;
+            if(this.items[mid].scheduled_ts < ts) low = mid + 1;
+            else high = mid;
+        }
+
+        return low;
+    }
+
+    get(scheduled_ts) {
+        const idx = this.lower_bound(+ scheduled_ts);
+        const execution = this.items[idx];
+
+        return (execution !== undefined && execution.scheduled_ts === + scheduled_ts) ? execution : undefined;
+    }
+
+    get_or_create(scheduled_ts) {
+        const idx = this.lower_bound(+ scheduled_ts);
+
+        if(this.items[idx] === undefined || this.items[idx].scheduled_ts !== + scheduled_ts) {
+            this.items.splice(idx, 0, {'scheduled_ts': + scheduled_ts, 'events': []});
+        }
+
+        return this.items[idx];
+    }
+
+    // Executions scheduled within [from_ts, to_ts], in order.
+    range(from_ts, to_ts) {
+        return this.items.slice(this.lower_bound(+ from_ts), this.lower_bound(+ to_ts + 1));
+    }
+
+    values() {
+        return this.items;
+    }
+
+    // Drops the oldest executions, keeping at most `capacity` of them and none that ended before `min_ts` (if given).
+    // Returns the dropped executions.
+    evict(capacity, min_ts=null) {
+        let n = Math.max(0, this.items.length - capacity);
+
+        if(min_ts !== null) {
+            // Executions that are still running stay, however old they are.
+            while(n < this.items.length && this.items[n].end_ts < min_ts && this.items[n].status !== 'job_submitted') n++;
+        }
+
+        return this.items.splice(0, n);
+    }
+}
+
+export default Executions;
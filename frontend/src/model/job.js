@@ -1,4 +1,17 @@
 
+import Executions from './executions';
+
+
+function format_ts(ts) {
+    if(ts === null || ts === undefined) return '';
+
+    const pad = (n) => String(n).padStart(2, '0');
+
+    return ts.getFullYear() + '-' + pad(ts.getMonth() + 1) + '-' + pad(ts.getDate()) + ' ' +
+        pad(ts.getHours()) + ':' + pad(ts.getMinutes()) + ':' + pad(ts.getSeconds());
+}
+
+
 class Job {
     constructor(state) {
         this.id = null;
@@ -29,62 +42,108 @@ class Job {
         }
 
         this.properties = {};
+        // Events of the job that aren't part of an execution (e.g. modifications).
         this.events = [];
-        this.executions = {};
+        this.executions = new Executions();
         this.next_run_times = [];
 
+        // Sequence numbers of the events we've already processed, and of the last state we got from the server.
+        this.seen_seqs = new Set();
+        this.state_seq = 0;
+
         this.last_event = null;
 
+        // Bumped whenever the job changes. What we derive from the job is cached until it changes again, see
+        // get_events, min_ts, max_ts and contains.
+        this.version = 0;
+        this.events_cache = null;
+        this.extent_cache = null;
+        this.search_cache = null;
+
         this.init_from_server(state);
     }
 
     init_from_server(state) {
-        this.properties = state.properties;
-
-        this.id = state.properties.id;
-        this.name = state.properties.name;
-        this.trigger = state.properties.trigger;
-        this.jobstore = state.properties.jobstore;
-        this.executor = state.properties.executor;
-        this.config.func = state.properties.func;
-        this.config.func_ref = state.properties.func_ref;
-        this.config.args = state.properties.args;
-        this.config.kwargs = state.properties.kwargs;
-        this.config.coalesce = state.properties.coalesce;
-        this.config.misfire_grace_time = state.properties.misfire_grace_time;
-        this.config.max_instances = state.properties.max_instances;
-
-        this.stats.pending = state.properties.pending;
+        this.version += 1;
+        if(state.seq !== undefined) this.state_seq = state.seq;
+
+        this.set_properties(state.properties);
+
         this.stats.added_ts = new Date(state.added_time);
         this.stats.modified_ts = new Date(state.modified_time);
 
         if(state.removed_time !== undefined && state.removed_time !== null) {
             this.stats.removed_ts = new Date(state.removed_time);
+        } else {
+            this.stats.removed_ts = null;
         }
+    }
+
+    set_properties(properties) {
+        this.version += 1;
+        this.properties = properties;
+
+        this.id = properties.id;
+        this.name = properties.name;
+        this.trigger = properties.trigger;
+        this.jobstore = properties.jobstore;
+        this.executor = properties.executor;
+        this.config.func = properties.func;
+        this.config.func_ref = properties.func_ref;
+        this.config.args = properties.args;
+        this.config.kwargs = properties.kwargs;
+        this.config.coalesce = properties.coalesce;
+        this.config.misfire_grace_time = properties.misfire_grace_time;
+        this.config.max_instances = properties.max_instances;
+
+        this.stats.pending = properties.pending;
 
-        if(state.properties.next_run_time !== null && state.properties.next_run_time.length > 0) {
-            for(let idx in state.properties.next_run_time) {
-                this.next_run_times.push(new Date(state.properties.next_run_time[idx]));
+        this.next_run_times = [];
+
+        if(properties.next_run_time !== null && properties.next_run_time.length > 0) {
+            for(let idx in properties.next_run_time) {
+                this.next_run_times.push(new Date(properties.next_run_time[idx]));
             }
         }
     }
 
     min_ts() {
-        if(this.stats.first_event_ts === null) return this.stats.added_ts;
-
-        return (this.stats.added_ts < this.stats.first_event_ts) ? this.stats.added_ts : this.stats.first_event_ts;
+        return this.extent().min_ts;
     }
 
     max_ts() {
-        if(this.next_run_times === undefined) return this.stats.last_event_ts;
+        return this.extent().max_ts;
+    }
 
-        let max_next_run = Math.max( ...this.next_run_times );
+    extent() {
+        if(this.extent_cache !== null && this.extent_cache.version === this.version) return this.extent_cache;
+
+        let min_ts = this.stats.added_ts;
+        let max_ts = this.stats.last_event_ts;
+
+        if(this.stats.first_event_ts !== null && !(this.stats.added_ts < this.stats.first_event_ts)) {
+            min_ts = this.stats.first_event_ts;
+        }
 
-        return (max_next_run > this.stats.last_event_ts) ? max_next_run : this.stats.last_event_ts;
+        if(this.next_run_times !== undefined) {
+            let max_next_run = Math.max( ...this.next_run_times );
+            if(max_next_run > this.stats.last_event_ts) max_ts = max_next_run;
+        }
+
+        this.extent_cache = {'version': this.version, 'min_ts': min_ts, 'max_ts': max_ts};
+
+        return this.extent_cache;
+    }
+
+    has_seen(event) {
+        return this.seen_seqs.has(event.seq);
     }
 
     process_job_event(event) {
+        if(event.seq !== undefined) this.seen_seqs.add(event.seq);
+
         this.last_event = event;
+        this.version += 1;
 
         if(this.stats.last_event_ts === null || event.ts > this.stats.last_event_ts) {
             this.stats.last_event_ts = event.ts;
@@ -96,8 +155,7 @@ class Job {
         }
 
         if(event.next_run_times !== undefined) {
-            this.next_run_times = []
-            event.next_run_times.forEach(ts => this.next_run_times.push(new Date(ts)));
+            this.set_next_run_times(event.next_run_times);
         }
 
         if(this[event.event_name] !== undefined) {
@@ -105,30 +163,58 @@ class Job {
         }
     }
 
+    process_overview_update(update) {
+        const ts = new Date(update.event_ts);
+
+        if(this.stats.last_event_ts === null || ts > this.stats.last_event_ts) {
+            this.stats.last_event_ts = ts;
+            this.stats.current_status = update.event_name;
+            this.version += 1;
+        }
+    }
+
+    set_next_run_times(next_run_times) {
+        this.version += 1;
+        this.next_run_times = [];
+        next_run_times.forEach(ts => this.next_run_times.push(new Date(ts)));
+    }
+
     job_modified(event) {
         this.stats.modified_ts = event.ts;
-        // TODO: re-read job properties!
+
+        // Modifications only carry the properties that changed.
+        if(event.changes !== undefined) {
+            this.set_properties(Object.assign({}, this.properties, event.changes));
+            // The projection sent with the event goes further than the next run time in the properties.
+            if(event.next_run_times !== undefined) this.set_next_run_times(event.next_run_times);
+        }
+
         this.events.push(event);
+        this.evict();
     }
 
     job_removed(event) {
         this.stats.removed_ts = event.ts;
         this.events.push(event);
+        this.evict();
+    }
+
+    execution_of(event) {
+        return this.executions.get_or_create(event.scheduled_run_ts !== undefined ? event.scheduled_run_ts : event.ts);
     }
 
     job_submitted(event) {
-        if(event.scheduled_run_ts !== undefined && this.executions[event.scheduled_run_ts] === undefined) {
-            this.executions[event.scheduled_run_ts] = {'events': []};
-        }
+        const execution = this.execution_of(event);
 
-        this.executions[event.scheduled_run_ts]['start_ts'] = event.ts;
+        execution['start_ts'] = event.ts;
 
-        if(this.executions[event.scheduled_run_ts]['end_ts'] === undefined) {
-            this.executions[event.scheduled_run_ts]['end_ts'] = event.ts;
-            this.executions[event.scheduled_run_ts]['status'] = event.event_name;
+        if(execution['end_ts'] === undefined) {
+            execution['end_ts'] = event.ts;
+            execution['status'] = event.event_name;
         }
 
-        this.executions[event.scheduled_run_ts]['events'].push(event);
+        execution['events'].push(event);
+        this.evict();
     }
 
     job_executed(event) {
@@ -146,16 +232,33 @@ class Job {
     }
 
     job_ended(event) {
-        if(event.scheduled_run_ts !== undefined && this.executions[event.scheduled_run_ts] === undefined) {
-            this.executions[event.scheduled_run_ts] = {'events': []};
+        const execution = this.execution_of(event);
+
+        if(execution['start_ts'] === undefined) {
+            execution['start_ts'] = event.ts;
         }
+        execution['end_ts'] = event.ts;
+        execution['status'] = event.event_name;
+        execution['events'].push(event);
+        this.evict();
+    }
+
+    // Keeps the job's history within Job.max_executions executions (and as many other events), dropping those that
+    // ended before `min_ts` too if given (e.g. those out of the plot's visible range).
+    evict(min_ts=null) {
+        const evicted = this.executions.evict(Job.max_executions, min_ts);
 
-        if(this.executions[event.scheduled_run_ts]['start_ts'] === undefined) {
-            this.executions[event.scheduled_run_ts]['start_ts'] = event.ts;
+        let n_events = Math.max(0, this.events.length - Job.max_executions);
+        if(min_ts !== null) {
+            while(n_events < this.events.length && this.events[n_events].ts < min_ts) n_events++;
         }
-        this.executions[event.scheduled_run_ts]['end_ts'] = event.ts;
-        this.executions[event.scheduled_run_ts]['status'] = event.event_name;
-        this.executions[event.scheduled_run_ts]['events'].push(event);
+
+        evicted.forEach(execution => execution.events.forEach(e => this.seen_seqs.delete(e.seq)));
+        this.events.splice(0, n_events).forEach(e => this.seen_seqs.delete(e.seq));
+
+        // We forget the events we drop, so that we take them again if the server sends them (e.g. with the job's full
+        // history when opening its view).
+        if(evicted.length > 0 || n_events > 0) this.version += 1;
     }
 
     job_max_instances(event) {
@@ -164,41 +267,47 @@ class Job {
     }
 
     contains(search_term) {
-        let job_status = '';
-
         // Make sure comparisons are case-insensitive.
-        search_term = search_term.toLowerCase();
+        return this.search_text().includes(search_term.toLowerCase());
+    }
 
-        if(this.stats.current_status !== null) {
-            job_status = this.stats.current_status.toLowerCase();
-        }
-        const name = this.name.toLowerCase() || '';
+    // The lowercase text searches look into: the job's name, status, last event time and next run time. Fields are
+    // separated by a character nobody types, so that a search can't match across them.
+    search_text() {
+        if(this.search_cache !== null && this.search_cache.version === this.version) return this.search_cache.text;
 
-        let last_ts = '';
-        let next_ts = '';
+        // Timestamps may come as numbers in compact payloads, so we search their string representation instead.
+        const text = [
+            this.name || '',
+            this.stats.current_status || '',
+            format_ts(this.stats.last_event_ts),
+            format_ts(this.next_run_times[0])
+        ].join('\u0000').toLowerCase();
 
-        if(this.last_event !== null) {
-            last_ts = this.last_event.event_ts || '';
-            next_ts = this.last_event.next_run_times[0] || '';
-        }
+        this.search_cache = {'version': this.version, 'text': text};
 
-        return name.includes(search_term) ||
-            job_status.includes(search_term) ||
-            last_ts.includes(search_term) ||
-            next_ts.includes(search_term);
+        return text;
     }
 
     get_events() {
+        // Views call this on every digest, so we only build the list again if something changed.
+        if(this.events_cache !== null && this.events_cache.version === this.version) return this.events_cache.events;
+
         let all_events = [];
 
-        Object.keys(this.executions).forEach(execution => {
-            this.executions[execution].events.forEach(e => all_events.push(e))
+        this.executions.values().forEach(execution => {
+            execution.events.forEach(e => all_events.push(e))
         })
 
         this.events.forEach(e => all_events.push(e));
 
+        this.events_cache = {'version': this.version, 'events': all_events};
+
         return all_events;
     }
 }
 
+// The most executions (and other events) we keep of each job.
+Job.max_executions = 500;
+
 export default Job;
\ No newline at end of file
@@ -1,6 +1,14 @@
 
 import Job from './job';
 
+function extend_range(range, other) {
+    return [
+        Number.isFinite(other[0]) && (range[0] === null || other[0] < range[0]) ? other[0] : range[0],
+        Number.isFinite(other[1]) && (range[1] === null || other[1] > range[1]) ? other[1] : range[1]
+    ];
+}
+
+
 class Scheduler {
     constructor(state) {
         this.class = "BaseScheduler";
@@ -15,6 +23,27 @@ class Scheduler {
         this.executors = {};
         this.jobs = {};
 
+        // Where the server snapshot we're receiving comes from and how far it goes, and the sequence number of the
+        // last event we've seen. We can only ask the server to resume from it once we've got the whole snapshot.
+        this.instance = null;
+        this.snapshot_seq = 0;
+        this.last_seq = 0;
+        this.synced = false;
+        // Whether we're getting the events of every job, or only of some of them (e.g. while viewing a single job).
+        this.complete = false;
+        // Sequence number of the last scheduler, jobstore or executor event we've applied.
+        this.state_seq = 0;
+
+        // Bumped on every change to the model, so that views can watch it instead of deep-watching the whole model.
+        this.version = 0;
+        // Jobs that changed since a view last took them (see take_changed_jobs), so that it only redraws what it must.
+        this.changed_jobs = new Set();
+
+        // Time range covered by the jobs (see ts_range), kept up to date as they change. Ranges of each job are kept
+        // to tell when the one that set a bound shrinks, in which case we have to look at every job again.
+        this.job_ranges = new Map();
+        this.range = [null, null];
+
         this.init_from_server(state);
     }
 
@@ -31,19 +60,128 @@ class Scheduler {
         this.executors = state.executors;
         // TODO: create model for job stores.
         this.jobstores = state.jobstores;
+        this.touch();
+
+        if(state.snapshot !== undefined) {
+            this.instance = state.snapshot.instance;
+            this.snapshot_seq = state.snapshot.seq;
+            this.synced = false;
+            this.forget_jobs(state.snapshot.forgotten_jobs);
+        }
+
+        this.add_jobs(state.jobs);
+    }
+
+    add_jobs(jobs) {
+        Object.keys(jobs).forEach(job_id => {
+            const job_state = jobs[job_id];
+            // States may come out of order (e.g. a snapshot page after a subscription), only keep the latest one.
+            const is_latest = this.jobs[job_id] === undefined || job_state.seq >= this.jobs[job_id].state_seq;
 
-        Object.keys(state.jobs).forEach(job_id => {
-            this.jobs[job_id] = new Job(state.jobs[job_id]);
+            if(this.jobs[job_id] === undefined) {
+                this.jobs[job_id] = new Job(job_state);
+            } else if(is_latest) {
+                this.jobs[job_id].init_from_server(job_state);
+            }
 
-            if(state.jobs[job_id].events !== undefined && state.jobs[job_id].events.length > 0) {
-                state.jobs[job_id].events.forEach(event => {
+            if(job_state.events !== undefined && job_state.events.length > 0) {
+                job_state.events.forEach(event => {
                     this.process_event(event)
                 });
             }
+
+            // Events in the job's history don't carry projections, the job's current ones come along with its state.
+            if(is_latest && job_state.next_run_times !== undefined) {
+                this.jobs[job_id].set_next_run_times(job_state.next_run_times);
+            }
+
+            this.touch(job_id);
+        });
+    }
+
+    // Drops the jobs the server forgot since we last saw them (see SchedulerWatcher.forgotten_job_ids).
+    forget_jobs(job_ids) {
+        if(job_ids === undefined) return;
+
+        job_ids.forEach(job_id => {
+            if(this.jobs[job_id] === undefined) return;
+
+            delete this.jobs[job_id];
+            this.job_ranges.delete(job_id);
+            this.range = null;  // It may have been set by the job, it'll be computed again when needed.
+            this.touch(job_id);
+        });
+    }
+
+    resume(state) {
+        this.state = state.scheduler.state;
+        this.executors = state.executors;
+        this.jobstores = state.jobstores;
+        this.forget_jobs(state.forgotten_jobs);
+        this.touch();
+
+        state.events.forEach(event => {
+            this.process_event(event);
+        });
+
+        Object.keys(state.next_run_times).forEach(job_id => {
+            if(this.jobs[job_id] !== undefined) {
+                this.jobs[job_id].set_next_run_times(state.next_run_times[job_id]);
+                this.touch(job_id);
+            }
         });
+
+        this.last_seq = Math.max(this.last_seq, state.seq);
+    }
+
+    snapshot_completed() {
+        this.last_seq = Math.max(this.last_seq, this.snapshot_seq);
+        this.synced = true;
+    }
+
+    resume_point() {
+        if(!this.synced) return {};
+        return {'instance': this.instance, 'since_seq': this.last_seq};
+    }
+
+    subscription_point() {
+        return {'instance': this.instance, 'since_seq': this.synced ? this.last_seq : this.snapshot_seq};
+    }
+
+    set_partial() {
+        this.complete = false;
+    }
+
+    set_complete(seq) {
+        this.complete = true;
+        this.last_seq = Math.max(this.last_seq, seq);
+    }
+
+    process_overview_update(update) {
+        const job = this.jobs[update.job_id];
+
+        // Jobs we get all events of are kept up to date by them.
+        if(this.complete || job === undefined || job.has_seen(update)) return;
+
+        job.process_overview_update(update);
+        this.touch(update.job_id);
     }
 
     process_event(event) {
+        if(event.seq !== undefined) {
+            // We might get the same event both live and as part of a snapshot page.
+            if(event.job_id === undefined) {
+                // Replayed events may be older than the live ones we've already applied.
+                if(event.seq <= this.state_seq) return;
+                this.state_seq = event.seq;
+            } else if(this.jobs[event.job_id] !== undefined && this.jobs[event.job_id].has_seen(event)) {
+                return;
+            }
+
+            // Unless we get every event, a gap in the ones we've seen doesn't mean we've missed something.
+            if(this.complete) this.last_seq = Math.max(this.last_seq, event.seq);
+        }
+
         event.ts = new Date(event.event_ts);
 
         if(event.scheduled_run_time !== undefined) event.scheduled_run_ts = new Date(event.scheduled_run_time);
@@ -59,6 +197,57 @@ class Scheduler {
         } else {
             console.log('Unknown event ', event);
         }
+
+        this.touch(event.job_id);
+    }
+
+    // Drops the jobs' history that ended before `ts` (see Job.evict).
+    evict_before(ts) {
+        Object.keys(this.jobs).forEach(job_id => this.jobs[job_id].evict(ts));
+    }
+
+    touch(job_id) {
+        this.version += 1;
+
+        if(job_id !== undefined) {
+            this.changed_jobs.add(job_id);
+            if(this.jobs[job_id] !== undefined) this.update_range(job_id);
+        }
+    }
+
+    update_range(job_id) {
+        const previous = this.job_ranges.get(job_id);
+        const range = [+ this.jobs[job_id].min_ts(), + this.jobs[job_id].max_ts()];
+
+        this.job_ranges.set(job_id, range);
+
+        if(this.range === null) return;  // It'll be computed again when needed.
+
+        if(previous !== undefined && (
+            (previous[0] === this.range[0] && !(range[0] <= previous[0])) ||
+            (previous[1] === this.range[1] && !(range[1] >= previous[1]))
+        )) {
+            this.range = null;
+            return;
+        }
+
+        this.range = extend_range(this.range, range);
+    }
+
+    // The earliest and latest timestamps of the jobs (as epoch milliseconds), or nulls if there are none.
+    ts_range() {
+        if(this.range === null) {
+            this.range = [null, null];
+            this.job_ranges.forEach(range => this.range = extend_range(this.range, range));
+        }
+
+        return this.range;
+    }
+
+    take_changed_jobs() {
+        const changed_jobs = this.changed_jobs;
+        this.changed_jobs = new Set();
+        return changed_jobs;
     }
 
     scheduler_started(event) {
@@ -86,15 +275,17 @@ class Scheduler {
     }
 
     jobstore_added(event) {
-
+        if(this.jobstores[event.jobstore_name] === undefined) this.jobstores[event.jobstore_name] = event.jobstore_name;
     }
 
     jobstore_removed(event) {
-
+        delete this.jobstores[event.jobstore_name];
     }
 
     job_added(event) {
-        this.jobs[event.job_id] = new Job(event);
+        if(this.jobs[event.job_id] === undefined) {
+            this.jobs[event.job_id] = new Job(event);
+        }
         // Process event so that next_run_times get updated.
         this.jobs[event.job_id].process_job_event(event);
     }
@@ -102,6 +293,7 @@ class Scheduler {
     all_jobs_removed(event) {
         Object.keys(this.jobs).forEach(job_id => {
             this.jobs[job_id].process_job_event(event);
+            this.touch(job_id);
         });
     }
 }
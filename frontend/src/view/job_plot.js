@@ -7,17 +7,16 @@ export default class JobPlot extends SchedulerPlot {
         // Default job plot interval to 1 minute.
         let avg_execution_diff = 60 * 1000;
 
-        const executions = scheduler.jobs[job_id].executions;
-        const execution_id = Object.keys(executions);
+        const executions = scheduler.jobs[job_id].executions.values();
 
         // Try to estimate the best time interval to plot this job by calculating the average diff in time between
         // past job executions and next run times (if any).
         let cum_sum = 0;
         let data_points = 0;
 
-        if(execution_id.length > 1) {
-            for(let i = 1; i < execution_id.length; i++) {
-                cum_sum += executions[execution_id[i]].start_ts - executions[execution_id[i - 1]].start_ts;
+        if(executions.length > 1) {
+            for(let i = 1; i < executions.length; i++) {
+                cum_sum += executions[i].start_ts - executions[i - 1].start_ts;
                 data_points++;
             }
         }
@@ -7,6 +7,31 @@ import figure_template from './plotly_templates';
 import { event_aesthetics, jobs_aesthetics, plot_aesthetics } from './aesthetics';
 
 
+function empty_points() {
+    return {
+        'x': [],
+        'y': [],
+        'fill': [],
+        'size': [],
+        'border_color': [],
+        'border_size': []
+    };
+}
+
+function add_point(points, x, y, aes) {
+    points.x.push(x);
+    points.y.push(y);
+    points.fill.push(aes.fill);
+    points.border_color.push(aes.border_color);
+    points.size.push(aes.size);
+    points.border_size.push(aes.border_size);
+}
+
+function append_points(points, other) {
+    Object.keys(points).forEach(key => other[key].forEach(value => points[key].push(value)));
+}
+
+
 class SchedulerPlot {
 
     constructor(scheduler, time_interval, target_plot_width=1300, min_intervals=12, interval_size_px=60) {
@@ -16,6 +41,27 @@ class SchedulerPlot {
         this.target_plot_width = target_plot_width;
         this.min_intervals = min_intervals;
         this.jobs_filter = "";
+
+        // What a render computes once, see displayed_jobs and now_ts.
+        this.render_cache = null;
+        // The jobs shown by the latest render, see shows_any.
+        this.rendered_jobs = new Set();
+
+        // The part of the plot that's on screen, see render_window.
+        this.viewport = null;
+        this.rendered_window = null;
+        this.rendered_height = null;
+
+        // What we rendered of each job last time, see get_plot_data.
+        this.job_renders = {};
+        // Keys of the layouts of the last plots we drew, so that we don't lay them out again if they didn't change.
+        this.layout_keys = {};
+    }
+
+    reset() {
+        this.job_renders = {};
+        this.layout_keys = {};
+        this.grid = undefined;
     }
 
     n_intervals() {
@@ -35,38 +81,57 @@ class SchedulerPlot {
     }
 
     n_jobs() {
-        let n = 0;
+        return this.displayed_jobs().length;
+    }
 
-        Object.keys(this.scheduler.jobs).forEach(job_id =>
-            n+= this.scheduler.jobs[job_id].contains(this.jobs_filter) &&
-                this.scheduler.jobs[job_id].min_ts() <= this.x_max() &&
-                this.scheduler.jobs[job_id].max_ts() >= this.x_min()
-        );
+    // Ids of the jobs that pass the filter and are within the plot's window, in the order they're plotted. Computed
+    // once per render (see plot).
+    displayed_jobs() {
+        if(this.render_cache !== null && this.render_cache.displayed_jobs !== undefined) {
+            return this.render_cache.displayed_jobs;
+        }
+
+        const jobs_filter = this.jobs_filter.toLowerCase();
+        const x_min = this.x_min();
+        const x_max = this.x_max();
+
+        const displayed_jobs = this.get_jobs_order().filter(job_id => {
+            const job = this.scheduler.jobs[job_id];
+            return job.contains(jobs_filter) && job.min_ts() <= x_max && job.max_ts() >= x_min;
+        });
 
-        return n;
+        if(this.render_cache !== null) this.render_cache.displayed_jobs = displayed_jobs;
+
+        return displayed_jobs;
     }
 
-    min_ts() {
-        let ts = null;
-        for(let job_id in this.scheduler.jobs) {
-            if(ts === null || ts > this.scheduler.jobs[job_id].min_ts())
-                ts = this.scheduler.jobs[job_id].min_ts();
+    // Whether any of the jobs is on the plot, or should now be.
+    shows_any(job_ids) {
+        if(!this.scheduler) return false;
+
+        for(const job_id of job_ids) {
+            // A job that no longer passes the filter still has to be redrawn to be taken off the plot.
+            if(this.rendered_jobs.has(job_id)) return true;
+
+            const job = this.scheduler.jobs[job_id];
+            if(job === undefined || job.contains(this.jobs_filter.toLowerCase())) return true;
         }
 
-        return ts;
+        return false;
     }
 
-    max_ts() {
-        let ts = null;
-        for(let job_id in this.scheduler.jobs) {
-            if(ts === null || ts < this.scheduler.jobs[job_id].max_ts())
-                ts = this.scheduler.jobs[job_id].max_ts();
-        }
+    min_ts() {
+        return this.scheduler.ts_range()[0];
+    }
 
-        return ts;
+    max_ts() {
+        return this.scheduler.ts_range()[1];
     }
 
     now_ts() {
+        // All of a render is done as of the same time, see plot.
+        if(this.render_cache !== null) return this.render_cache.now_ts;
+
         // Return timestamps in the scheduler's timezone.
         const now_ts = new Date().toLocaleString("en-US", {timeZone: this.scheduler.timezone})
         return new Date(now_ts);
@@ -80,10 +145,11 @@ class SchedulerPlot {
         return 16 + this.n_jobs() * 86;
     }
 
-    x_min() {
-        var truncated_now = Math.floor(this.now_ts() / this.time_interval) * this.time_interval;
+    // The left edge of the plot, with its current time interval or with another one.
+    x_min(time_interval = this.time_interval) {
+        var truncated_now = Math.floor(this.now_ts() / time_interval) * time_interval;
         var n_intervals = Math.round(this.n_intervals() / 2);
-        return truncated_now - n_intervals * this.time_interval;
+        return truncated_now - n_intervals * time_interval;
     }
 
     x_max() {
@@ -171,173 +237,172 @@ class SchedulerPlot {
         }
     }
 
-    get_plot_data() {
-        let shapes = [];
-        let annotations = [];
-        let executions_data = [];
-        let point_events = {
-            'x': [],
-            'y': [],
-            'symbol': [],
-            'fill': [],
-            'size': [],
-            'border_color': [],
-            'border_size': []
+    render_job(job, job_y, x_min, x_max, now_ts) {
+        let render = {
+            'running': false,
+            'executions': [],
+            'active': [],
+            'points': empty_points(),
+            'added': empty_points(),
+            'shapes': [],
+            'name': null
         };
 
-        let added_events = {
-            'x': [],
-            'y': [],
-            'fill': [],
-            'size': [],
-            'border_color': [],
-            'border_size': []
-        };
+        let job_min_ts = job.min_ts();
+        let job_max_ts = job.max_ts();
 
-        let active_executions = [];
+        if(job_min_ts < x_min) {
+            job_min_ts = x_min;
+            // TODO: add indicator.
+        }
 
-        this.add_plot_shapes(shapes);
+        if(job_max_ts > x_max) {
+            job_max_ts = x_max;
+            // TODO: add indicator.
+        }
 
-        let job_ids = this.get_jobs_order();
+        // Executions start a bit after their scheduled run time, so we look an interval further back for them.
+        let executions = job.executions.range(job_min_ts - this.time_interval, job_max_ts);
 
-        let n_jobs_displayed = 0;
+        for(let execution_idx = 0; execution_idx < executions.length; execution_idx++) {
+            let execution = executions[execution_idx];
 
-        for(let job_idx in job_ids) {
-            let job_id = job_ids[job_idx];
-            let job = this.scheduler.jobs[job_id];
+            if(execution.start_ts < job_min_ts) continue;
 
-            if(!job.contains(this.jobs_filter.toLowerCase())) continue;
+            if(execution.status === 'job_submitted')
+                execution.end_ts = now_ts;
 
-            let job_y = 66 + n_jobs_displayed * 86;
+            if(execution.status === 'job_missed') {
+                add_point(render.points, execution.end_ts, job_y, event_aesthetics[execution.status]);
+                continue;
+            }
 
-            let job_min_ts = job.min_ts();
-            let job_max_ts = job.max_ts();
+            // Job events backgrounds.
+            render.executions.push(this.render_execution_background(job_y, execution));
+            render.executions.push(this.render_execution(job_y, execution));
 
-            if(job_min_ts < this.x_min()) {
-                job_min_ts = this.x_min();
-                // TODO: add indicator.
-            }
+            if(execution.status === 'job_submitted') {
+                // We need to animate these data points after rendering the initial plot!
+                render.running = true;
+                render.active.push(render.executions.length - 2);
+                render.active.push(render.executions.length - 1);
 
-            if(job_max_ts > this.x_max()) {
-                job_max_ts = this.x_max();
-                // TODO: add indicator.
+                // Avoid jobs that are not scheduled to run in the future have cards that do not cover the "running" animation.
+                job_max_ts = Math.max(job_max_ts, (+ now_ts) + this.time_interval);
             }
+        }
 
-            if(job_max_ts < this.x_min() || job_min_ts > this.x_max()) continue;  // Job is outside of view pane.
+        if(job.stats.added_ts !== undefined && job.stats.added_ts >= job_min_ts) {
+            add_point(render.added, job.stats.added_ts, job_y, event_aesthetics['job_added']);
+        }
 
-            n_jobs_displayed += 1;
+        for(let event_idx in job.events) {
+            let event = job.events[event_idx];
 
-            let executions = job.executions;
-            let execution_keys = Object.keys(executions).sort();
+            if(event.ts < job_min_ts) continue;
 
-            for(let execution_idx in execution_keys) {
-                let execution_key = execution_keys[execution_idx];
-                let execution = executions[execution_key];
+            add_point(render.points, event.ts, job_y, event_aesthetics[event.event_name]);
+        }
+
+        for(let event_idx in job.next_run_times) {
+            let next_run_time = job.next_run_times[event_idx];
 
-                if(execution.start_ts < job_min_ts) continue;
+            if(next_run_time > job_max_ts || next_run_time < job_min_ts) continue;
 
-                if(execution.status === 'job_submitted')
-                    execution.end_ts = this.now_ts();
+            add_point(render.points, next_run_time, job_y, event_aesthetics['job_scheduled']);
+        }
 
-                if(execution.status === 'job_missed') {
-                    let aes = event_aesthetics[execution.status];
+        // Add job cards.
+        const job_background = this.job_background(+ job_min_ts, + job_max_ts, job_y - 50, job_y + 20);
 
-                    point_events.x.push(execution.end_ts);
-                    point_events.y.push(job_y);
-                    point_events.fill.push(aes.fill);
-                    point_events.border_color.push(aes.border_color);
-                    point_events.size.push(aes.size);
-                    point_events.border_size.push(aes.border_size);
+        if(job_background) {
+            render.shapes.push({
+                "type": "path",
+                "path": job_background,
+                "layer": "below",
+                "fillcolor": jobs_aesthetics.card_background,
+                "opacity": jobs_aesthetics.card_opacity
+            })
+        }
+
+        // Add y-grid inside job card.
+        render.shapes.push({
+            "type": "line",
+            "x0": job_min_ts,
+            "x1": job_max_ts,
+            "y0": job_y,
+            "y1": job_y,
+            "line": {
+                "color": jobs_aesthetics.card_axis_color,
+                "width": plot_aesthetics.grid_width
+            },
+            "opacity": jobs_aesthetics.card_opacity,
+            "layer": "below"
+        })
 
-                    continue;
-                }
+        render.name = this.render_job_name(job_y, job_min_ts, job);
 
-                // Job events backgrounds.
-                executions_data.push(this.render_execution_background(job_y, execution));
-                executions_data.push(this.render_execution(job_y, execution));
+        return render;
+    }
 
-                if(execution.status === 'job_submitted') {
-                    // We need to animate these data points after rendering the initial plot!
-                    active_executions.push(executions_data.length - 2);
-                    active_executions.push(executions_data.length - 1);
+    get_plot_data(render_window = null) {
+        let shapes = [];
+        let annotations = [];
+        let executions_data = [];
+        let point_events = empty_points();
+        let added_events = empty_points();
+        let active_executions = [];
 
-                    // Avoid jobs that are not scheduled to run in the future have cards that do not cover the "running" animation.
-                    job_max_ts = Math.max(job_max_ts, (+ this.now_ts()) + this.time_interval);
-                }
-            }
+        // The grid only changes with the plot's window and height.
+        const grid_key = this.x_min() + '|' + this.x_max() + '|' + this.time_interval + '|' + this.y_max();
 
-            if(job.stats.added_ts !== undefined && job.stats.added_ts >= job_min_ts) {
-                let aes = event_aesthetics['job_added'];
+        if(this.grid === undefined || this.grid.key !== grid_key) {
+            this.grid = {'key': grid_key, 'shapes': this.add_plot_shapes([]) || []};
+        }
+        this.grid.shapes.forEach(shape => shapes.push(shape));
 
-                added_events.x.push(job.stats.added_ts);
-                added_events.y.push(job_y);
-                added_events.fill.push(aes.fill);
-                added_events.border_color.push(aes.border_color);
-                added_events.size.push(aes.size);
-                added_events.border_size.push(aes.border_size);
-            }
+        let job_ids = this.displayed_jobs();
+        let x_min = this.x_min();
+        let x_max = this.x_max();
+        let now_ts = this.now_ts();
 
-            for(let event_idx in job.events) {
-                let event = job.events[event_idx];
-                let aes = event_aesthetics[event.event_name];
+        let n_jobs_displayed = 0;
+        let job_renders = {};
 
-                if(event.ts < job_min_ts) continue;
+        for(let job_idx in job_ids) {
+            let job_id = job_ids[job_idx];
+            let job = this.scheduler.jobs[job_id];
 
-                point_events.x.push(event.ts);
-                point_events.y.push(job_y);
-                point_events.fill.push(aes.fill);
-                point_events.border_color.push(aes.border_color);
-                point_events.size.push(aes.size);
-                point_events.border_size.push(aes.border_size);
-            }
+            let job_y = 66 + n_jobs_displayed * 86;
+            n_jobs_displayed += 1;
 
-            for(let event_idx in job.next_run_times) {
-                let aes = event_aesthetics['job_scheduled'];
-                let next_run_time = job.next_run_times[event_idx];
+            // Jobs whose card is out of the render window keep their row, but get no traces.
+            if(render_window !== null && (job_y + 20 < render_window.y0 || job_y - 50 > render_window.y1)) continue;
 
-                if(next_run_time > job_max_ts || next_run_time < job_min_ts) continue;
+            let render = this.job_renders[job_id];
 
-                point_events.x.push(next_run_time);
-                point_events.y.push(job_y);
-                point_events.fill.push(aes.fill);
-                point_events.border_color.push(aes.border_color);
-                point_events.size.push(aes.size);
-                point_events.border_size.push(aes.border_size);
-            }
+            // A job's traces only change if the job, its position or the plot's window do. Running executions grow
+            // with time though, so we always render jobs that have some.
+            const key = job.version + '|' + job_y + '|' + x_min + '|' + x_max;
 
-            // Add job cards.
-            const job_background = this.job_background(+ job_min_ts, + job_max_ts, job_y - 50, job_y + 20);
-
-            if(job_background) {
-                shapes.push({
-                    "type": "path",
-                    "path": job_background,
-                    "layer": "below",
-                    "fillcolor": jobs_aesthetics.card_background,
-                    "opacity": jobs_aesthetics.card_opacity
-                })
+            if(render === undefined || render.key !== key || render.running) {
+                render = this.render_job(job, job_y, x_min, x_max, now_ts);
+                render.key = key;
             }
 
-            // Add y-grid inside job card.
-            shapes.push({
-                "type": "line",
-                "x0": job_min_ts,
-                "x1": job_max_ts,
-                "y0": job_y,
-                "y1": job_y,
-                "line": {
-                    "color": jobs_aesthetics.card_axis_color,
-                    "width": plot_aesthetics.grid_width
-                },
-                "opacity": jobs_aesthetics.card_opacity,
-                "layer": "below"
-            })
-
-            const job_name = this.render_job_name(job_y, job_min_ts, job);
+            job_renders[job_id] = render;
 
-            if(job_name) annotations.push(job_name);
+            render.active.forEach(idx => active_executions.push(executions_data.length + idx));
+            render.executions.forEach(e => executions_data.push(e));
+            append_points(point_events, render.points);
+            append_points(added_events, render.added);
+            render.shapes.forEach(shape => shapes.push(shape));
+            if(render.name) annotations.push(render.name);
         }
 
+        // Renders of jobs that are gone, filtered out or out of the render window are dropped along the way.
+        this.job_renders = job_renders;
+
         let plot_data = [];
         let animated_data_points = [];
 
@@ -375,8 +440,7 @@ class SchedulerPlot {
                 },
                 "size": point_events.size,
                 "color": point_events.fill,
-                "opacity": 1,
-                "symbol": point_events.symbol
+                "opacity": 1
             },
             "hoverinfo": "x",
             "cliponaxis": false
@@ -511,9 +575,54 @@ class SchedulerPlot {
         return layout;
     }
 
+    // The part of the plot (as a range of its y axis) we render. When the plot is given a viewport (its part that's on
+    // screen, in px from its top), only the jobs around it are rendered, so that rendering costs depend on the screen's
+    // size rather than on the amount of jobs. The window moves a page (a viewport's height) at a time, so scrolling
+    // only needs a render every now and then.
+    render_window(plot_height) {
+        const y_max = plot_height - 40;
+
+        if(this.viewport === null) return {'y0': 0, 'y1': y_max};
+
+        const page = Math.max(this.viewport.height, 86);
+        const page_idx = Math.floor(Math.max(0, this.viewport.top) / page);
+
+        return {
+            'y0': Math.max(0, Math.min(y_max, (page_idx - 1) * page)),
+            'y1': Math.min(y_max, (page_idx + 2) * page)
+        };
+    }
+
+    // Whether the viewport moved out of the window we rendered last time.
+    needs_render() {
+        if(this.rendered_window === null) return true;
+
+        const render_window = this.render_window(this.rendered_height);
+
+        return render_window.y0 !== this.rendered_window.y0 || render_window.y1 !== this.rendered_window.y1;
+    }
+
     plot(plot_element, upper_axis_element, lower_axis_element) {
-        let main_plot_layout = this.get_layout();
-        let plot_elements = this.get_plot_data();
+        this.render_cache = null;
+        this.render_cache = {'now_ts': this.now_ts()};
+
+        try {
+            this.render(plot_element, upper_axis_element, lower_axis_element);
+            this.rendered_jobs = new Set(this.displayed_jobs());
+        } finally {
+            this.render_cache = null;
+        }
+    }
+
+    render(plot_element, upper_axis_element, lower_axis_element) {
+        const plot_height = this.plot_height();
+        const render_window = this.render_window(plot_height);
+
+        this.rendered_height = plot_height;
+        this.rendered_window = render_window;
+
+        let main_plot_layout = this.get_layout(render_window.y1 - render_window.y0 + 40);
+        let plot_elements = this.get_plot_data(this.viewport === null ? null : render_window);
 
         main_plot_layout.layout.xaxis.side = false;
         main_plot_layout.layout.xaxis.showline = false;
@@ -521,6 +630,7 @@ class SchedulerPlot {
         main_plot_layout.layout.margin.r = 0;
         main_plot_layout.layout.margin.l = 0;
         main_plot_layout.layout.xaxis.range = [this.x_min() - this.time_interval, this.x_max() + this.time_interval];
+        main_plot_layout.layout.yaxis.range = [render_window.y1, render_window.y0];
         main_plot_layout.layout.shapes = plot_elements['shapes'];
         main_plot_layout.layout.annotations = plot_elements['annotations'];
 
@@ -533,27 +643,45 @@ class SchedulerPlot {
         upper_axis_layout.layout.margin.t = 40;
 
 
+        // The element keeps the height of the whole plot (its box is sized as border-box), the rows out of the window
+        // are padding.
         plot_element.style["width"] = this.plot_width() + 'px';
-        plot_element.style["height"] = this.plot_height() + 'px';
+        plot_element.style["height"] = plot_height + 'px';
+        plot_element.style["padding-top"] = render_window.y0 + 'px';
+        plot_element.style["padding-bottom"] = (plot_height - 40 - render_window.y1) + 'px';
         upper_axis_element.style["width"] = this.plot_width() + 'px';
         upper_axis_element.style["height"] = 41 + 'px';
 
-        Plotly.newPlot(plot_element,  {
+        // Plotly.react only updates what changed between redraws (the first one is a full plot), and tells apart
+        // data changes by the layout's datarevision instead of comparing every trace.
+        this.revision = (this.revision || 0) + 1;
+        main_plot_layout.layout.datarevision = this.revision;
+
+        Plotly.react(plot_element,  {
             data: plot_elements['data'],
             layout: main_plot_layout.layout,
             config: {"displayModeBar": false}
         });
 
-        Plotly.newPlot(upper_axis_element,  {
-            layout: upper_axis_layout.layout,
-            config: {"displayModeBar": false, "staticPlot": true}
-        });
+        // Axes only change with the plot's window.
+        const axis_key = this.x_min() + '|' + this.x_max() + '|' + this.time_interval + '|' + this.plot_width();
+
+        if(this.layout_keys.upper_axis !== axis_key) {
+            this.layout_keys.upper_axis = axis_key;
+
+            Plotly.react(upper_axis_element,  {
+                layout: upper_axis_layout.layout,
+                config: {"displayModeBar": false, "staticPlot": true}
+            });
+        }
+
+        if(lower_axis_element && this.layout_keys.lower_axis !== axis_key) {
+            this.layout_keys.lower_axis = axis_key;
 
-        if(lower_axis_element) {
             lower_axis_element.style["width"] = this.plot_width() + 'px';
             lower_axis_element.style["height"] = 41 + 'px';
 
-            Plotly.newPlot(lower_axis_element,  {
+            Plotly.react(lower_axis_element,  {
                 layout: lower_axis_layout.layout,
                 config: {"displayModeBar": false, "staticPlot": true}
             });
@@ -44,7 +44,7 @@ setup(
     author='Federico Schmidt',
     author_email='schmidt.fdr@gmail.com',
     url='https://github.com/schmidtfederico/apscheduler-ui',
-    packages=find_packages(exclude=['tests']),
+    packages=find_packages(exclude=['tests', 'benchmarks']),
     install_requires=dependencies,
     classifiers=[
         'Development Status :: 3 - Alpha',
@@ -60,7 +60,8 @@ setup(
     ],
     python_requires='>=3.5, <4',
     extras_require={
-        'testing': ['requests'],
+        'msgpack': ['msgpack'],
+        'testing': ['requests', 'msgpack'],
         'testing:python_version == "3.5"': ['mock']
     },
     cmdclass={'sdist': SdistWithWebpack},
@@ -0,0 +1,123 @@
+import json
+import unittest
+from datetime import datetime
+
+from pytz import timezone
+
+from apschedulerui.encoding import (
+    EVENT_NAMES, ID_MAPPING_KEYS, KEY_CODES, PayloadEncoder, TIMESTAMP_KEYS, TimestampFormatter, isoformat, msgpack,
+    negotiate
+)
+from apschedulerui.watcher import SchedulerWatcher
+
+
+def raw_ts(ts):
+    return SchedulerWatcher._repr_ts(None, ts)
+
+
+class TestPayloadEncoder(unittest.TestCase):
+
+    def setUp(self):
+        self.encoder = PayloadEncoder()
+        self.event = {
+            'job_id': 'a_job',
+            'event_name': 'job_executed',
+            'event_ts': raw_ts(datetime(2020, 1, 2, 3, 4, 5, 123456)),
+            'scheduled_run_time': raw_ts(datetime(2020, 1, 2, 3, 4, 5)),
+            'next_run_times': [raw_ts(datetime(2020, 1, 2, 3, 5, 5))],
+            'retval': None,
+            'seq': 10
+        }
+
+    def test_key_codes_are_unique(self):
+        self.assertEqual(len(KEY_CODES), len(set(KEY_CODES.values())))
+        self.assertFalse(set(KEY_CODES.values()) & (TIMESTAMP_KEYS | ID_MAPPING_KEYS | set(KEY_CODES.keys())))
+
+    def test_negotiation(self):
+        self.assertEqual('json', negotiate(None))
+        self.assertEqual('json', negotiate(['unknown']))
+        self.assertEqual('compact', negotiate(['compact']))
+        self.assertEqual('msgpack' if msgpack else 'compact', negotiate(['msgpack', 'compact']))
+
+    def test_timestamps_are_kept_as_epoch_microseconds(self):
+        expected = int((datetime(2020, 1, 2, 3, 4, 5, 123456) - datetime(1970, 1, 1)).total_seconds() * 1000000)
+
+        self.assertEqual(expected, self.event['event_ts'], 'Naive timestamps should be taken as UTC')
+        self.assertEqual(
+            expected + 3 * 3600 * 1000000,
+            raw_ts(timezone('America/Argentina/Buenos_Aires').localize(datetime(2020, 1, 2, 3, 4, 5, 123456)))
+        )
+        self.assertIsNone(raw_ts(None))
+
+    def test_timestamps_are_sent_in_the_wall_clock_time_of_a_timezone(self):
+        new_york = timezone('America/New_York')
+        # Daylight saving time ends at 2 AM, so 1:10 AM comes twice.
+        before = raw_ts(new_york.localize(datetime(2020, 11, 1, 1, 50), is_dst=True))
+        after = raw_ts(new_york.localize(datetime(2020, 11, 1, 1, 10), is_dst=False))
+        self.assertLess(before, after, 'Raw timestamps should never go backwards')
+
+        encoder = PayloadEncoder(timezone=new_york)
+        self.assertEqual(
+            ['2020-11-01 01:50:00.000000', '2020-11-01 01:10:00.000000'],
+            encoder.encode({'next_run_times': [before, after]}, 'json')['next_run_times']
+        )
+        self.assertEqual(
+            raw_ts(datetime(2020, 11, 1, 1, 10)), encoder.encode({'event_ts': after}, 'compact')['t'],
+            'Compact timestamps should be wall-clock times as well'
+        )
+
+    def test_timestamp_formatting(self):
+        formatter = TimestampFormatter()
+        formatter.max_cached_seconds = 2
+
+        for ts in [datetime(2020, 1, 2, 3, 4, 5, 123456), datetime(2020, 1, 2, 3, 4, 5), datetime(1969, 12, 31, 23, 59),
+                   datetime(2038, 1, 19, 3, 14, 8, 1)]:
+            self.assertEqual(ts.strftime('%Y-%m-%d %H:%M:%S.%f'), formatter(raw_ts(ts)))
+            self.assertEqual(ts.isoformat(timespec='microseconds'), isoformat(raw_ts(ts)))
+
+        self.assertLessEqual(len(formatter._seconds), 2)
+
+    def test_json_events(self):
+        formatted = self.encoder.encode(self.event, 'json')
+
+        self.assertEqual('2020-01-02 03:04:05.123456', formatted['event_ts'])
+        self.assertEqual('2020-01-02 03:04:05.000000', formatted['scheduled_run_time'])
+        self.assertEqual(['2020-01-02 03:05:05.000000'], formatted['next_run_times'])
+        self.assertEqual(raw_ts(datetime(2020, 1, 2, 3, 4, 5, 123456)), self.event['event_ts'], 'Payloads are copied')
+
+        self.assertEqual(
+            '2020-01-02T03:04:05.123456', PayloadEncoder(isoformat).encode(self.event, 'json')['event_ts']
+        )
+
+    def test_compact_events(self):
+        compact = self.encoder.encode(self.event, 'compact')
+
+        self.assertEqual({'j', 'n', 't', 'r', 'x', 'v', 's'}, set(compact.keys()))
+        self.assertEqual('job_executed', EVENT_NAMES[compact['n']])
+        self.assertEqual(self.event['event_ts'], compact['t'])
+        self.assertEqual(self.event['next_run_times'], compact['x'])
+        self.assertEqual(10, compact['s'])
+
+    def test_ids_are_kept(self):
+        # A job may be called like any of the keys we encode.
+        summary = {
+            'jobs': {'name': {'properties': {'id': 'name', 'next_run_time': None}, 'events': [self.event]}},
+            'next_run_times': {'name': self.event['next_run_times']},
+            'jobstores': {'default': 'MemoryJobStore'}
+        }
+
+        compact = self.encoder.encode(summary, 'compact')
+        json.dumps(compact)
+
+        self.assertEqual({'name': {'i': 'name', 'R': None}}, {k: v['p'] for k, v in compact['jobs'].items()})
+        self.assertEqual(self.encoder.encode(self.event, 'compact'), compact['jobs']['name']['E'][0])
+        self.assertEqual(['name'], list(compact['x'].keys()))
+        self.assertEqual({'default': 'MemoryJobStore'}, compact['jobstores'])
+
+    @unittest.skipIf(msgpack is None, 'msgpack is not installed')
+    def test_msgpack_payloads(self):
+        packed = self.encoder.encode(self.event, 'msgpack')
+
+        self.assertIsInstance(packed, bytes)
+        self.assertEqual(self.encoder.encode(self.event, 'compact'), msgpack.unpackb(packed, raw=False))
+        self.assertLess(len(packed), len(json.dumps(self.event)) / 2)
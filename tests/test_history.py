@@ -0,0 +1,178 @@
+import os
+import queue
+import shutil
+import tempfile
+import unittest
+
+try:
+    from mock import patch
+except ImportError:
+    from unittest.mock import patch
+
+from apscheduler.schedulers.background import BackgroundScheduler
+
+from apschedulerui.history import SQLiteHistory
+from apschedulerui.watcher import SchedulerWatcher
+
+
+def event(job_id, event_ts, event_name='job_executed', seq=None):
+    return {'job_id': job_id, 'event_name': event_name, 'event_ts': event_ts, 'seq': seq or event_ts}
+
+
+class TestSQLiteHistory(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'history.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_events_are_queried_by_job_and_time(self):
+        history = SQLiteHistory(self.path)
+
+        for ts in range(10):
+            history.append(event('a_job' if ts % 2 else 'b_job', ts))
+
+        self.assertTrue(history.flush(timeout=5))
+
+        self.assertEqual(list(range(10)), [e['event_ts'] for e in history.events()])
+        self.assertEqual([1, 3, 5, 7, 9], [e['event_ts'] for e in history.events('a_job')])
+        self.assertEqual([3, 5, 7], [e['event_ts'] for e in history.events('a_job', since_ts=2, until_ts=7)])
+        self.assertEqual([7, 9], [e['event_ts'] for e in history.events('a_job', limit=2)], 'Most recent events first')
+        self.assertEqual(event('a_job', 1), history.events('a_job', limit=1, until_ts=1)[0])
+
+        history.close()
+
+    def test_events_survive_restarts(self):
+        history = SQLiteHistory(self.path)
+        history.append(event('a_job', 1), instance_id='instance')
+        history.close()
+
+        history = SQLiteHistory(self.path)
+        self.assertEqual([dict(event('a_job', 1), instance='instance')], history.events())
+        history.close()
+
+    def test_retention(self):
+        self.assertRaises(ValueError, SQLiteHistory, self.path, retention=0)
+        self.assertRaises(ValueError, SQLiteHistory, self.path, max_events=0)
+
+        history = SQLiteHistory(self.path, retention=10)
+        for ts in range(0, 30000000, 1000000):
+            history.append(event('a_job', ts))
+        history.flush()
+
+        history.enforce_retention()
+        self.assertEqual(list(range(19000000, 30000000, 1000000)), [e['event_ts'] for e in history.events()])
+        history.close()
+
+        history = SQLiteHistory(self.path, max_events=3)
+        history.enforce_retention()
+        self.assertEqual([27000000, 28000000, 29000000], [e['event_ts'] for e in history.events()])
+        history.close()
+
+    def test_dropped_events_are_counted_and_logged_once_per_interval(self):
+        history = SQLiteHistory(self.path)
+
+        with patch.object(history._queue, 'put_nowait', side_effect=queue.Full):
+            with self.assertLogs('apschedulerui', level='WARNING') as logs:
+                for ts in range(10):
+                    history.append(event('a_job', ts))
+
+        self.assertEqual(10, history.dropped_events)
+        self.assertEqual(1, len(logs.output), 'Drops should not flood the log')
+        history.close()
+
+
+class TestWatcherHistory(unittest.TestCase):
+
+    def setUp(self):
+        self.scheduler = BackgroundScheduler()
+        self.scheduler.add_job(lambda: 0, id='a_job', trigger='interval', minutes=10)
+        self.scheduler.start(paused=True)
+
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'history.db')
+
+    def tearDown(self):
+        self.scheduler.shutdown()
+        shutil.rmtree(self.directory)
+
+    def test_history_goes_beyond_the_events_kept_in_memory(self):
+        history = SQLiteHistory(self.path)
+        watcher = SchedulerWatcher(self.scheduler, max_events_per_job=2, history=history)
+        added_ts = watcher.jobs['a_job']['added_time']
+
+        for i in range(1, 6):
+            watcher._job_execution_event('a_job', 'default', 'job_executed', added_ts + i, scheduled_run_time=i)
+
+        self.assertEqual(2, len(watcher.jobs['a_job']['events']))
+        self.assertEqual(added_ts + 5, watcher.query_events('a_job')[-1]['event_ts'], 'Events may not be stored yet')
+
+        self.assertTrue(watcher.flush(timeout=5))
+
+        events = watcher.query_events('a_job')
+        self.assertEqual(['job_added'] + ['job_executed'] * 5, [e['event_name'] for e in events])
+        self.assertEqual(len(events), len({e['seq'] for e in events}), 'Events should not be repeated')
+        self.assertEqual(
+            [added_ts + 4, added_ts + 5], [e['event_ts'] for e in watcher.query_events(since_ts=added_ts + 4)]
+        )
+        history.close()
+
+        # After a restart, events of the previous watcher come without their sequence numbers.
+        history = SQLiteHistory(self.path)
+        watcher = SchedulerWatcher(self.scheduler, history=history)
+        events = watcher.query_events('a_job', until_ts=added_ts + 5)
+
+        self.assertEqual(6, len(events))
+        self.assertFalse(any('seq' in e for e in events))
+        history.close()
+
+    def test_events_of_forgotten_jobs_can_be_queried(self):
+        history = SQLiteHistory(self.path)
+        watcher = SchedulerWatcher(self.scheduler, history=history, max_removed_jobs=0)
+
+        self.scheduler.remove_job('a_job')
+
+        self.assertNotIn('a_job', watcher.jobs, 'Removed jobs should be forgotten')
+        self.assertTrue(watcher.flush(timeout=5))
+        self.assertEqual(['job_added', 'job_removed'], [e['event_name'] for e in watcher.query_events('a_job')])
+        history.close()
+
+    def test_in_memory_events_are_queried_without_history(self):
+        watcher = SchedulerWatcher(self.scheduler)
+        watcher._job_execution_event('a_job', 'default', 'job_executed', 1, scheduled_run_time=0)
+
+        self.assertEqual(['job_executed'], [e['event_name'] for e in watcher.query_events('a_job', until_ts=1)])
+        self.assertEqual([], watcher.query_events('a_job', limit=0))
+
+    def test_queries_of_every_job_only_return_the_most_recent_events(self):
+        self.scheduler.add_job(lambda: 0, id='b_job', trigger='interval', minutes=10)
+        watcher = SchedulerWatcher(self.scheduler)
+
+        for ts in range(1, 7):
+            watcher._job_execution_event('a_job' if ts % 2 else 'b_job', 'default', 'job_executed', ts,
+                                         scheduled_run_time=0)
+
+        events = watcher.query_events(until_ts=6, limit=3)
+        self.assertEqual([4, 5, 6], [e['event_ts'] for e in events])
+        self.assertEqual(['b_job', 'a_job', 'b_job'], [e['job_id'] for e in events])
+        self.assertIsInstance(events[0], dict)
+        self.assertEqual([3, 4], [e['event_ts'] for e in watcher.query_events(since_ts=3, until_ts=4)])
+
+    def test_only_events_not_stored_yet_are_merged_from_memory(self):
+        history = SQLiteHistory(self.path)
+        watcher = SchedulerWatcher(self.scheduler, history=history)
+        added_ts = watcher.jobs['a_job']['added_time']
+        self.assertTrue(watcher.flush(timeout=5))
+
+        with patch.object(history, 'append'):
+            watcher._job_execution_event('a_job', 'default', 'job_executed', added_ts + 1, scheduled_run_time=0)
+
+        self.assertEqual(added_ts, history.stored_until())
+        self.assertEqual(['job_added', 'job_executed'], [e['event_name'] for e in watcher.query_events('a_job')])
+
+        with patch.object(history, 'stored_until', return_value=added_ts + 2):
+            self.assertEqual(['job_added'], [e['event_name'] for e in watcher.query_events('a_job')],
+                             'Events older than the latest stored one should be left to the backend')
+        history.close()
@@ -0,0 +1,61 @@
+import threading
+import time
+import unittest
+
+from apschedulerui.instrumentation import Histogram, Instrumentation, TimedRLock, summary
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def test_histogram(self):
+        histogram = Histogram((1, 10))
+
+        for value in (0.5, 1, 2, 20):
+            histogram.add(value)
+
+        snapshot = histogram.snapshot()
+
+        self.assertEqual([[1, 2], [10, 3]], snapshot['buckets'])
+        self.assertEqual(4, snapshot['count'])
+        self.assertEqual(23.5, snapshot['sum'])
+        self.assertEqual(20, snapshot['max'])
+        self.assertIsNone(Histogram((1,)).snapshot()['mean'])
+
+    def test_snapshot(self):
+        instrumentation = Instrumentation()
+        instrumentation.observe('process_event_seconds', 0.001, ('event', 'job_executed'))
+        instrumentation.observe('process_event_seconds', 0.002, ('event', 'job_executed'))
+        instrumentation.observe('trigger_walk_seconds', 0.001)
+        instrumentation.gauge('connected_clients', lambda: 3)
+
+        snapshot = instrumentation.snapshot()
+
+        self.assertEqual(2, snapshot['histograms']['process_event_seconds']['job_executed']['count'])
+        self.assertEqual(1, snapshot['histograms']['trigger_walk_seconds']['']['count'])
+        self.assertEqual({'connected_clients': 3}, snapshot['gauges'])
+
+        line = summary(instrumentation)
+        self.assertIn('process_event_seconds[job_executed]: n=2', line)
+        self.assertIn('connected_clients: 3', line)
+
+    def test_timed_lock_measures_outermost_hold_times(self):
+        histogram = Histogram((1,))
+        lock = TimedRLock(histogram)
+
+        with lock:
+            with lock:
+                time.sleep(0.01)
+            self.assertEqual(0, histogram.count, 'Reentrant releases should not be measured')
+
+        self.assertEqual(1, histogram.count)
+        self.assertGreaterEqual(histogram.max, 0.01)
+
+        lock.acquire()
+        acquired = []
+        thread = threading.Thread(target=lambda: acquired.append(lock.acquire(timeout=0.01)))
+        thread.start()
+        thread.join()
+        lock.release()
+
+        self.assertEqual([False], acquired, 'The lock should be exclusive')
+        self.assertEqual(2, histogram.count)
@@ -0,0 +1,74 @@
+import unittest
+from datetime import datetime, timedelta
+
+from apscheduler.schedulers.background import BackgroundScheduler
+
+from apschedulerui.metrics import DURATION_BUCKETS, escape, render
+from apschedulerui.watcher import EventQueue, SchedulerWatcher
+
+
+def samples(text):
+    return dict(line.rsplit(' ', 1) for line in text.splitlines() if not line.startswith('#'))
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.scheduler = BackgroundScheduler()
+        self.scheduler.add_job(lambda: 0, id='a_job', trigger='interval', minutes=10)
+        self.scheduler.add_job(lambda: 0, id='paused_job', trigger='interval', minutes=10)
+        self.scheduler.add_job(lambda: 0, id='removed_job', trigger='interval', minutes=10)
+        self.scheduler.start(paused=True)
+        self.scheduler.pause_job('paused_job')
+        self.scheduler.remove_job('removed_job')
+
+    def tearDown(self):
+        self.scheduler.shutdown()
+
+    def test_scheduler_and_job_metrics(self):
+        watcher = SchedulerWatcher(self.scheduler, async_events=True, instrument=True)
+
+        for scheduled_run_time, duration in ((0, 0.2), (60000000, 3)):
+            watcher._job_execution_event('a_job', 'default', 'job_submitted', scheduled_run_time,
+                                         scheduled_run_time=scheduled_run_time)
+            watcher._job_execution_event('a_job', 'default', 'job_executed', scheduled_run_time + int(duration * 1e6),
+                                         scheduled_run_time=scheduled_run_time)
+
+        metrics = samples(render(watcher, connected_clients=2))
+
+        self.assertEqual('1', metrics['apscheduler_scheduler_state{state="paused"}'])
+        self.assertEqual('0', metrics['apscheduler_scheduler_state{state="running"}'])
+        self.assertEqual('1', metrics['apscheduler_jobs{state="scheduled"}'])
+        self.assertEqual('1', metrics['apscheduler_jobs{state="paused"}'])
+
+        self.assertEqual('2', metrics['apscheduler_job_events_total{event="executed",job_id="a_job"}'])
+        self.assertEqual('0', metrics['apscheduler_job_events_total{event="error",job_id="a_job"}'])
+        self.assertEqual('0', metrics['apscheduler_job_duration_seconds_bucket{job_id="a_job",le="0.1"}'])
+        self.assertEqual('1', metrics['apscheduler_job_duration_seconds_bucket{job_id="a_job",le="0.25"}'])
+        self.assertEqual('2', metrics['apscheduler_job_duration_seconds_bucket{job_id="a_job",le="5"}'])
+        self.assertEqual('2', metrics['apscheduler_job_duration_seconds_bucket{job_id="a_job",le="+Inf"}'])
+        self.assertAlmostEqual(3.2, float(metrics['apscheduler_job_duration_seconds_sum{job_id="a_job"}']))
+        self.assertEqual(
+            len(DURATION_BUCKETS) + 1,
+            len([key for key in metrics if key.startswith('apscheduler_job_duration_seconds_bucket{job_id="a_job"')])
+        )
+
+        self.assertEqual('0', metrics['apschedulerui_event_queue_size'])
+        self.assertEqual('2', metrics['apschedulerui_connected_clients'])
+        self.assertGreater(int(metrics['apschedulerui_write_lock_held_seconds_count']), 0, 'Overhead should be exposed')
+
+    def test_event_queue_lag(self):
+        watcher = SchedulerWatcher(self.scheduler)
+        # A queue without a worker thread, so that events stay in it.
+        watcher.event_queue = EventQueue(10)
+        watcher.event_queue.put([None, datetime.now(tz=self.scheduler.timezone) - timedelta(seconds=5)])
+
+        metrics = samples(render(watcher))
+
+        self.assertEqual('1', metrics['apschedulerui_event_queue_size'])
+        self.assertGreaterEqual(float(metrics['apschedulerui_event_queue_lag_seconds']), 5)
+        self.assertNotIn('apschedulerui_connected_clients', metrics)
+        self.assertNotIn('apschedulerui_write_lock_held_seconds_count', metrics, 'Overhead is only measured on demand')
+
+    def test_label_values_are_escaped(self):
+        self.assertEqual('a \\"quoted\\" \\\\ job\\n', escape('a "quoted" \\ job\n'))
@@ -0,0 +1,50 @@
+import unittest
+
+from apschedulerui.payloads import MAX_PAYLOAD_SIZE, PayloadStore, safe_repr, safe_str, truncate
+
+
+class Unrepresentable:
+    def __repr__(self):
+        raise ValueError('No repr for you')
+
+
+class Unprintable(Exception):
+    def __str__(self):
+        raise ValueError('No str for you')
+
+
+class TestPayloads(unittest.TestCase):
+
+    def test_safe_repr_is_bounded(self):
+        self.assertLess(len(safe_repr(list(range(1000000)))), 10000, 'Large containers should be abbreviated')
+        self.assertLessEqual(len(safe_repr('x' * (MAX_PAYLOAD_SIZE * 2))), MAX_PAYLOAD_SIZE)
+        self.assertIn('Unrepresentable', safe_repr(Unrepresentable()), 'Failing reprs should not raise')
+
+    def test_safe_str_falls_back_to_safe_repr(self):
+        self.assertEqual('message', safe_str(ValueError('message')))
+        self.assertIn('Unprintable', safe_str(Unprintable()), 'Failing strs should not raise')
+
+    def test_truncation_counts_bytes(self):
+        text = 'short'
+        self.assertIs(text, truncate(text, 100))
+
+        truncated = truncate('é' * 100, 11)
+        self.assertLessEqual(len(truncated.encode('utf-8')), 11)
+        self.assertEqual('éééé...', truncated)
+
+    def test_identical_payloads_are_stored_once(self):
+        store = PayloadStore(max_bytes=100)
+
+        key = store.put('a' * 40)
+        self.assertEqual(key, store.put('a' * 40))
+        self.assertEqual(1, len(store))
+        self.assertEqual('a' * 40, store.get(key))
+
+        store.put('b' * 40)
+        store.put('a' * 40)
+        store.put('c' * 40)
+        self.assertIn(key, store, 'Storing a payload again should keep it from being evicted')
+        self.assertEqual(80, store.size)
+
+        self.assertIsNone(store.get('unknown'))
+        self.assertRaises(ValueError, PayloadStore, 0)
@@ -0,0 +1,57 @@
+import unittest
+
+from apschedulerui.records import EXECUTION_RECORDS, ErrorRecord, ExecutionRecord, JobAddedRecord, Record, intern
+
+
+class Properties(Record):
+    __slots__ = fields = ('id', 'name')
+
+
+class TestRecords(unittest.TestCase):
+
+    def test_records_read_like_dicts(self):
+        event = ExecutionRecord(job_id='a_job', event_name='job_submitted', event_ts=1, scheduled_run_time=0)
+
+        self.assertEqual('a_job', event['job_id'])
+        self.assertEqual(1, event.get('event_ts'))
+        self.assertIn('scheduled_run_time', event)
+        self.assertNotIn('retval', event, 'Submissions should not carry a return value')
+        self.assertNotIn('next_run_times', event)
+        self.assertIsNone(event.get('retval'))
+        self.assertRaises(KeyError, event.__getitem__, 'retval')
+        self.assertRaises(KeyError, event.__getitem__, 'to_dict')
+
+        event['seq'] = 3
+        self.assertEqual(3, event.seq)
+        self.assertRaises(KeyError, event.__setitem__, 'next_run_times', [])
+        self.assertFalse(hasattr(event, '__dict__'), 'Records should only have slots')
+
+    def test_records_convert_to_dicts(self):
+        properties = Properties(id='a_job', name='A job')
+        event = JobAddedRecord(
+            job_id='a_job', event_name='job_added', event_ts=1, seq=1, added_time=1, modified_time=1, removed_time=None,
+            properties=properties
+        )
+
+        self.assertEqual(
+            {
+                'job_id': 'a_job', 'event_name': 'job_added', 'event_ts': 1, 'seq': 1, 'added_time': 1,
+                'modified_time': 1, 'removed_time': None, 'properties': {'id': 'a_job', 'name': 'A job'}
+            },
+            event.to_dict()
+        )
+        self.assertEqual(dict(event), {key: event[key] for key in event.keys()})
+
+        del properties.name
+        self.assertEqual({'id': 'a_job'}, properties.to_dict(), 'Unset fields should be left out')
+
+    def test_execution_records_carry_the_fields_of_their_event(self):
+        self.assertIs(ErrorRecord, EXECUTION_RECORDS['job_error'])
+        self.assertEqual(
+            {'retval', 'retval_ref', 'exception', 'exception_ref', 'traceback', 'traceback_ref'},
+            set(ErrorRecord.fields) - set(ExecutionRecord.fields)
+        )
+
+    def test_strings_are_interned(self):
+        self.assertIs(intern(''.join(['interval', '[0:01:00]'])), intern('interval[0:01:00]'))
+        self.assertIsNone(intern(None))
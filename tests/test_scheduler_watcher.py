@@ -1,20 +1,23 @@
+import json
+import threading
 import time
 import unittest
 
 try:
-    from mock import patch
+    from mock import Mock, patch
 except ImportError:
-    from unittest.mock import patch
+    from unittest.mock import Mock, patch
 
 from datetime import timedelta, datetime
 
-from apscheduler.events import EVENT_ALL
+from apscheduler.events import (EVENT_ALL, EVENT_JOB_ERROR, EVENT_JOB_EXECUTED, EVENT_JOB_SUBMITTED, JobExecutionEvent,
+                                JobSubmissionEvent)
 from apscheduler.executors.pool import ThreadPoolExecutor
 from apscheduler.job import Job
 from apscheduler.jobstores.memory import MemoryJobStore
 from apscheduler.schedulers.background import BackgroundScheduler
 
-from apschedulerui.watcher import SchedulerWatcher
+from apschedulerui.watcher import EventQueue, SchedulerWatcher
 
 
 class TestSchedulerListener(unittest.TestCase):
@@ -196,10 +199,51 @@ class TestSchedulerListener(unittest.TestCase):
 
         failing_job_events = watcher.jobs['failing_job']['events']
 
-        time.sleep(0.05)
+        # The scheduler may take a while to wake up when the machine is busy.
+        deadline = time.monotonic() + 1
+        while len(failing_job_events) < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
         self.assertEqual(3, len(failing_job_events))
         self.assertEqual('job_error', failing_job_events[2]['event_name'])
 
+    def test_large_payloads_are_truncated_in_events(self):
+        watcher = SchedulerWatcher(self.scheduler, payload_preview_size=100)
+        self.scheduler.add_job(lambda: 0, id='a_job', trigger='interval', minutes=60)
+        run_time = datetime.now()
+
+        self.scheduler._dispatch_event(JobExecutionEvent(EVENT_JOB_EXECUTED, 'a_job', 'default', run_time, retval=42))
+        self.scheduler._dispatch_event(
+            JobExecutionEvent(EVENT_JOB_EXECUTED, 'a_job', 'default', run_time, retval=list(range(10000)))
+        )
+
+        small, large = list(watcher.jobs['a_job']['events'])[-2:]
+        self.assertEqual(42, small['retval'], 'Numbers should be kept as they are')
+        self.assertIsNone(small['retval_ref'])
+
+        self.assertLessEqual(len(large['retval']), 100)
+        self.assertTrue(watcher.payloads.get(large['retval_ref']).startswith('[0, 1, 2'))
+
+        for _ in range(2):
+            self.scheduler._dispatch_event(JobExecutionEvent(
+                EVENT_JOB_ERROR, 'a_job', 'default', run_time, exception=ValueError(), traceback='Traceback' * 100
+            ))
+
+        first_error, second_error = list(watcher.jobs['a_job']['events'])[-2:]
+        self.assertEqual('', first_error['exception'])
+        self.assertIsNotNone(first_error['traceback_ref'])
+        self.assertEqual(first_error['traceback_ref'], second_error['traceback_ref'])
+        self.assertEqual(2, len(watcher.payloads), 'Identical tracebacks should be stored once')
+
+        class UnprintableError(Exception):
+            def __str__(self):
+                raise ValueError('No str for you')
+
+        self.scheduler._dispatch_event(JobExecutionEvent(
+            EVENT_JOB_ERROR, 'a_job', 'default', run_time, exception=UnprintableError(), traceback='Traceback'
+        ))
+        self.assertIn('UnprintableError', watcher.jobs['a_job']['events'][-1]['exception'])
+
     def test_scheduler_summary(self):
         watcher = SchedulerWatcher(self.scheduler)
 
@@ -236,6 +280,69 @@ class TestSchedulerListener(unittest.TestCase):
         self.assertIn('a_job', watcher.jobs, 'removed jobs should be still tracked in the scheduler watcher')
         self.assertIsNotNone(watcher.jobs['a_job']['removed_time'], 'removed_time should be set')
 
+    def test_removed_jobs_are_forgotten_beyond_max_removed_jobs(self):
+        watcher = SchedulerWatcher(self.scheduler, max_removed_jobs=2)
+
+        for i in range(4):
+            self.scheduler.add_job(lambda: 0, id='job_%d' % i, trigger='interval', minutes=60)
+
+        for i in range(4):
+            self.scheduler.remove_job('job_%d' % i)
+
+        self.assertEqual(['job_2', 'job_3'], watcher.job_ids(), 'Jobs removed the longest ago should be forgotten')
+        self.assertEqual(['job_2', 'job_3'], list(watcher.scheduler_summary()['jobs']))
+        self.assertNotIn('job_0', watcher.stats)
+        self.assertEqual([], watcher.search_jobs('id:job_0'))
+
+        self.scheduler.add_job(lambda: 0, id='job_0', trigger='interval', minutes=60)
+        self.assertIsNone(watcher.jobs['job_0']['removed_time'], 'Forgotten jobs can be added again')
+
+        self.assertRaises(ValueError, SchedulerWatcher, self.scheduler, max_removed_jobs=-1)
+
+    def test_forgotten_jobs_are_reported_since_a_sequence_number(self):
+        watcher = SchedulerWatcher(self.scheduler, max_removed_jobs=0, replay_log_size=2)
+
+        for i in range(3):
+            self.scheduler.add_job(lambda: 0, id='job_%d' % i, trigger='interval', minutes=60)
+
+        seq = watcher.last_seq
+        self.assertEqual([], watcher.forgotten_job_ids(seq))
+
+        self.scheduler.remove_job('job_0')
+        self.scheduler.remove_job('job_1')
+        self.assertEqual(['job_0', 'job_1'], watcher.forgotten_job_ids(seq))
+        self.assertEqual([], watcher.forgotten_job_ids(watcher.last_seq + 1))
+
+        self.scheduler.add_job(lambda: 0, id='job_0', trigger='interval', minutes=60)
+        self.assertEqual(['job_1'], watcher.forgotten_job_ids(seq), 'Jobs added again are no longer forgotten')
+
+        # Only as many forgotten jobs as events in the replay log are kept.
+        self.scheduler.remove_job('job_2')
+        self.scheduler.remove_job('job_0')
+        self.assertIsNone(watcher.forgotten_job_ids(seq))
+        self.assertEqual(['job_0'], watcher.forgotten_job_ids(watcher.last_seq))
+
+    def test_removed_jobs_are_forgotten_after_their_retention(self):
+        watcher = SchedulerWatcher(self.scheduler, removed_jobs_retention=60)
+
+        for job_id in ('a_job', 'b_job'):
+            self.scheduler.add_job(lambda: 0, id=job_id, trigger='interval', minutes=60)
+
+        watcher._job_removed('a_job', removal_ts=0)
+        watcher._job_removed('b_job', removal_ts=30000000)
+
+        watcher._evict_removed_jobs(59999999)
+        self.assertEqual(['a_job', 'b_job'], watcher.job_ids())
+
+        watcher._evict_removed_jobs(60000000)
+        self.assertEqual(['b_job'], watcher.job_ids())
+
+        watcher._evict_removed_jobs(90000000)
+        self.assertEqual([], watcher.job_ids())
+        self.assertIsNone(watcher._next_eviction_ts)
+
+        self.assertRaises(ValueError, SchedulerWatcher, self.scheduler, removed_jobs_retention=0)
+
     def test_modified_job_properties_are_tracked(self):
         self.scheduler.add_job(
             lambda x, y: x + y,
@@ -260,6 +367,54 @@ class TestSchedulerListener(unittest.TestCase):
         self.assertEqual('A modified job', watcher.jobs['a_job']['properties']['name'])
         self.assertGreater(watcher.jobs['a_job']['properties']['next_run_time'][0], next_run_time)
 
+        modification = watcher.jobs['a_job']['events'][-1]
+        self.assertEqual({'name', 'next_run_time'}, set(modification['changes']), 'Only changes should be sent')
+        self.assertNotIn('properties', modification)
+
+    def test_job_representations_are_cached(self):
+        reprs = []
+
+        class Argument:
+            def __repr__(self):
+                reprs.append(self)
+                return 'Argument()'
+
+        self.scheduler.add_job(lambda x: x, id='a_job', trigger='interval', minutes=60, args=(Argument(),))
+        watcher = SchedulerWatcher(self.scheduler)
+        self.assertEqual(1, len(reprs))
+
+        self.scheduler.modify_job('a_job', next_run_time=datetime.now() + timedelta(days=1))
+        self.assertEqual(1, len(reprs), 'Arguments should only be rendered again when they are replaced')
+
+        self.scheduler.modify_job('a_job', args=(Argument(),))
+        self.assertEqual(2, len(reprs))
+        self.assertEqual({}, watcher.jobs['a_job']['events'][-1]['changes'], 'Equal arguments are not a change')
+
+    def test_jobs_are_searchable(self):
+        self.scheduler.add_job(lambda: 0, id='a_job', name='Daily report', jobstore='in_memory', trigger='interval',
+                               minutes=60)
+        self.scheduler.add_job(lambda: 0, id='b_job', name='Clean up', executor='secondary_executor',
+                               trigger='interval', minutes=60)
+
+        watcher = SchedulerWatcher(self.scheduler)
+
+        self.assertEqual(['a_job', 'b_job'], watcher.search_jobs('interval'))
+        self.assertEqual(['a_job'], watcher.search_jobs('report'))
+        self.assertEqual(['a_job'], watcher.search_jobs('in_memory'))
+        self.assertEqual(['b_job'], watcher.search_jobs('secondary'))
+        self.assertEqual(['a_job', 'b_job'], watcher.search_jobs('status:added'))
+
+        self.scheduler.modify_job('a_job', jobstore='in_memory', name='Weekly report')
+        self.assertEqual(['a_job'], watcher.search_jobs('weekly'))
+        self.assertEqual([], watcher.search_jobs('daily'))
+        self.assertEqual(['a_job'], watcher.search_jobs('status:modified'))
+
+        watcher._job_execution_event('b_job', 'default', 'job_error', watcher._repr_ts(datetime.now()))
+        self.assertEqual(['b_job'], watcher.search_jobs('status:error'))
+
+        self.scheduler.remove_job('a_job')
+        self.assertEqual(['a_job'], watcher.search_jobs('status:removed'))
+
     @patch('apschedulerui.watcher.SchedulerWatcher.notify_jobstore_event')
     def test_removing_a_jobstore_removes_all_jobs(self, mock_notify_jobstore_event):
         watcher = SchedulerWatcher(self.scheduler)
@@ -345,3 +500,272 @@ class TestSchedulerListener(unittest.TestCase):
             len(watcher.jobs['recurrent_job']['events']),
             'job event history should be limited'
         )
+
+        stats = watcher.job_stats('recurrent_job')
+        self.assertGreater(stats['counts']['job_executed'], 2, 'Statistics should cover evicted events')
+        self.assertGreater(stats['duration']['count'], 0)
+        self.assertEqual(0, stats['error_rate'])
+
+    def test_watcher_overhead_is_measured(self):
+        watcher = SchedulerWatcher(self.scheduler, instrument=True)
+        self.scheduler.add_job(lambda: 0, id='a_job', trigger='interval', minutes=60)
+        watcher.get_next_run_times('a_job')
+
+        histograms = watcher.instrumentation.snapshot()['histograms']
+
+        self.assertEqual(1, histograms['process_event_seconds']['job_added']['count'])
+        self.assertGreater(histograms['write_lock_held_seconds']['']['count'], 0)
+        self.assertEqual(1, histograms['trigger_walk_seconds']['']['count'])
+
+        watcher = SchedulerWatcher(self.scheduler)
+        self.assertIsNone(watcher.instrumentation, 'The overhead should only be measured on demand')
+        self.scheduler.add_job(lambda: 0, id='b_job', trigger='interval', minutes=60)
+        self.assertIn('b_job', watcher.jobs)
+
+    def test_async_events_are_processed_outside_the_dispatching_thread(self):
+        watcher = SchedulerWatcher(self.scheduler, async_events=True)
+
+        processing_threads = []
+        original_job_added = watcher._job_added
+
+        def job_added(*args, **kwargs):
+            processing_threads.append(threading.current_thread())
+            return original_job_added(*args, **kwargs)
+
+        with patch.object(watcher, '_job_added', side_effect=job_added):
+            self.scheduler.add_job(lambda: 0, id='async_job', trigger='interval', minutes=60)
+
+            self.assertTrue(watcher.flush(timeout=1), 'Queued events should be processed by the worker thread')
+
+        self.assertIn('async_job', watcher.jobs)
+        self.assertEqual([watcher._worker_thread], processing_threads)
+        self.assertEqual('job_added', watcher.jobs['async_job']['events'][0]['event_name'])
+
+    def test_queued_modifications_of_removed_jobs_are_skipped(self):
+        watcher = SchedulerWatcher(self.scheduler, async_events=True)
+        self.scheduler.add_job(lambda: 0, id='async_job', trigger='interval', minutes=60)
+        self.assertTrue(watcher.flush(timeout=1))
+
+        gate = threading.Event()
+        original_handle_event = watcher._handle_event
+
+        def handle_event(*args):
+            gate.wait(1)
+            return original_handle_event(*args)
+
+        with patch.object(watcher, '_handle_event', side_effect=handle_event), \
+                patch('logging.Logger.exception') as mock_log_exception:
+            self.scheduler.modify_job('async_job', name='Modified job')
+            self.scheduler.remove_job('async_job')
+            gate.set()
+
+            self.assertTrue(watcher.flush(timeout=1))
+
+        mock_log_exception.assert_not_called()
+        self.assertEqual('job_removed', watcher.jobs['async_job']['events'][-1]['event_name'])
+        self.assertIsNotNone(watcher.jobs['async_job']['removed_time'])
+
+    def test_event_queue_overflow_policies(self):
+        self.assertRaises(ValueError, EventQueue, 10, overflow_policy='unknown')
+        self.assertRaises(ValueError, EventQueue, 0)
+        self.assertRaises(TypeError, EventQueue, None)
+
+        queue = EventQueue(2, overflow_policy='drop_oldest')
+        for i in range(4):
+            queue.put([i], key=('job_submitted', 'a_job'))
+
+        self.assertEqual(2, len(queue))
+        self.assertEqual(2, queue.dropped_events)
+        self.assertEqual([2], queue.get(), 'Oldest events should have been dropped')
+
+        queue = EventQueue(2, overflow_policy='coalesce')
+        queue.put([0], key=('job_submitted', 'a_job'))
+        queue.put([1], key=('job_submitted', 'another_job'))
+        queue.put([2], key=('job_submitted', 'a_job'))
+
+        self.assertEqual(2, len(queue))
+        self.assertEqual(1, queue.coalesced_events)
+        self.assertEqual(0, queue.dropped_events)
+        self.assertEqual([2], queue.get(), 'Coalesced event should replace the queued one in place')
+
+        queue.put([3], key=('job_executed', 'a_job'))
+        queue.put([4], key=('job_executed', 'another_job'))
+        self.assertEqual(1, queue.dropped_events, 'Events that cannot be coalesced should drop the oldest one')
+
+        queue = EventQueue(1, overflow_policy='block')
+        queue.put([0])
+
+        producer = threading.Thread(target=queue.put, args=([1],))
+        producer.start()
+        producer.join(0.05)
+        self.assertTrue(producer.is_alive(), 'Producer should block while the queue is full')
+
+        self.assertEqual([0], queue.get())
+        producer.join(1)
+        self.assertFalse(producer.is_alive())
+        self.assertEqual([1], queue.get())
+
+        queue.put([2])
+        queue.put([3], block=False)
+        self.assertEqual(1, queue.dropped_events, 'Producers that cannot wait should drop the oldest event')
+        self.assertEqual([3], queue.get())
+
+    def test_blocking_queue_does_not_deadlock_the_scheduler(self):
+        watcher = SchedulerWatcher(self.scheduler, async_events=True, event_queue_size=1, overflow_policy='block')
+
+        adder = threading.Thread(target=lambda: [
+            self.scheduler.add_job(lambda: 0, id='job_%d' % i, trigger='interval', minutes=60) for i in range(20)
+        ])
+        adder.daemon = True
+        adder.start()
+        adder.join(5)
+
+        self.assertFalse(adder.is_alive(), 'Adding jobs should not wait for the worker holding the jobstores lock')
+        self.assertTrue(watcher.flush(timeout=5))
+
+    def test_events_of_different_jobs_do_not_serialize(self):
+        self.scheduler.add_job(lambda: 0, id='job_a', trigger='interval', minutes=60)
+        watcher = SchedulerWatcher(self.scheduler)
+
+        job_b = next(
+            'job_%d' % i for i in range(1000) if watcher._job_lock('job_%d' % i) is not watcher._job_lock('job_a')
+        )
+        self.scheduler.add_job(lambda: 0, id=job_b, trigger='interval', minutes=60)
+
+        lock_acquired = threading.Event()
+        release_lock = threading.Event()
+
+        def hold_job_a_lock():
+            with watcher._job_lock('job_a'):
+                lock_acquired.set()
+                release_lock.wait(1)
+
+        holder = threading.Thread(target=hold_job_a_lock)
+        holder.start()
+        lock_acquired.wait(1)
+
+        try:
+            self.scheduler.modify_job(job_b, name='Modified while job_a is locked')
+            self.assertEqual('Modified while job_a is locked', watcher.jobs[job_b]['properties']['name'])
+        finally:
+            release_lock.set()
+            holder.join()
+
+    def test_job_summary_is_a_snapshot(self):
+        watcher = SchedulerWatcher(self.scheduler, max_events_per_job=2)
+
+        self.scheduler.add_job(lambda: 0, id='a_job', trigger='interval', minutes=60)
+        self.scheduler.modify_job('a_job', name='Modified once')
+
+        summary = watcher.job_summary('a_job')
+
+        self.scheduler.modify_job('a_job', name='Modified twice')
+
+        self.assertIsInstance(summary['events'], list, 'job summary events should be serializable as a list')
+        self.assertIsInstance(summary['events'][0], dict, 'job summary events should be plain dicts')
+        self.assertIsInstance(summary['properties'], dict, 'job summary properties should be a plain dict')
+        json.dumps(summary)
+        self.assertEqual(['job_added', 'job_modified'], [e['event_name'] for e in summary['events']])
+        self.assertEqual(
+            ['job_modified', 'job_modified'],
+            [e['event_name'] for e in watcher.job_summary('a_job')['events']],
+            'Oldest events should be evicted from the history once it is full'
+        )
+        json.dumps(watcher.scheduler_summary())
+
+    def test_next_run_times_are_only_projected_for_watched_jobs(self):
+        watcher = SchedulerWatcher(self.scheduler, next_run_times_depth=3)
+
+        listener = Mock()
+        listener._is_watching_job.return_value = False
+        watcher.add_listener(listener)
+
+        self.scheduler.add_job(lambda: 0, id='a_job', trigger='interval', minutes=5)
+        self.assertNotIn('next_run_times', listener._job_event.call_args[0][0])
+
+        listener._is_watching_job.return_value = True
+        self.scheduler.modify_job('a_job', name='Watched job')
+
+        next_run_times = listener._job_event.call_args[0][0]['next_run_times']
+        self.assertEqual(3, len(next_run_times), 'Projection depth should be configurable')
+        self.assertEqual(
+            watcher.jobs['a_job']['properties']['next_run_time'][0], next_run_times[0],
+            'Projections should start at the next run time of the job'
+        )
+        self.assertNotIn(
+            'next_run_times', watcher.jobs['a_job']['events'][-1], 'Projections should not be kept in the job history'
+        )
+        self.assertEqual(next_run_times, watcher.job_summary('a_job')['next_run_times'])
+
+        # Unwatched jobs don't get projected, but their stale projections aren't served either.
+        listener._is_watching_job.return_value = False
+        job = self.scheduler.get_job('a_job')
+        job.next_run_time += timedelta(days=1)
+        self.scheduler._lookup_jobstore('default').update_job(job)  # As the scheduler does before submitting a job.
+        self.scheduler._dispatch_event(JobSubmissionEvent(EVENT_JOB_SUBMITTED, 'a_job', 'default', [datetime.now()]))
+
+        self.assertNotIn('next_run_times', listener._job_event.call_args[0][0])
+        self.assertEqual(watcher._repr_ts(job.next_run_time), watcher.job_summary('a_job')['next_run_times'][0])
+
+    def test_next_run_times_projections_are_cached(self):
+        watcher = SchedulerWatcher(self.scheduler, next_run_times_depth=4)
+
+        run_times = [datetime(2020, 1, 1, 0, minute) for minute in range(6)]
+        trigger = Mock()
+        trigger.get_next_fire_time.side_effect = lambda previous, now: previous + timedelta(minutes=1)
+        job = Mock(next_run_time=run_times[0], trigger=trigger)
+
+        self.assertEqual(run_times[:4], watcher._project_next_run_times('a_job', job=job))
+        self.assertEqual(3, trigger.get_next_fire_time.call_count)
+
+        trigger.get_next_fire_time.reset_mock()
+        self.assertEqual(run_times[:4], watcher._project_next_run_times('a_job', job=job))
+        trigger.get_next_fire_time.assert_not_called()
+
+        # Once the scheduler advances the job's next run time, only the tail of the projection is computed.
+        job.next_run_time = run_times[2]
+        self.assertEqual(run_times[2:6], watcher._project_next_run_times('a_job', job=job))
+        self.assertEqual(2, trigger.get_next_fire_time.call_count)
+
+    def test_job_summaries_since_a_sequence_number(self):
+        watcher = SchedulerWatcher(self.scheduler)
+
+        self.scheduler.add_job(lambda: 0, id='a_job', trigger='interval', minutes=60)
+        self.scheduler.add_job(lambda: 0, id='b_job', trigger='interval', minutes=60)
+        seq = watcher.last_seq
+
+        self.assertEqual(['a_job', 'b_job'], sorted(watcher.job_ids()))
+        self.assertEqual([], watcher.job_ids(since_seq=seq))
+
+        self.scheduler.modify_job('b_job', name='Modified once')
+        self.scheduler.modify_job('b_job', name='Modified twice')
+
+        self.assertEqual(['b_job'], watcher.job_ids(since_seq=seq), 'Only jobs with new events should be listed')
+
+        summary = watcher.job_summary('b_job', since_seq=seq)
+        self.assertEqual(['job_modified', 'job_modified'], [e['event_name'] for e in summary['events']])
+        self.assertTrue(all(e['seq'] > seq for e in summary['events']))
+
+        summary = watcher.job_summary('b_job', max_events=1)
+        self.assertEqual(1, len(summary['events']))
+        self.assertEqual(watcher.last_seq, summary['events'][0]['seq'], 'Latest events should be kept')
+        self.assertEqual([], watcher.job_summary('b_job', max_events=0)['events'])
+
+    def test_missed_events_are_replayed_from_the_log(self):
+        watcher = SchedulerWatcher(self.scheduler, replay_log_size=3)
+        seq = watcher.last_seq
+
+        self.scheduler.add_job(lambda: 0, id='a_job', trigger='interval', minutes=60)
+        self.scheduler.pause()
+        self.scheduler.modify_job('a_job', name='Modified job')
+
+        events = watcher.events_since(seq)
+        self.assertEqual(['job_added', 'scheduler_paused', 'job_modified'], [e['event_name'] for e in events])
+        self.assertEqual(list(range(seq + 1, seq + 4)), [e['seq'] for e in events], 'Sequence numbers are global')
+        self.assertEqual([], watcher.events_since(watcher.last_seq))
+
+        self.scheduler.resume()
+
+        self.assertIsNone(watcher.events_since(seq), 'Evicted events cannot be replayed')
+        self.assertEqual(['scheduler_resumed'], [e['event_name'] for e in watcher.events_since(watcher.last_seq - 1)])
+        self.assertIsNone(watcher.events_since(watcher.last_seq + 1))
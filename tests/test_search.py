@@ -0,0 +1,51 @@
+import unittest
+
+from apschedulerui.search import JobIndex, tokenize
+
+
+class TestJobIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = JobIndex()
+        self.index.update('report_job', id='report_job', name='Daily report', func_ref='reports:daily',
+                          trigger='cron[hour=\'3\']', jobstore='default', executor='default', status='job_added')
+        self.index.update('cleanup', id='cleanup', name='Clean up', func_ref='maintenance:clean_up',
+                          trigger='interval[0:10:00]', jobstore='in_memory', executor='default', status='job_error')
+
+    def test_tokenize(self):
+        self.assertEqual({'reports', 'daily'}, tokenize('reports:Daily'))
+        self.assertEqual({'interval', '0', '10', '00'}, tokenize('interval[0:10:00]'))
+        self.assertEqual(set(), tokenize(None))
+
+    def test_words_match_by_prefix_in_any_field(self):
+        self.assertEqual(['report_job'], self.index.search('REPO'))
+        self.assertEqual(['cleanup'], self.index.search('maint'))
+        self.assertEqual(['report_job', 'cleanup'], self.index.search('default'))
+        self.assertEqual(['report_job', 'cleanup'], self.index.search(''), 'Empty queries match every job')
+        self.assertEqual([], self.index.search('weekly'))
+
+    def test_every_word_must_match(self):
+        self.assertEqual(['cleanup'], self.index.search('default clean'))
+        self.assertEqual(['cleanup'], self.index.search('job_err'))
+        self.assertEqual([], self.index.search('daily clean'))
+
+    def test_words_can_be_restricted_to_a_field(self):
+        self.assertEqual(['cleanup'], self.index.search('status:error'))
+        self.assertEqual(['cleanup'], self.index.search('jobstore:in_mem'))
+        self.assertEqual([], self.index.search('name:default'))
+        self.assertEqual(['report_job'], self.index.search('reports:daily'), 'Unknown fields are searched as words')
+
+    def test_jobs_are_updated_field_by_field(self):
+        self.index.update('report_job', status='job_error')
+
+        self.assertEqual(['report_job', 'cleanup'], self.index.search('status:error'))
+        self.assertEqual(['report_job'], self.index.search('daily'), 'Fields that are not updated are kept')
+        self.assertEqual([], self.index.search('status:added'))
+
+        self.index.remove('cleanup')
+
+        self.assertEqual(['report_job'], self.index.search('error'))
+        self.assertNotIn('cleanup', self.index)
+        self.assertEqual(1, len(self.index))
+
+        self.assertRaises(ValueError, self.index.update, 'report_job', color='red')
@@ -0,0 +1,95 @@
+import random
+import statistics
+import unittest
+
+from apschedulerui.stats import JobStats, QuantileSketch
+
+
+class TestQuantileSketch(unittest.TestCase):
+
+    def test_quantiles_are_relatively_accurate(self):
+        rng = random.Random(1)
+        values = sorted(rng.lognormvariate(0, 2) for _ in range(10000))
+        sketch = QuantileSketch(relative_accuracy=0.01)
+
+        for value in values:
+            sketch.add(value)
+
+        for q in (0.1, 0.5, 0.95, 0.99):
+            actual = values[int(q * (len(values) - 1))]
+            self.assertAlmostEqual(actual, sketch.quantile(q), delta=actual * 0.02)
+
+        self.assertIsNone(QuantileSketch().quantile(0.5))
+
+    def test_cumulative_counts(self):
+        sketch = QuantileSketch()
+
+        for value in (0, 0.2, 0.3, 1, 8):
+            sketch.add(value)
+
+        self.assertEqual([1, 3, 4, 4, 5], sketch.cumulative_counts([0.1, 0.5, 1, 5, 10]))
+
+    def test_memory_is_bounded(self):
+        sketch = QuantileSketch(max_buckets=10)
+
+        for i in range(1, 1000):
+            sketch.add(i)
+
+        self.assertEqual(10, len(sketch.buckets))
+        self.assertEqual(999, sketch.count)
+        self.assertAlmostEqual(990, sketch.quantile(0.99), delta=990 * 0.02, msg='High quantiles stay accurate')
+
+
+class TestJobStats(unittest.TestCase):
+
+    def test_execution_events_are_aggregated(self):
+        stats = JobStats()
+        durations = [0.5, 1.5, 1.0, 2.0]
+
+        for i, duration in enumerate(durations):
+            scheduled_ts = i * 60 * 1000000
+            stats.add('job_submitted', scheduled_ts + 10, scheduled_ts)
+            stats.add('job_executed' if i else 'job_error', scheduled_ts + 10 + int(duration * 1e6), scheduled_ts)
+
+        stats.add('job_missed', 0, 0)
+        stats.add('job_added', 0)
+
+        summary = stats.summary()
+
+        self.assertEqual({'job_submitted': 4, 'job_executed': 3, 'job_error': 1, 'job_missed': 1,
+                          'job_max_instances': 0}, summary['counts'])
+        self.assertEqual(0.25, summary['error_rate'])
+        self.assertEqual(4, summary['duration']['count'])
+        self.assertAlmostEqual(statistics.mean(durations), summary['duration']['mean'])
+        self.assertAlmostEqual(statistics.stdev(durations), summary['duration']['stdev'])
+        self.assertEqual(0.5, summary['duration']['min'])
+        self.assertEqual(2.0, summary['duration']['max'])
+        self.assertAlmostEqual(1.0, summary['duration']['p50'], delta=0.02)
+
+    def test_only_known_submissions_are_measured(self):
+        stats = JobStats(max_pending=2)
+
+        for scheduled_ts in range(3):
+            stats.add('job_submitted', 0, scheduled_ts)
+
+        stats.add('job_executed', 10, 0)  # Forgotten, as more submissions came after it.
+        stats.add('job_executed', 10, 2)
+        stats.add('job_executed', 10, 5)  # Never submitted.
+
+        self.assertEqual(1, stats.summary()['duration']['count'])
+        self.assertIsNone(JobStats().summary()['error_rate'])
+
+    def test_executions_that_end_before_their_submission_is_notified_are_measured(self):
+        stats = JobStats()
+
+        stats.add('job_executed', 10, 0)
+        stats.add('job_submitted', 20, 0)
+        stats.add('job_submitted', 30, 60)
+        stats.add('job_error', 500030, 60)
+
+        summary = stats.summary()
+        self.assertEqual(2, summary['duration']['count'])
+        self.assertEqual(0, summary['duration']['min'], 'Executions that ended first should take no time')
+        self.assertEqual(0.5, summary['duration']['max'])
+        self.assertEqual({}, stats._pending, 'Late submissions should not be left pending')
+        self.assertEqual({}, stats._finished)
@@ -3,14 +3,16 @@ import unittest
 from datetime import datetime, timedelta
 
 try:
-    from mock import patch
+    from mock import ANY, patch
 except ImportError:
-    from unittest.mock import patch
+    from unittest.mock import ANY, patch
 
+import flask
 from apscheduler.executors.pool import ThreadPoolExecutor
 from apscheduler.jobstores.memory import MemoryJobStore
 from apscheduler.schedulers.background import BackgroundScheduler
 
+from apschedulerui.history import SQLiteHistory
 from apschedulerui.watcher import SchedulerWatcher
 from apschedulerui.web import SchedulerUI
 
@@ -33,6 +35,13 @@ class TestWebServer(unittest.TestCase):
         self.assertRaises(ValueError, SchedulerUI, self.scheduler, operation_timeout=-1)
 
         self.assertRaises(TypeError, SchedulerUI, self.scheduler, capabilities=set())
+        self.assertRaises(TypeError, SchedulerUI, self.scheduler, watcher_options=[])
+        self.assertRaises(TypeError, SchedulerUI, self.scheduler, event_batch_interval='1')
+        self.assertRaises(ValueError, SchedulerUI, self.scheduler, event_batch_interval=-1)
+        self.assertRaises(ValueError, SchedulerUI, self.scheduler, event_batch_interval=1, event_batch_size=0)
+
+        async_server = SchedulerUI(self.scheduler, watcher_options={'async_events': True, 'event_queue_size': 10})
+        self.assertEqual(10, async_server._scheduler_listener.event_queue.maxsize)
 
     @patch('flask.Flask.add_url_rule')
     def test_webserver_capabilities(self, mock_add_url_rule):
@@ -78,6 +87,434 @@ class TestWebServer(unittest.TestCase):
             'Web server should register the endpoint to remove a job'
         )
 
+    @patch('flask_socketio.join_room')
+    @patch('flask_socketio.leave_room')
+    def test_jobs_are_only_watched_by_subscribed_clients(self, mock_leave_room, mock_join_room):
+        ui = SchedulerUI(self.scheduler)
+        self.scheduler.add_job(lambda: 0, id='b_job', trigger='interval', minutes=60)
+
+        with ui._web_server.test_request_context('/'):
+            flask.request.sid = 'client_sid'
+            ui._client_joined()
+            self.assertFalse(ui._is_watching_job('a_job'), 'Projections are not needed without subscribed clients')
+
+            ui._subscribe('job:a_job')
+            ui._unsubscribe(['job:a_job'])
+            mock_join_room.assert_not_called()
+
+            ui._subscribe({'rooms': ['job:a_job', 'overview', 'invalid_room']})
+            mock_join_room.assert_any_call('job:a_job')
+            self.assertEqual(2, mock_join_room.call_count, 'Only valid rooms should be joined')
+            self.assertTrue(ui._is_watching_job('a_job'))
+            self.assertFalse(ui._is_watching_job('b_job'))
+
+            ui._subscribe({'rooms': ['jobstore:default']})
+            self.assertTrue(ui._is_watching_job('b_job'), 'Jobs should be watched by their jobstore subscribers')
+
+            ui._unsubscribe({'rooms': ['jobstore:default']})
+            mock_leave_room.assert_called_with('jobstore:default')
+            self.assertFalse(ui._is_watching_job('b_job'))
+
+            ui._client_left()
+            self.assertFalse(ui._is_watching_job('a_job'))
+            self.assertEqual({}, ui._rooms)
+
+    @patch('flask_socketio.SocketIO.emit')
+    def test_job_events_are_only_sent_to_subscribed_rooms(self, mock_emit):
+        ui = SchedulerUI(self.scheduler)
+
+        with patch.object(ui, '_emit_to_room') as mock_emit_to_room:
+            ui._job_event({'job_id': 'a_job', 'event_name': 'job_submitted', 'event_ts': 'ts', 'seq': 1, 'retval': 1})
+            mock_emit_to_room.assert_not_called()
+
+        ui._rooms = {'job:a_job': {'job_client', 'jobstore_client'}, 'jobstore:default': {'jobstore_client'}}
+
+        ui._job_event({'job_id': 'a_job', 'event_name': 'job_submitted', 'event_ts': 'ts', 'seq': 1, 'retval': 1})
+
+        self.assertEqual(2, mock_emit.call_count)
+        mock_emit.assert_any_call('job_event', ANY, room='jobstore:default')
+        mock_emit.assert_any_call('job_event', ANY, room='job:a_job', skip_sid=['jobstore_client'])
+
+        # Clients in the overview room get compact updates.
+        mock_emit.reset_mock()
+        ui._rooms['overview'] = {'overview_client'}
+        ui._rooms['job:a_job'] = {'jobstore_client'}
+
+        ui._job_event({'job_id': 'a_job', 'event_name': 'job_submitted', 'event_ts': 'ts', 'seq': 2, 'retval': 1})
+
+        self.assertEqual(2, mock_emit.call_count, 'Clients in both rooms of a job should get its events only once')
+        mock_emit.assert_called_with(
+            'job_overview', [{'job_id': 'a_job', 'event_name': 'job_submitted', 'event_ts': 'ts', 'seq': 2}],
+            room='overview'
+        )
+
+    @patch('flask_socketio.emit')
+    @patch('flask_socketio.join_room')
+    def test_subscribing_clients_get_what_changed_in_their_rooms(self, mock_join_room, mock_emit):
+        ui = SchedulerUI(self.scheduler)
+        watcher = ui._scheduler_listener
+        self.scheduler.add_job(lambda: 0, id='b_job', trigger='interval', minutes=60)
+        seq = watcher.last_seq
+
+        self.scheduler.modify_job('a_job', name='Modified job')
+        self.scheduler.modify_job('b_job', name='Modified job')
+
+        with ui._web_server.test_request_context('/'):
+            flask.request.sid = 'client_sid'
+            ui._subscribe({'rooms': ['job:b_job'], 'instance': watcher.instance_id, 'since_seq': seq})
+
+        event_name, subscribed = mock_emit.call_args[0]
+        self.assertEqual('subscribed', event_name)
+        self.assertEqual(watcher.last_seq, subscribed['seq'])
+        self.assertEqual(['b_job'], list(subscribed['jobs'].keys()))
+        self.assertEqual(['job_modified'], [e['event_name'] for e in subscribed['jobs']['b_job']['events']])
+
+    @patch('flask_socketio.emit')
+    def test_clients_fetch_the_jobs_snapshot_in_pages(self, mock_emit):
+        ui = SchedulerUI(self.scheduler, snapshot_page_size=2, snapshot_events_per_job=1)
+
+        for i in range(5):
+            self.scheduler.add_job(lambda: 0, id='job_%d' % i, trigger='interval', minutes=60)
+            self.scheduler.modify_job('job_%d' % i, name='Modified job')
+
+        with ui._web_server.test_request_context('/'):
+            flask.request.sid = 'client_sid'
+            ui._client_connected()
+
+            summary = mock_emit.call_args_list[0][0][1]
+            self.assertEqual({}, summary['jobs'], 'Jobs should not be sent along with the scheduler summary')
+            self.assertEqual(6, summary['snapshot']['total_jobs'])
+            self.assertIsNone(summary['snapshot']['since_seq'])
+
+            offset, jobs = 0, {}
+            while offset is not None:
+                ui._get_jobs_page({'offset': offset})
+                event_name, page = mock_emit.call_args[0]
+                self.assertEqual('jobs_page', event_name)
+                self.assertLessEqual(len(page['jobs']), 2)
+                jobs.update(page['jobs'])
+                offset = page['next_offset']
+
+            self.assertEqual(sorted(['a_job'] + ['job_%d' % i for i in range(5)]), sorted(jobs.keys()))
+            self.assertEqual(['job_modified'], [e['event_name'] for e in jobs['job_0']['events']])
+
+            mock_emit.reset_mock()
+            ui._get_jobs_page({'offset': 0})
+            mock_emit.assert_not_called()
+
+            # Invalid requests are ignored.
+            ui._client_connected()
+            mock_emit.reset_mock()
+            for request in ('x', {'offset': 'x'}, {'offset': -1}):
+                ui._get_jobs_page(request)
+            mock_emit.assert_not_called()
+
+            # Asking for the full history of a job returns all of its events.
+            ui._get_job_history({'job_id': 'job_0'})
+            self.assertEqual('job_history', mock_emit.call_args[0][0])
+            self.assertEqual(2, len(mock_emit.call_args[0][1]['events']))
+
+            mock_emit.reset_mock()
+            for request in ('job_0', {'job_id': ['job_0']}, {'job_id': 'job_0', 'limit': 'x'}):
+                ui._get_job_history(request)
+            mock_emit.assert_not_called()
+
+    @patch('flask_socketio.emit')
+    def test_clients_can_search_jobs(self, mock_emit):
+        ui = SchedulerUI(self.scheduler, snapshot_page_size=2)
+
+        for i in range(5):
+            self.scheduler.add_job(lambda: 0, id='report_%d' % i, name='Report %d' % i, trigger='interval', minutes=60)
+
+        with ui._web_server.test_request_context('/'):
+            flask.request.sid = 'client_sid'
+
+            offset, job_ids = 0, []
+            while offset is not None:
+                ui._search_jobs({'query': 'report', 'offset': offset})
+                event_name, page = mock_emit.call_args[0]
+                self.assertEqual('jobs_search', event_name)
+                self.assertEqual(5, page['total'])
+                self.assertEqual(page['job_ids'], list(page['jobs'].keys()))
+                job_ids += page['job_ids']
+                offset = page['next_offset']
+
+            self.assertEqual(['report_%d' % i for i in range(5)], job_ids)
+
+            mock_emit.reset_mock()
+            ui._search_jobs({'query': 'report', 'limit': 0})
+            ui._search_jobs('report')
+            mock_emit.assert_not_called()
+
+        with ui._web_server.test_client() as client:
+            page = client.get('/api/jobs/search?q=report+3').get_json()
+            self.assertEqual(['report_3'], page['job_ids'])
+            self.assertEqual(1, page['total'])
+            self.assertIsNone(page['next_offset'])
+            self.assertIsInstance(page['jobs']['report_3']['added_time'], str, 'Timestamps should be formatted')
+
+            page = client.get('/api/jobs/search?offset=1&limit=10').get_json()
+            self.assertEqual(['report_0', 'report_1'], page['job_ids'], 'Pages hold at most snapshot_page_size jobs')
+            self.assertEqual(6, page['total'])
+
+            self.assertEqual(400, client.get('/api/jobs/search?offset=-1').status_code)
+
+    def test_job_stats_endpoints(self):
+        ui = SchedulerUI(self.scheduler)
+        watcher = ui._scheduler_listener
+
+        watcher._job_execution_event('a_job', 'default', 'job_submitted', 1000000, scheduled_run_time=0)
+        watcher._job_execution_event('a_job', 'default', 'job_executed', 3000000, scheduled_run_time=0)
+
+        with ui._web_server.test_client() as client:
+            stats = client.get('/api/job/a_job/stats').get_json()
+            self.assertEqual(1, stats['counts']['job_executed'])
+            self.assertEqual(2, stats['duration']['mean'])
+
+            self.assertEqual({'a_job': stats}, client.get('/api/jobs/stats').get_json())
+            self.assertEqual(404, client.get('/api/job/missing_job/stats').status_code)
+
+        self.assertEqual(stats, watcher.job_summary('a_job')['stats'])
+
+    def test_truncated_payloads_can_be_fetched(self):
+        ui = SchedulerUI(self.scheduler, watcher_options={'payload_preview_size': 10})
+        watcher = ui._scheduler_listener
+
+        retval, retval_ref = watcher._repr_payload('x' * 100)
+        watcher._job_execution_event(
+            'a_job', 'default', 'job_executed', 1, scheduled_run_time=0, retval=retval, retval_ref=retval_ref
+        )
+
+        with ui._web_server.test_client() as client:
+            ref = watcher.job_summary('a_job')['events'][-1]['retval_ref']
+            self.assertEqual('x' * 100, client.get('/api/payload/%s' % ref).get_json()['payload'])
+            self.assertEqual(404, client.get('/api/payload/unknown').status_code)
+
+    def test_metrics_endpoint(self):
+        self.assertRaises(TypeError, SchedulerUI, self.scheduler, expose_metrics='yes')
+
+        with SchedulerUI(self.scheduler)._web_server.test_client() as client:
+            self.assertNotIn('apscheduler_jobs', client.get('/metrics').get_data(as_text=True))
+
+        with SchedulerUI(self.scheduler, expose_metrics=True)._web_server.test_client() as client:
+            response = client.get('/metrics')
+            self.assertTrue(response.content_type.startswith('text/plain; version=0.0.4'))
+            self.assertIn('apscheduler_jobs{state="scheduled"} 1\n', response.get_data(as_text=True))
+            self.assertIn('apschedulerui_connected_clients 0\n', response.get_data(as_text=True))
+
+    @patch('flask_socketio.SocketIO.emit')
+    def test_ui_overhead_is_measured(self, mock_emit):
+        self.assertRaises(TypeError, SchedulerUI, self.scheduler, instrumentation_log_interval='1')
+        self.assertRaises(TypeError, SchedulerUI, self.scheduler, instrument='yes')
+
+        ui = SchedulerUI(self.scheduler, instrument=True)
+        ui._rooms['jobstore:default'] = {'client_sid'}
+        ui._scheduler_listener.add_listener(ui)
+        ui._scheduler_listener._job_execution_event('a_job', 'default', 'job_submitted', 0, scheduled_run_time=0)
+
+        with ui._web_server.test_client() as client:
+            snapshot = client.get('/api/instrumentation').get_json()
+
+        histograms = snapshot['histograms']
+        self.assertEqual(1, histograms['job_event_seconds']['']['count'])
+        self.assertEqual(1, histograms['emit_job_events_seconds']['']['count'])
+        self.assertEqual(1, histograms['payload_bytes']['json']['count'], 'The first payload should be measured')
+        self.assertEqual(0, snapshot['gauges']['connected_clients'])
+
+        ui = SchedulerUI(self.scheduler)
+        self.assertIsNone(ui._scheduler_listener.instrumentation, 'The overhead should only be measured on demand')
+        with ui._web_server.test_client() as client:
+            self.assertEqual(404, client.get('/api/instrumentation').status_code)
+
+        ui = SchedulerUI(self.scheduler, watcher_options={'instrument': True})
+        self.assertIsNotNone(ui._scheduler_listener.instrumentation)
+
+    @patch('flask_socketio.emit')
+    def test_job_events_can_be_queried_by_time_range(self, mock_emit):
+        ui = SchedulerUI(self.scheduler)
+        watcher = ui._scheduler_listener
+        added_ts = watcher.jobs['a_job']['added_time']
+
+        for i in range(1, 4):
+            watcher._job_execution_event('a_job', 'default', 'job_executed', added_ts + i, scheduled_run_time=i)
+
+        with ui._web_server.test_request_context('/'):
+            flask.request.sid = 'client_sid'
+
+            ui._get_job_history({'job_id': 'a_job', 'since_ts': added_ts + 2})
+            self.assertEqual(2, len(mock_emit.call_args[0][1]['events']))
+
+            mock_emit.reset_mock()
+            ui._get_job_history({'job_id': 'a_job', 'limit': '1'})
+            mock_emit.assert_not_called()
+
+        with ui._web_server.test_client() as client:
+            events = client.get('/api/job/a_job/events?limit=2').get_json()['events']
+            self.assertEqual(['job_executed', 'job_executed'], [e['event_name'] for e in events])
+
+            events = client.get('/api/events?until=%d' % added_ts).get_json()['events']
+            self.assertEqual(['job_added'], [e['event_name'] for e in events])
+
+            self.assertEqual(404, client.get('/api/job/missing_job/events').status_code)
+
+    @patch('flask_socketio.emit')
+    def test_event_queries_are_limited(self, mock_emit):
+        self.assertRaises(ValueError, SchedulerUI, self.scheduler, max_history_events=0)
+
+        history = SQLiteHistory(':memory:')
+        ui = SchedulerUI(
+            self.scheduler, max_history_events=3, watcher_options={'max_events_per_job': 2, 'history': history}
+        )
+        watcher = ui._scheduler_listener
+        added_ts = watcher.jobs['a_job']['added_time']
+
+        for i in range(1, 6):
+            watcher._job_execution_event('a_job', 'default', 'job_executed', added_ts + i, scheduled_run_time=i)
+        self.assertTrue(watcher.flush(timeout=5))
+
+        with ui._web_server.test_request_context('/'):
+            flask.request.sid = 'client_sid'
+
+            ui._get_job_history({'job_id': 'a_job', 'since_ts': added_ts})
+            self.assertEqual(2, len(mock_emit.call_args[0][1]['events']), 'Job histories should have a default limit')
+
+        with ui._web_server.test_client() as client:
+            events = client.get('/api/events').get_json()['events']
+            self.assertEqual(2, len(events), 'Queries should have a default limit')
+            self.assertEqual(3, len(client.get('/api/events?limit=100').get_json()['events']))
+
+        history.close()
+
+    @patch('flask_socketio.emit')
+    def test_reconnecting_clients_only_get_what_changed(self, mock_emit):
+        ui = SchedulerUI(self.scheduler)
+
+        self.scheduler.add_job(lambda: 0, id='b_job', trigger='interval', minutes=60)
+
+        with ui._web_server.test_request_context('/'):
+            flask.request.sid = 'client_sid'
+            ui._client_connected()
+            snapshot = mock_emit.call_args_list[0][0][1]['snapshot']
+
+            self.scheduler.modify_job('b_job', name='Modified job')
+
+            mock_emit.reset_mock()
+            ui._client_connected({'instance': snapshot['instance'], 'since_seq': snapshot['seq']})
+            delta = mock_emit.call_args_list[0][0][1]['snapshot']
+            self.assertEqual(snapshot['seq'], delta['since_seq'])
+            self.assertEqual(1, delta['total_jobs'])
+
+            ui._get_jobs_page({'offset': 0})
+            jobs = mock_emit.call_args[0][1]['jobs']
+            self.assertEqual(['b_job'], list(jobs.keys()))
+            self.assertEqual(['job_modified'], [e['event_name'] for e in jobs['b_job']['events']])
+
+            # Resume points from another watcher instance fall back to a full snapshot.
+            mock_emit.reset_mock()
+            ui._client_connected({'instance': 'another_instance', 'since_seq': snapshot['seq']})
+            full = mock_emit.call_args_list[0][0][1]['snapshot']
+            self.assertIsNone(full['since_seq'])
+            self.assertEqual(2, full['total_jobs'])
+
+    @patch('flask_socketio.emit')
+    def test_resuming_clients_get_the_events_they_missed(self, mock_emit):
+        ui = SchedulerUI(self.scheduler, watcher_options={'replay_log_size': 2})
+        watcher = ui._scheduler_listener
+        seq = watcher.last_seq
+
+        self.scheduler.modify_job('a_job', name='Modified job')
+
+        with ui._web_server.test_request_context('/'):
+            flask.request.sid = 'client_sid'
+            ui._client_resumed({'instance': watcher.instance_id, 'since_seq': seq})
+
+            self.assertEqual(1, mock_emit.call_count)
+            event_name, replay = mock_emit.call_args[0]
+            self.assertEqual('resume', event_name)
+            self.assertEqual(['job_modified'], [e['event_name'] for e in replay['events']])
+            self.assertEqual(watcher.last_seq, replay['seq'])
+            self.assertEqual(
+                [ui._encoder.format_timestamp(ts) for ts in watcher.get_next_run_times('a_job')],
+                replay['next_run_times']['a_job']
+            )
+
+            # Once the missed events are evicted from the replay log, clients get a snapshot instead.
+            self.scheduler.pause()
+            self.scheduler.resume()
+
+            mock_emit.reset_mock()
+            ui._client_resumed({'instance': watcher.instance_id, 'since_seq': seq})
+            self.assertEqual('init_jobs', mock_emit.call_args_list[0][0][0])
+            self.assertEqual(seq, mock_emit.call_args_list[0][0][1]['snapshot']['since_seq'])
+
+    @patch('flask_socketio.emit')
+    def test_reconnecting_clients_are_told_which_jobs_were_forgotten(self, mock_emit):
+        ui = SchedulerUI(self.scheduler, watcher_options={'max_removed_jobs': 0, 'replay_log_size': 3})
+        watcher = ui._scheduler_listener
+        seq = watcher.last_seq
+
+        self.scheduler.remove_job('a_job')
+        self.assertNotIn('a_job', watcher.jobs)
+
+        with ui._web_server.test_request_context('/'):
+            flask.request.sid = 'client_sid'
+            ui._client_resumed({'instance': watcher.instance_id, 'since_seq': seq})
+            event_name, replay = mock_emit.call_args[0]
+            self.assertEqual('resume', event_name)
+            self.assertEqual(['a_job'], replay['forgotten_jobs'])
+
+            mock_emit.reset_mock()
+            ui._client_connected({'instance': watcher.instance_id, 'since_seq': seq})
+            delta = mock_emit.call_args_list[0][0][1]['snapshot']
+            self.assertEqual(seq, delta['since_seq'])
+            self.assertEqual(['a_job'], delta['forgotten_jobs'])
+
+            # Once forgotten jobs aren't all known anymore, clients get a full snapshot instead.
+            for i in range(4):
+                self.scheduler.add_job(lambda: 0, id='job_%d' % i, trigger='interval', minutes=60)
+                self.scheduler.remove_job('job_%d' % i)
+
+            mock_emit.reset_mock()
+            ui._client_connected({'instance': watcher.instance_id, 'since_seq': seq})
+            full = mock_emit.call_args_list[0][0][1]['snapshot']
+            self.assertIsNone(full['since_seq'])
+            self.assertEqual([], full['forgotten_jobs'])
+
+            mock_emit.reset_mock()
+            ui._client_resumed({'instance': watcher.instance_id, 'since_seq': seq})
+            self.assertEqual('init_jobs', mock_emit.call_args_list[0][0][0])
+
+    @patch('flask_socketio.SocketIO.emit')
+    @patch('flask_socketio.emit')
+    @patch('flask_socketio.join_room')
+    def test_clients_can_negotiate_a_compact_encoding(self, mock_join_room, mock_emit, mock_socket_io_emit):
+        ui = SchedulerUI(self.scheduler)
+
+        with ui._web_server.test_request_context('/'):
+            flask.request.sid = 'client_sid'
+            ui._client_connected({'encodings': ['compact']})
+            ui._subscribe({'rooms': ['jobstore:default']})
+
+        self.assertEqual(
+            ['init_encoding', 'init_jobs', 'init_capabilities'], [c[0][0] for c in mock_emit.call_args_list]
+        )
+        self.assertEqual('compact', mock_emit.call_args_list[0][0][1]['encoding'])
+        self.assertIn('s', mock_emit.call_args_list[1][0][1]['snapshot'], 'Payloads should be encoded')
+        self.assertEqual([(('compact|',),), (('compact|jobstore:default',),)], mock_join_room.call_args_list)
+
+        # Payloads are encoded once for every encoding in use, and each client only gets them in its own encoding.
+        ui._scheduler_listener.add_listener(ui)
+        self.scheduler.pause()
+
+        self.assertEqual(2, mock_socket_io_emit.call_count)
+        compact_call, json_call = mock_socket_io_emit.call_args_list
+        self.assertEqual('compact|', compact_call[1]['room'])
+        self.assertIn('n', compact_call[0][1])
+        self.assertEqual(['client_sid'], json_call[1]['skip_sid'])
+        self.assertEqual('scheduler_paused', json_call[0][1]['event_name'])
+
+        self.scheduler.resume()
+
     @patch('flask.Flask.send_static_file')
     def test_index_retrieval(self, mock_send_static_file):
         SchedulerUI(self.scheduler)._index('/any_path')
@@ -202,6 +639,7 @@ class TestWebServer(unittest.TestCase):
     @patch('flask_socketio.SocketIO.run')
     def test_job_events_are_emitted_to_clients(self, mock_run, mock_emit):
         ui = SchedulerUI(self.scheduler)
+        ui._rooms = {'jobstore:default': {'client_sid'}}
         ui.start()
 
         self.scheduler.add_job(
@@ -226,6 +664,30 @@ class TestWebServer(unittest.TestCase):
         # Job submission event.
         mock_emit.assert_called_once()
 
+    @patch('flask_socketio.SocketIO.emit')
+    def test_job_events_can_be_emitted_in_batches(self, mock_emit):
+        ui = SchedulerUI(self.scheduler, event_batch_interval=0.05, event_batch_size=3)
+        ui._rooms = {'jobstore:default': {'client_sid'}}
+
+        ui._job_event({'job_id': 'a_job', 'event_name': 'job_submitted', 'seq': 1})
+        ui._job_event({'job_id': 'a_job', 'event_name': 'job_executed', 'seq': 2})
+        mock_emit.assert_not_called()
+
+        time.sleep(0.1)
+        mock_emit.assert_called_once()
+        self.assertEqual('job_events', mock_emit.call_args[0][0])
+        self.assertEqual([1, 2], [e['seq'] for e in mock_emit.call_args[0][1]])
+
+        # Full batches are sent without waiting for the interval to elapse.
+        mock_emit.reset_mock()
+        ui._event_batcher.interval = 10
+        for seq in range(3, 6):
+            ui._job_event({'job_id': 'a_job', 'event_name': 'job_submitted', 'seq': seq})
+
+        time.sleep(0.05)
+        mock_emit.assert_called_once()
+        self.assertEqual([3, 4, 5], [e['seq'] for e in mock_emit.call_args[0][1]])
+
     @patch('flask_socketio.SocketIO.emit')
     @patch('flask_socketio.SocketIO.run')
     def test_jobstore_events_are_emitted_to_clients(self, mock_run, mock_emit):